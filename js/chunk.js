@@ -1,5 +1,8 @@
 import * as THREE from 'three';
-import { WORLD_CONFIG, BLOCK, BLOCKS } from './constants.js';
+import {
+    WORLD_CONFIG, BLOCK, BLOCK_FLAG, BLOCK_FLAGS, BLOCK_TILE_GRID,
+    BLOCK_TILE_SIDE, BLOCK_TILE_TOP, BLOCK_TILE_BOTTOM
+} from './constants.js';
 import { getTerrainHeight } from './noise.js';
 
 const { CHUNK_SIZE, CHUNK_HEIGHT } = WORLD_CONFIG;
@@ -7,6 +10,11 @@ const warnedTileMissing = new Set();
 const warnedTileMismatch = new Set();
 const loggedStats = new Set();
 
+// Маски флагов из BLOCK_FLAGS: таблицы по id вместо BLOCKS[id] в горячих циклах
+const SOLID_MASK = BLOCK_FLAG.AIR | BLOCK_FLAG.DEFINED | BLOCK_FLAG.TRANSPARENT;
+const RENDER_MASK = BLOCK_FLAG.AIR | BLOCK_FLAG.DEFINED;
+const OPAQUE_MASK = BLOCK_FLAG.DEFINED | BLOCK_FLAG.TRANSPARENT;
+
 
 export class Chunk {
     constructor(chunkX, chunkZ, material, world) {
@@ -45,8 +53,8 @@ export class Chunk {
             if (y < 0 || y >= CHUNK_HEIGHT) return false;
 
             const id = this.data[this._getIndex(x, y, z)];
-            // Исправлено: добавлена проверка на существование блока в BLOCKS
-            return id !== BLOCK.AIR && BLOCKS[id] && !BLOCKS[id].transparent;
+            // Не воздух, есть в BLOCKS и не прозрачный
+            return (BLOCK_FLAGS[id] & SOLID_MASK) === BLOCK_FLAG.DEFINED;
         }
 
         // 2. Если координаты СНАРУЖИ - спрашиваем у Мира (медленнее, но видит соседей)
@@ -56,8 +64,7 @@ export class Chunk {
 
         // world.getBlock сам найдет нужный чанк и спросит у него
         const id = this.world ? this.world.getBlock(globalX, y, globalZ) : BLOCK.AIR;
-        // Исправлено: добавлена проверка на существование блока в BLOCKS
-        return id !== BLOCK.AIR && BLOCKS[id] && !BLOCKS[id].transparent;
+        return (BLOCK_FLAGS[id] & SOLID_MASK) === BLOCK_FLAG.DEFINED;
     }
 
     _getBlockIdWithNeighbors(x, y, z) {
@@ -71,19 +78,10 @@ export class Chunk {
         return this.world.getBlock(globalX, y, globalZ);
     }
 
-    _getFaceTile(blockProps, face) {
-        if (!blockProps) return null;
-        if (face === 'top' && blockProps.atlasTop) return blockProps.atlasTop;
-        if (face === 'bottom' && blockProps.atlasBottom) return blockProps.atlasBottom;
-        return blockProps.atlas || null;
-    }
-
     _shouldRenderFace(currentId, neighborId) {
-        if (currentId === BLOCK.AIR) return false;
-        const block = BLOCKS[currentId];
-        if (!block) return false;
-        const neighbor = BLOCKS[neighborId];
-        return !neighbor || neighbor.transparent;
+        // Текущий блок - не воздух и есть в BLOCKS; соседа нет в BLOCKS или он прозрачный
+        return (BLOCK_FLAGS[currentId] & RENDER_MASK) === BLOCK_FLAG.DEFINED
+            && (BLOCK_FLAGS[neighborId] & OPAQUE_MASK) !== BLOCK_FLAG.DEFINED;
     }
 
     setBlock(x, y, z, id) {
@@ -213,13 +211,9 @@ export class Chunk {
                         mask[idx] = null;
                         continue;
                     }
-                    const props = BLOCKS[currentId];
-                    const tile = this._getFaceTile(props, 'top');
-                    if (!tile) {
-                        mask[idx] = null;
-                        continue;
-                    }
-                    mask[idx] = { id: currentId, col: tile[0], row: tile[1] };
+                    // Наследование atlasTop/atlasBottom уже учтено в таблице
+                    const tile = BLOCK_TILE_TOP[currentId];
+                    mask[idx] = { id: currentId, col: tile % BLOCK_TILE_GRID, row: (tile / BLOCK_TILE_GRID) | 0 };
                 }
             }
         };
@@ -234,13 +228,9 @@ export class Chunk {
                         mask[idx] = null;
                         continue;
                     }
-                    const props = BLOCKS[currentId];
-                    const tile = this._getFaceTile(props, 'bottom');
-                    if (!tile) {
-                        mask[idx] = null;
-                        continue;
-                    }
-                    mask[idx] = { id: currentId, col: tile[0], row: tile[1] };
+                    // Наследование atlasTop/atlasBottom уже учтено в таблице
+                    const tile = BLOCK_TILE_BOTTOM[currentId];
+                    mask[idx] = { id: currentId, col: tile % BLOCK_TILE_GRID, row: (tile / BLOCK_TILE_GRID) | 0 };
                 }
             }
         };
@@ -255,13 +245,9 @@ export class Chunk {
                         mask[idx] = null;
                         continue;
                     }
-                    const props = BLOCKS[currentId];
-                    const tile = this._getFaceTile(props, 'side');
-                    if (!tile) {
-                        mask[idx] = null;
-                        continue;
-                    }
-                    mask[idx] = { id: currentId, col: tile[0], row: tile[1] };
+                    // Наследование atlasTop/atlasBottom уже учтено в таблице
+                    const tile = BLOCK_TILE_SIDE[currentId];
+                    mask[idx] = { id: currentId, col: tile % BLOCK_TILE_GRID, row: (tile / BLOCK_TILE_GRID) | 0 };
                 }
             }
         };
@@ -276,13 +262,9 @@ export class Chunk {
                         mask[idx] = null;
                         continue;
                     }
-                    const props = BLOCKS[currentId];
-                    const tile = this._getFaceTile(props, 'side');
-                    if (!tile) {
-                        mask[idx] = null;
-                        continue;
-                    }
-                    mask[idx] = { id: currentId, col: tile[0], row: tile[1] };
+                    // Наследование atlasTop/atlasBottom уже учтено в таблице
+                    const tile = BLOCK_TILE_SIDE[currentId];
+                    mask[idx] = { id: currentId, col: tile % BLOCK_TILE_GRID, row: (tile / BLOCK_TILE_GRID) | 0 };
                 }
             }
         };
@@ -297,13 +279,9 @@ export class Chunk {
                         mask[idx] = null;
                         continue;
                     }
-                    const props = BLOCKS[currentId];
-                    const tile = this._getFaceTile(props, 'side');
-                    if (!tile) {
-                        mask[idx] = null;
-                        continue;
-                    }
-                    mask[idx] = { id: currentId, col: tile[0], row: tile[1] };
+                    // Наследование atlasTop/atlasBottom уже учтено в таблице
+                    const tile = BLOCK_TILE_SIDE[currentId];
+                    mask[idx] = { id: currentId, col: tile % BLOCK_TILE_GRID, row: (tile / BLOCK_TILE_GRID) | 0 };
                 }
             }
         };
@@ -318,13 +296,9 @@ export class Chunk {
                         mask[idx] = null;
                         continue;
                     }
-                    const props = BLOCKS[currentId];
-                    const tile = this._getFaceTile(props, 'side');
-                    if (!tile) {
-                        mask[idx] = null;
-                        continue;
-                    }
-                    mask[idx] = { id: currentId, col: tile[0], row: tile[1] };
+                    // Наследование atlasTop/atlasBottom уже учтено в таблице
+                    const tile = BLOCK_TILE_SIDE[currentId];
+                    mask[idx] = { id: currentId, col: tile % BLOCK_TILE_GRID, row: (tile / BLOCK_TILE_GRID) | 0 };
                 }
             }
         };
@@ -14,8 +14,11 @@ export class SoundManager {
         this.musicVolume = 0.5;
         this.enabled = true;
 
-        // Список файлов для загрузки (пример)
-        // В реальности лучше генерировать это список автоматически или грузить лениво
+        // Звуковой спрайт (python py/editor_cli.py sound-sprite): один файл на все звуки блоков
+        this.spriteManifestPath = 'assets/sounds/sprite.json';
+        this.sprite = null; // { buffer, sounds: { name: { offset, duration } } }
+
+        // Отдельные файлы: все, если спрайт не собран, иначе - звуки, которых в спрайте нет
         this.preloadList = [
             'assets/sounds/stone_step.mp3', 'assets/sounds/stone_break.mp3', 'assets/sounds/stone_place.mp3',
             'assets/sounds/grass_step.mp3', 'assets/sounds/grass_break.mp3', 'assets/sounds/grass_place.mp3',
@@ -27,8 +30,38 @@ export class SoundManager {
     }
 
     loadSounds() {
+        fetch(this.spriteManifestPath)
+            .then(response => {
+                if (!response.ok) throw new Error(`HTTP ${response.status}`);
+                return response.json();
+            })
+            .then(manifest => this.loadSprite(manifest))
+            .catch(() => this.loadSeparateFiles());
+    }
+
+    loadSprite(manifest) {
+        const base = this.spriteManifestPath.slice(0, this.spriteManifestPath.lastIndexOf('/') + 1);
+        const inSprite = (name) => Object.prototype.hasOwnProperty.call(manifest.sounds, name);
+        // Чего нет в спрайте (mp3/ogg склейка пропускает), грузим сразу, параллельно со спрайтом
+        this.loadSeparateFiles(name => !inSprite(name));
+        // Один запрос и одно декодирование на все звуки
+        this.loader.load(
+            base + manifest.file,
+            (buffer) => {
+                this.sprite = { buffer, sounds: manifest.sounds };
+            },
+            undefined,
+            (error) => {
+                console.warn(`Не удалось загрузить звуковой спрайт: ${manifest.file}`, error);
+                this.loadSeparateFiles(inSprite);
+            }
+        );
+    }
+
+    loadSeparateFiles(filter = () => true) {
         this.preloadList.forEach(path => {
-            const name = path.split('/').pop().replace('.mp3', ''); // 'stone_step'
+            const name = path.split('/').pop().replace(/\.[^.]+$/, ''); // 'stone_step'
+            if (!filter(name)) return;
             this.loader.load(
                 path,
                 (buffer) => {
@@ -44,10 +77,19 @@ export class SoundManager {
     }
 
     play(soundName, volume = 1.0, detune = true) {
-        if (!this.enabled || !this.buffers.has(soundName)) return;
+        if (!this.enabled) return;
+        const part = this.sprite ? this.sprite.sounds[soundName] : null;
+        if (!part && !this.buffers.has(soundName)) return;
 
         const sound = new THREE.Audio(this.listener);
-        sound.setBuffer(this.buffers.get(soundName));
+        if (part) {
+            // Кусок спрайта [offset, offset + duration]
+            sound.setBuffer(this.sprite.buffer);
+            sound.offset = part.offset;
+            sound.duration = part.duration;
+        } else {
+            sound.setBuffer(this.buffers.get(soundName));
+        }
         
         // Применяем настройки громкости
         const finalVolume = volume * this.masterVolume * this.soundEffectsVolume;
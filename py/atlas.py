@@ -0,0 +1,295 @@
+"""Атлас текстур в памяти.
+
+Все вставки тайлов идут в один PIL-образ, на диск он пишется одним save().
+Pillow и NumPy импортируются лениво, чтобы модуль можно было подключать и без них.
+"""
+import os
+import zlib
+
+import block_data
+from block_data import ATLAS_PATH, CONSTANTS_PATH, FACE_KEYS
+from js_literal import JSParseError
+
+DEFAULT_ATLAS_SIZE = 1024
+DEFAULT_GRID_SIZE = 16
+
+
+def atlas_config(path=CONSTANTS_PATH):
+    """(размер атласа, клеток по стороне) из WORLD_CONFIG в constants.js.
+
+    Если файла нет или значения не подходят - 1024 / 16, как было раньше.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            config = block_data.parse_export(f.read(), "WORLD_CONFIG")
+        size, grid = int(config.get("ATLAS_SIZE", DEFAULT_ATLAS_SIZE)), int(config.get("ATLAS_GRID", DEFAULT_GRID_SIZE))
+    except (OSError, JSParseError, TypeError, ValueError):
+        return DEFAULT_ATLAS_SIZE, DEFAULT_GRID_SIZE
+    if size <= 0 or grid <= 0 or size % grid:
+        return DEFAULT_ATLAS_SIZE, DEFAULT_GRID_SIZE
+    return size, grid
+
+
+# Настройки атласа (WORLD_CONFIG.ATLAS_SIZE / ATLAS_GRID): 1024 / 16, 4096 / 64, 8192 / 128...
+ATLAS_SIZE, GRID_SIZE = atlas_config()
+TILE_SIZE = ATLAS_SIZE // GRID_SIZE  # 64px при настройках по умолчанию
+
+
+_HASH_SEED = 0x5EED
+
+
+def tiles_array(image, tile_size=TILE_SIZE):
+    """RGBA-атлас -> массив (клеток, tile*tile*4) uint8, клетки по строкам: index = row * grid + col"""
+    import numpy as np
+
+    arr = np.asarray(image.convert("RGBA") if image.mode != "RGBA" else image)
+    grid_y, grid_x = arr.shape[0] // tile_size, arr.shape[1] // tile_size
+    tiles = arr[:grid_y * tile_size, :grid_x * tile_size].reshape(grid_y, tile_size, grid_x, tile_size, 4)
+    return np.ascontiguousarray(tiles.transpose(0, 2, 1, 3, 4)).reshape(grid_y * grid_x, -1)
+
+
+def hash_tiles(tiles):
+    """Векторный хеш каждой строки массива тайлов (uint64, с переполнением).
+
+    Совпадение хеша - только кандидат в дубликаты, байты потом сравниваются.
+    """
+    import numpy as np
+
+    words = tiles.view(np.uint64)
+    weights = np.random.default_rng(_HASH_SEED).integers(1, 2 ** 63, size=words.shape[1], dtype=np.uint64) | 1
+    with np.errstate(over="ignore"):
+        return (words * weights).sum(axis=1, dtype=np.uint64)
+
+
+def empty_tiles(tiles):
+    """Маска полностью прозрачных клеток"""
+    return tiles.reshape(tiles.shape[0], -1, 4)[:, :, 3].max(axis=1) == 0
+
+
+def load_tile_image(file_path, tile_size=TILE_SIZE):
+    """Открывает файл текстуры и приводит к размеру тайла (NEAREST, RGBA)"""
+    from PIL import Image
+
+    with Image.open(file_path) as img:
+        img = img.convert("RGBA")
+        if img.size != (tile_size, tile_size):
+            img = img.resize((tile_size, tile_size), Image.Resampling.NEAREST)
+        return img
+
+
+def encode_tile_patch(img):
+    """Тайл (PIL RGBA) -> сжатый патч для журнала правок"""
+    return zlib.compress(img.tobytes("raw", "RGBA"), 1)
+
+
+def decode_tile_patch(data, tile_size=TILE_SIZE):
+    from PIL import Image
+
+    return Image.frombytes("RGBA", (tile_size, tile_size), zlib.decompress(data))
+
+
+class Atlas:
+    def __init__(self, path=ATLAS_PATH):
+        self.path = path
+        self.image = None
+        self.dirty_cells = set()
+        self._tiles = None  # (клеток, байт) - кеш для поиска дубликатов
+        self._hashes = None
+        self._empty = None  # маска полностью прозрачных клеток
+
+    def load(self):
+        from PIL import Image
+
+        if os.path.exists(self.path):
+            with Image.open(self.path) as img:
+                image = img.convert("RGBA")
+            if image.width > ATLAS_SIZE or image.height > ATLAS_SIZE:
+                # Обрезать нельзя: следующий save() потерял бы клетки за краем
+                raise ValueError(f"{self.path} is {image.width}x{image.height}, larger than the "
+                                 f"{ATLAS_SIZE}x{ATLAS_SIZE} atlas set in WORLD_CONFIG.ATLAS_SIZE")
+            if image.size != (ATLAS_SIZE, ATLAS_SIZE):
+                # Атлас увеличили в WORLD_CONFIG (тайл того же размера):
+                # старые клетки остаются на месте, остальное прозрачное
+                padded = Image.new("RGBA", (ATLAS_SIZE, ATLAS_SIZE), (0, 0, 0, 0))
+                padded.paste(image, (0, 0))
+                image = padded
+            self.image = image
+        else:
+            self.image = Image.new("RGBA", (ATLAS_SIZE, ATLAS_SIZE), (0, 0, 0, 0))
+        self.dirty_cells.clear()
+        self._tiles = self._hashes = self._empty = None
+        return self
+
+    def ensure_loaded(self):
+        if self.image is None:
+            self.load()
+        return self.image
+
+    @property
+    def dirty(self):
+        return bool(self.dirty_cells)
+
+    def paste_tile(self, col, row, img):
+        if not (0 <= col < GRID_SIZE and 0 <= row < GRID_SIZE):
+            raise ValueError(f"Cell [{col}, {row}] is outside the {GRID_SIZE}x{GRID_SIZE} atlas")
+        atlas = self.ensure_loaded()
+        if img.size != (TILE_SIZE, TILE_SIZE):
+            from PIL import Image
+            img = img.resize((TILE_SIZE, TILE_SIZE), Image.Resampling.NEAREST)
+        # Заменяем тайл целиком, включая прозрачность (paste без маски)
+        atlas.paste(img, (col * TILE_SIZE, row * TILE_SIZE))
+        self.dirty_cells.add((col, row))
+        if self._tiles is not None:
+            i = row * GRID_SIZE + col
+            self._tiles[i] = tiles_array(img)[0]
+            self._hashes[i] = hash_tiles(self._tiles[i:i + 1])[0]
+            self._empty[i] = empty_tiles(self._tiles[i:i + 1])[0]
+
+    def paste_file(self, col, row, file_path):
+        self.paste_tile(col, row, load_tile_image(file_path))
+
+    def get_tile(self, col, row):
+        atlas = self.ensure_loaded()
+        x, y = col * TILE_SIZE, row * TILE_SIZE
+        return atlas.crop((x, y, x + TILE_SIZE, y + TILE_SIZE))
+
+    def tile_index(self):
+        """(тайлы, хеши) по всем клеткам; считается один раз, дальше обновляется при вставке"""
+        if self._tiles is None:
+            self._tiles = tiles_array(self.ensure_loaded())
+            self._hashes = hash_tiles(self._tiles)
+            self._empty = empty_tiles(self._tiles)
+        return self._tiles, self._hashes
+
+    def empty_mask(self):
+        """Маска прозрачных клеток (обновляется при вставке, как tile_index)"""
+        self.tile_index()
+        return self._empty
+
+    def find_tile(self, img):
+        """Клетка с точно такими же пикселями (непрозрачная) или None"""
+        tiles, hashes = self.tile_index()
+        probe = tiles_array(img)
+        h = hash_tiles(probe)[0]
+        if empty_tiles(probe)[0]:
+            return None
+        for i in (hashes == h).nonzero()[0]:
+            if (tiles[i] == probe[0]).all():
+                return int(i % GRID_SIZE), int(i // GRID_SIZE)
+        return None
+
+    def save(self, path=None, optimize=False):
+        """Одно кодирование PNG на все накопленные правки; optimize - меньше файл, дольше запись"""
+        if self.image is None:
+            return False
+        self.image.save(path or self.path, optimize=optimize)
+        self.dirty_cells.clear()
+        return True
+
+
+class AtlasAllocator:
+    """Учет клеток атласа: какие заняты блоками, какие свободны, где дубликаты.
+
+    Свободная клетка - та, на которую не ссылается ни один блок и которая полностью прозрачна.
+    """
+
+    def __init__(self, atlas, blocks):
+        self.atlas = atlas
+        self.refs = {}  # (col, row) -> [(block_id, face), ...]
+        for b in blocks:
+            for key in FACE_KEYS:
+                if b.get(key):
+                    self.refs.setdefault(tuple(b[key]), []).append((b['id'], key))
+
+    def _iter_free(self):
+        for i in self.atlas.empty_mask().nonzero()[0].tolist():
+            cell = (i % GRID_SIZE, i // GRID_SIZE)
+            if cell not in self.refs:
+                yield cell
+
+    def free_cells(self):
+        return list(self._iter_free())
+
+    def first_free(self):
+        """Первая свободная клетка по строкам или None"""
+        return next(self._iter_free(), None)
+
+    def duplicates(self):
+        """Группы клеток с одинаковыми непрозрачными тайлами"""
+        import numpy as np
+
+        tiles, hashes = self.atlas.tile_index()
+        empty = empty_tiles(tiles)
+        groups = []
+        _, inverse, counts = np.unique(hashes, return_inverse=True, return_counts=True)
+        for g in (counts > 1).nonzero()[0]:
+            members = [int(i) for i in (inverse == g).nonzero()[0] if not empty[i]]
+            # Хеш совпал - сверяем байты
+            while len(members) > 1:
+                first = members[0]
+                same = [i for i in members if (tiles[i] == tiles[first]).all()]
+                if len(same) > 1:
+                    groups.append([(i % GRID_SIZE, i // GRID_SIZE) for i in same])
+                members = [i for i in members if i not in same]
+        return groups
+
+    def is_free(self, cell):
+        col, row = cell
+        if tuple(cell) in self.refs or not (0 <= col < GRID_SIZE and 0 <= row < GRID_SIZE):
+            return False
+        return bool(self.atlas.empty_mask()[row * GRID_SIZE + col])
+
+    def place(self, img, reuse=True):
+        """Кладет тайл в атлас. Возвращает ((col, row), reused)"""
+        if reuse:
+            cell = self.atlas.find_tile(img)
+            if cell:
+                return cell, True
+        cell = self.first_free()
+        if cell is None:
+            raise ValueError(f"No free cells left in the {GRID_SIZE}x{GRID_SIZE} atlas")
+        col, row = cell
+        self.atlas.paste_tile(col, row, img)
+        return (col, row), False
+
+    def reference(self, cell, block_id, face):
+        self.refs.setdefault(tuple(cell), []).append((block_id, face))
+
+    def compact(self, blocks):
+        """Переупаковывает атлас: только используемые тайлы, без дубликатов, подряд с [0, 0].
+
+        Возвращает словарь {старая клетка: новая}. Координаты блоков переписываются.
+        """
+        from PIL import Image
+
+        tiles, hashes = self.atlas.tile_index()
+        mapping, slots, by_hash = {}, [], {}  # slots: индексы исходных клеток в новом порядке
+        for col, row in sorted(self.refs, key=lambda c: (c[1], c[0])):
+            if not (0 <= col < GRID_SIZE and 0 <= row < GRID_SIZE):
+                raise ValueError(f"Block references cell [{col}, {row}] outside the atlas")
+            i = row * GRID_SIZE + col
+            candidates = by_hash.setdefault(int(hashes[i]), [])
+            slot = next((n for n in candidates if (tiles[slots[n]] == tiles[i]).all()), None)
+            if slot is None:
+                slot = len(slots)
+                slots.append(i)
+                candidates.append(slot)
+            mapping[(col, row)] = (slot % GRID_SIZE, slot // GRID_SIZE)
+
+        old = self.atlas.ensure_loaded()
+        new = Image.new("RGBA", old.size, (0, 0, 0, 0))
+        for n, i in enumerate(slots):
+            sx, sy = (i % GRID_SIZE) * TILE_SIZE, (i // GRID_SIZE) * TILE_SIZE
+            new.paste(old.crop((sx, sy, sx + TILE_SIZE, sy + TILE_SIZE)),
+                      ((n % GRID_SIZE) * TILE_SIZE, (n // GRID_SIZE) * TILE_SIZE))
+        self.atlas.image = new
+        self.atlas._tiles = self.atlas._hashes = self.atlas._empty = None
+        self.atlas.dirty_cells.update((c, r) for r in range(GRID_SIZE) for c in range(GRID_SIZE))
+
+        self.refs = {}
+        for b in blocks:
+            for key in FACE_KEYS:
+                if b.get(key):
+                    b[key] = list(mapping[tuple(b[key])])
+                    self.reference(b[key], b['id'], key)
+        return mapping
@@ -0,0 +1,405 @@
+"""Экспорт атласа в форматы для движка.
+
+Атлас с полями (gutter) и готовой цепочкой мип-уровней:
+каждый тайл уменьшается отдельно от соседей, а поля заполняются краевыми
+пикселями этого же тайла. Поэтому на дальних мипах тайлы не смешиваются,
+и в движке можно включить мипмаппинг без "протекания" соседних клеток.
+
+Массив текстур: один слой 64x64 RGBA8 на каждый используемый тайл в одном
+файле с таблицей смещений. Движок может загрузить его как texture array без
+пересчета UV, а инструменты - открыть через mmap и переписать отдельный слой.
+
+Кодирование atlas.png: тот же атлас в нескольких форматах без потерь (палитровый
+PNG, если цветов <= 256, PNG с optimize, lossless WebP), каждый проверяется
+обратным декодированием попиксельно; размеры и время декодирования - для выбора
+формата, который движок грузит быстрее всего.
+"""
+import io
+import json
+import mmap
+import os
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from atlas import GRID_SIZE, TILE_SIZE, tiles_array
+from block_data import FACE_KEYS, PROJECT_ROOT, atomic_write
+
+DEFAULT_PADDING = 8
+EXPORT_DIR = os.path.join(PROJECT_ROOT, "assets")
+
+# sRGB <-> линейное пространство: усреднение делаем в линейном, иначе мипы темнеют
+_SRGB_TO_LINEAR = np.where(np.arange(256) / 255.0 <= 0.04045,
+                           np.arange(256) / 255.0 / 12.92,
+                           ((np.arange(256) / 255.0 + 0.055) / 1.055) ** 2.4).astype(np.float32)
+
+
+def _linear_to_srgb(x):
+    x = np.clip(x, 0.0, 1.0)
+    s = np.where(x <= 0.0031308, x * 12.92, 1.055 * np.power(x, 1 / 2.4) - 0.055)
+    return np.rint(s * 255.0).astype(np.uint8)
+
+
+def tiles_4d(image, tile_size=TILE_SIZE):
+    """Атлас -> (клеток, tile, tile, 4) uint8, клетки по строкам"""
+    return tiles_array(image, tile_size).reshape(-1, tile_size, tile_size, 4)
+
+
+def downsample_tiles(tiles):
+    """2x2 box-фильтр по каждому тайлу сразу для всех тайлов.
+
+    Цвет усредняется в линейном пространстве с премультипликацией альфы,
+    чтобы прозрачные пиксели (листва, стекло) не давали темную кайму.
+    """
+    n, t = tiles.shape[0], tiles.shape[1]
+    if t < 2:
+        return tiles
+    rgb = _SRGB_TO_LINEAR[tiles[..., :3]]
+    alpha = tiles[..., 3:4].astype(np.float32) / 255.0
+    premul = np.concatenate([rgb * alpha, alpha], axis=-1)
+    avg = premul.reshape(n, t // 2, 2, t // 2, 2, 4).mean(axis=(2, 4))
+    a = avg[..., 3:4]
+    color = np.divide(avg[..., :3], a, out=np.zeros_like(avg[..., :3]), where=a > 0)
+    out = np.empty(avg.shape, dtype=np.uint8)
+    out[..., :3] = _linear_to_srgb(color)
+    out[..., 3] = np.rint(a[..., 0] * 255.0).astype(np.uint8)
+    return out
+
+
+def pad_tiles(tiles, padding):
+    """Поля padding пикселей с каждой стороны, краевыми пикселями тайла"""
+    return np.pad(tiles, ((0, 0), (padding, padding), (padding, padding), (0, 0)), mode="edge")
+
+
+def assemble(cells, grid=GRID_SIZE):
+    """(grid*grid, c, c, 4) -> изображение (grid*c, grid*c, 4)"""
+    c = cells.shape[1]
+    return np.ascontiguousarray(cells.reshape(grid, grid, c, c, 4).transpose(0, 2, 1, 3, 4)).reshape(grid * c, grid * c, 4)
+
+
+def mip_level_count(tile_size, padding):
+    """Сколько уровней оставляют тайл и поле целыми.
+
+    На каждом уровне поле одинаковое со всех сторон, поэтому начало тайла в клетке -
+    ровно padding / 2^level, и UV-отступ уровня 0 (uvInset) верен на всех уровнях.
+    Дальше пришлось бы сдвигать тайл на полпикселя - там цепочка обрывается.
+    """
+    levels = 1
+    while tile_size % 2 == 0 and tile_size > 1 and padding % 2 == 0:
+        tile_size //= 2
+        padding //= 2
+        levels += 1
+    return levels
+
+
+def build_padded_mips(image, padding=DEFAULT_PADDING, levels=None):
+    """Возвращает список уровней [(H, W, 4) uint8], уровень 0 - полный размер"""
+    tiles = tiles_4d(image)
+    max_levels = mip_level_count(TILE_SIZE, padding)
+    levels = max_levels if levels is None else min(levels, max_levels)
+
+    chain = []
+    for level in range(levels):
+        chain.append(assemble(pad_tiles(tiles, padding >> level)))
+        tiles = downsample_tiles(tiles)
+    return chain
+
+
+def block_uv_rects(blocks, padding=DEFAULT_PADDING):
+    """UV-прямоугольники [u0, v0, u1, v1] граней блоков в атласе с полями (v снизу вверх, как в шейдере)"""
+    cell = TILE_SIZE + 2 * padding
+    size = cell * GRID_SIZE
+    rects = {}
+    for b in blocks:
+        faces = {}
+        for key, face in zip(FACE_KEYS, ("side", "top", "bottom")):
+            col, row = b.get(key) or b['atlas']
+            u0 = (col * cell + padding) / size
+            v1 = 1.0 - (row * cell + padding) / size
+            faces[face] = [round(u0, 6), round(v1 - TILE_SIZE / size, 6),
+                           round(u0 + TILE_SIZE / size, 6), round(v1, 6)]
+        rects[str(b['id'])] = faces
+    return rects
+
+
+def export_padded_atlas(image, blocks, out_dir=EXPORT_DIR, name="atlas_padded", padding=DEFAULT_PADDING, levels=None):
+    """Пишет name.png, name_mip1.png, ... и name.json с параметрами для движка"""
+    from PIL import Image
+
+    chain = build_padded_mips(image, padding, levels)
+    cell = TILE_SIZE + 2 * padding
+    size = cell * GRID_SIZE
+    files = []
+    for level, pixels in enumerate(chain):
+        file_name = f"{name}.png" if level == 0 else f"{name}_mip{level}.png"
+        Image.fromarray(pixels, "RGBA").save(os.path.join(out_dir, file_name))
+        files.append({"file": file_name, "width": pixels.shape[1], "height": pixels.shape[0]})
+
+    meta = {
+        "tileSize": TILE_SIZE,
+        "padding": padding,
+        "cellSize": cell,
+        "grid": GRID_SIZE,
+        "atlasSize": size,
+        # Для шейдера: uTilePadding = padding / atlasSize, ATLAS_SIZE = atlasSize
+        "uvInset": padding / size,
+        "levels": files,
+        "blocks": block_uv_rects(blocks, padding),
+    }
+    with open(os.path.join(out_dir, f"{name}.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+# --- МАССИВ ТЕКСТУР (один слой на тайл) ---
+#
+# Формат файла (little-endian):
+#   заголовок  ARRAY_HEADER: magic, версия, ширина/высота слоя, число слоев, сетка атласа,
+#              смещения таблицы слоев, карты клеток и данных
+#   слои       ARRAY_LAYER * layers: смещение данных слоя, размер, клетка атласа (col, row)
+#   клетки     int16 * grid*grid: номер слоя для клетки атласа (row * grid + col) или -1
+#   данные     слои RGBA8 подряд, начало выровнено по странице - удобно для mmap
+ARRAY_MAGIC = b"VXTA"
+ARRAY_VERSION = 1
+ARRAY_HEADER = struct.Struct("<4sHHHHIHHIII")
+ARRAY_LAYER = struct.Struct("<QIBBH")
+ARRAY_ALIGN = 4096
+
+
+def referenced_cells(blocks):
+    """Клетки, на которые ссылаются грани блоков, в порядке (row, col)"""
+    cells = {tuple(b[key]) for b in blocks for key in FACE_KEYS if b.get(key)}
+    return sorted(cells, key=lambda c: (c[1], c[0]))
+
+
+def build_texture_array(image, blocks, tile_size=TILE_SIZE):
+    """Возвращает (слои (N, tile, tile, 4), карта клеток grid*grid int16, клетка каждого слоя).
+
+    В массив попадают только используемые клетки, одинаковые тайлы делят один слой.
+    """
+    tiles = tiles_4d(image, tile_size)
+    grid = int(round(len(tiles) ** 0.5))
+    cell_map = np.full(grid * grid, -1, dtype=np.int16)
+    layers, layer_cells, by_bytes = [], [], {}
+    for col, row in referenced_cells(blocks):
+        if not (0 <= col < grid and 0 <= row < grid):
+            raise ValueError(f"Block references cell [{col}, {row}] outside the atlas")
+        i = row * grid + col
+        key = tiles[i].tobytes()
+        layer = by_bytes.get(key)
+        if layer is None:
+            layer = by_bytes[key] = len(layers)
+            layers.append(tiles[i])
+            layer_cells.append((col, row))
+        cell_map[i] = layer
+    stack = np.stack(layers) if layers else np.zeros((0, tile_size, tile_size, 4), np.uint8)
+    return stack, cell_map, layer_cells
+
+
+def pack_texture_array(layers, cell_map, layer_cells):
+    """Собирает файл массива текстур в bytes"""
+    count, height, width = layers.shape[:3]
+    grid = int(round(len(cell_map) ** 0.5))
+    layer_size = height * width * 4
+    index_offset = ARRAY_HEADER.size
+    cells_offset = index_offset + ARRAY_LAYER.size * count
+    data_offset = -(-(cells_offset + cell_map.nbytes) // ARRAY_ALIGN) * ARRAY_ALIGN
+
+    out = bytearray(data_offset + layer_size * count)
+    ARRAY_HEADER.pack_into(out, 0, ARRAY_MAGIC, ARRAY_VERSION, 0, width, height, count, grid, 0,
+                           index_offset, cells_offset, data_offset)
+    for n, (col, row) in enumerate(layer_cells):
+        ARRAY_LAYER.pack_into(out, index_offset + n * ARRAY_LAYER.size,
+                              data_offset + n * layer_size, layer_size, col, row, 0)
+    out[cells_offset:cells_offset + cell_map.nbytes] = cell_map.astype("<i2").tobytes()
+    out[data_offset:] = np.ascontiguousarray(layers).tobytes()
+    return bytes(out)
+
+
+def export_texture_array(image, blocks, path):
+    """Пишет массив текстур в path. Возвращает число слоев"""
+    layers, cell_map, layer_cells = build_texture_array(image, blocks)
+    atomic_write(path, pack_texture_array(layers, cell_map, layer_cells))
+    return len(layers)
+
+
+class TextureArrayFile:
+    """Файл массива текстур через mmap: слои читаются без копирования, слой можно переписать на месте"""
+
+    def __init__(self, path, writable=False):
+        self.path = path
+        self._file = open(path, "r+b" if writable else "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        (magic, version, _, self.width, self.height, self.layers, self.grid, _,
+         index_offset, cells_offset, self.data_offset) = ARRAY_HEADER.unpack_from(self._mm, 0)
+        if magic != ARRAY_MAGIC:
+            self.close()
+            raise ValueError(f"{path}: not a texture array file")
+        if version != ARRAY_VERSION:
+            self.close()
+            raise ValueError(f"{path}: unsupported texture array version {version}")
+        self.index = [ARRAY_LAYER.unpack_from(self._mm, index_offset + n * ARRAY_LAYER.size)[:4]
+                      for n in range(self.layers)]
+        self.cell_map = np.frombuffer(self._mm, dtype="<i2", count=self.grid * self.grid, offset=cells_offset)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._mm is not None:
+            self.cell_map = None
+            self._mm.close()
+            self._file.close()
+            self._mm = None
+
+    def layer(self, n):
+        """Слой n как массив (height, width, 4) поверх mmap"""
+        offset, size = self.index[n][:2]
+        return np.frombuffer(self._mm, dtype=np.uint8, count=size, offset=offset).reshape(self.height, self.width, 4)
+
+    def layer_for_cell(self, col, row):
+        n = int(self.cell_map[row * self.grid + col])
+        return None if n < 0 else n
+
+    def patch_layer(self, n, pixels):
+        """Переписывает один слой на месте; остальной файл не трогается"""
+        offset, size = self.index[n][:2]
+        data = np.ascontiguousarray(pixels, dtype=np.uint8)
+        if data.nbytes != size:
+            raise ValueError(f"Layer {n} expects {self.width}x{self.height} RGBA pixels")
+        self._mm[offset:offset + size] = data.tobytes()
+        self._mm.flush(offset - offset % mmap.ALLOCATIONGRANULARITY,
+                       size + offset % mmap.ALLOCATIONGRANULARITY)
+
+
+# --- КОДИРОВАНИЕ АТЛАСА (без потерь) ---
+
+def rgba_words(image):
+    """RGBA-изображение -> (H, W) uint32, один пиксель - одно число"""
+    pixels = np.ascontiguousarray(np.asarray(image.convert("RGBA") if image.mode != "RGBA" else image))
+    return pixels.view(np.uint32)[..., 0]
+
+
+def color_stats(image, tile_size=TILE_SIZE):
+    """Число цветов (RGBA) во всем атласе и в каждой клетке"""
+    colors = np.unique(rgba_words(image))
+    tiles = np.sort(tiles_array(image, tile_size).view(np.uint32), axis=1)
+    per_tile = (tiles[:, 1:] != tiles[:, :-1]).sum(axis=1) + 1
+    opaque = tiles[:, 0] >> 24 == 0xFF  # после сортировки минимум по старшему байту - альфа
+    empty = tiles[:, -1] >> 24 == 0
+    return {
+        "colors": len(colors),
+        "tile_colors": per_tile,
+        "max_tile_colors": int(per_tile.max()) if len(per_tile) else 0,
+        "empty_tiles": int(empty.sum()),
+        "opaque": bool((colors >> 24 == 0xFF).all()),
+        "opaque_tiles": int(opaque.sum()),
+    }
+
+
+def _save(image, fmt, **params):
+    buf = io.BytesIO()
+    image.save(buf, fmt, **params)
+    return buf.getvalue()
+
+
+def encode_png(image):
+    """PNG как его пишет Atlas.save (настройки Pillow по умолчанию)"""
+    return _save(image, "PNG")
+
+
+def encode_png_optimized(image):
+    """Меньший из PNG с optimize и PNG с zlib 9; без прозрачности - RGB"""
+    if np.asarray(image.getchannel("A")).min() == 255:
+        image = image.convert("RGB")
+    return min((_save(image, "PNG", optimize=True), _save(image, "PNG", compress_level=9)), key=len)
+
+
+def encode_png_indexed(image):
+    """Палитровый PNG, если в атласе не больше 256 цветов RGBA (иначе None).
+
+    Палитра точная, без квантования: полупрозрачные цвета идут первыми, чтобы
+    таблица прозрачности tRNS была короче.
+    """
+    from PIL import Image
+
+    words = rgba_words(image)
+    colors, inverse = np.unique(words, return_inverse=True)
+    if len(colors) > 256:
+        return None
+    order = np.argsort(colors >> 24 == 0xFF, kind="stable")
+    rank = np.empty(len(colors), dtype=np.uint8)
+    rank[order] = np.arange(len(colors), dtype=np.uint8)
+    indexed = Image.fromarray(rank[inverse].reshape(words.shape), "P")
+    indexed.putpalette(colors[order].view(np.uint8).tobytes(), "RGBA")
+    return _save(indexed, "PNG", optimize=True)
+
+
+def encode_webp_lossless(image):
+    """Lossless WebP; exact - не трогать RGB под полностью прозрачными пикселями"""
+    return _save(image, "WEBP", lossless=True, quality=100, method=6, exact=True)
+
+
+# формат -> (расширение, кодировщик)
+ATLAS_ENCODINGS = {
+    "png": (".png", encode_png),
+    "png-optimized": (".png", encode_png_optimized),
+    "png-indexed": (".png", encode_png_indexed),
+    "webp-lossless": (".webp", encode_webp_lossless),
+}
+
+
+def decode_rgba(data):
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as img:
+        return img.convert("RGBA")
+
+
+def _encode_one(fmt, image, reference, decode_repeat):
+    ext, encode = ATLAS_ENCODINGS[fmt]
+    t0 = time.perf_counter()
+    data = encode(image)
+    encode_s = time.perf_counter() - t0
+    result = {"format": fmt, "ext": ext, "data": data, "bytes": len(data) if data else None,
+              "encode_ms": encode_s * 1000, "decode_ms": None, "exact": False}
+    if data is None:
+        return result
+    best = float("inf")
+    for _ in range(max(1, decode_repeat)):
+        t0 = time.perf_counter()
+        decoded = decode_rgba(data)
+        best = min(best, time.perf_counter() - t0)
+    result["decode_ms"] = best * 1000
+    result["exact"] = decoded.size == image.size and np.array_equal(rgba_words(decoded), reference)
+    return result
+
+
+def encode_atlas(image, formats=None, workers=None, decode_repeat=3):
+    """Кодирует атлас во все форматы параллельно (Pillow отпускает GIL при сжатии).
+
+    Возвращает список результатов по возрастанию размера: format, ext, data, bytes,
+    encode_ms, decode_ms (лучшее из decode_repeat) и exact - совпал ли каждый пиксель
+    после декодирования. data None - формат не подходит (например, больше 256 цветов).
+    """
+    image = image.convert("RGBA") if image.mode != "RGBA" else image
+    reference = rgba_words(image)
+    formats = list(formats or ATLAS_ENCODINGS)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Каждому потоку своя копия: Image.save не рассчитан на общий образ
+        futures = [executor.submit(_encode_one, fmt, image.copy(), reference, decode_repeat) for fmt in formats]
+        results = [f.result() for f in futures]
+    return sorted(results, key=lambda r: (r["bytes"] is None, r["bytes"] or 0))
+
+
+def smallest_exact(results, exts=None):
+    """Самый маленький результат, прошедший проверку (только с расширением из exts, если задано)"""
+    for r in results:
+        if r["exact"] and (exts is None or r["ext"] in exts):
+            return r
+    return None
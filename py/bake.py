@@ -0,0 +1,230 @@
+"""Запекание регионов на всех ядрах.
+
+Чанки генерируются и кодируются в процессах ProcessPoolExecutor; закодированные
+данные воркер пишет в общий буфер (SharedMemory), через pickle идут только смещения.
+Каждый чанк кешируется на диске под ключом
+(версия генератора, координаты, хеш реестра блоков, id блоков рельефа),
+поэтому повторное запекание после правки пересчитывает только то, что изменилось.
+
+    python py/bake.py 0 0 1 1                  # регионы [0..1] x [0..1]
+    python py/bake.py 0 0 0 0 --scaling        # chunks/sec на 1, 2, 4... процессах
+"""
+import argparse
+import hashlib
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from multiprocessing import shared_memory
+
+import block_data
+import region
+import terrain
+from region import REGION_SIZE
+
+DEFAULT_OUT_DIR = os.path.join(block_data.PROJECT_ROOT, "assets", "regions")
+DEFAULT_CACHE_DIR = os.path.join(block_data.PROJECT_ROOT, ".cache", "chunks")
+DEFAULT_BATCH = 64
+
+CACHE_ENTRY = struct.Struct("<HBB")  # длина палитры, бит на воксель, кодирование; дальше payload
+# Худший случай payload: палитра 256 + 8 бит на воксель
+MAX_PAYLOAD = 256 + terrain.CHUNK_VOLUME
+
+
+def chunk_key(chunk_x, chunk_z, registry):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{terrain.GENERATOR_VERSION}|{chunk_x}|{chunk_z}|{registry}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def registry_key(blocks, ids):
+    """Часть ключа кеша, зависящая от реестра: хеш BLOCK_DATA + id блоков рельефа"""
+    terrain_ids = ",".join(f"{name}={ids[name]}" for name in terrain.TERRAIN_BLOCKS)
+    return f"{block_data.registry_hash(blocks):016x}|{terrain_ids}"
+
+
+class ChunkCache:
+    """Закодированные чанки в файлах cache_dir/ab/abcdef..."""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        if len(data) < CACHE_ENTRY.size:
+            return None
+        palette_len, bits, encoding = CACHE_ENTRY.unpack_from(data)
+        return data[CACHE_ENTRY.size:], palette_len, bits, encoding
+
+    def put(self, key, encoded):
+        payload, palette_len, bits, encoding = encoded
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Без fsync: потерянная запись кеша просто пересчитается
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(CACHE_ENTRY.pack(palette_len, bits, encoding))
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+
+def bake_task(shm_name, coords, ids):
+    """Воркер: генерирует и кодирует чанки coords, пишет payload подряд в общий буфер.
+
+    Возвращает [(chunk_x, chunk_z, offset, size, palette_len, bits, encoding), ...].
+    """
+    # Воркеры пула делят resource_tracker с родителем: сегмент удаляет только родитель (unlink)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        out, offset = [], 0
+        for chunk_x, chunk_z in coords:
+            payload, palette_len, bits, encoding = region.encode_chunk(terrain.generate_chunk(chunk_x, chunk_z, ids))
+            shm.buf[offset:offset + len(payload)] = payload
+            out.append((chunk_x, chunk_z, offset, len(payload), palette_len, bits, encoding))
+            offset += len(payload)
+        return out
+    finally:
+        shm.close()
+
+
+def bake_chunks(coords, ids, registry, workers=None, cache=None, batch=DEFAULT_BATCH, executor=None):
+    """Закодированные чанки {(chunk_x, chunk_z): encoded} для coords.
+
+    Попадания в кеш не считаются заново; остальное раздается процессам пачками по batch чанков.
+    Возвращает (чанки, число попаданий в кеш).
+    """
+    result, misses = {}, []
+    for c in coords:
+        encoded = cache.get(chunk_key(c[0], c[1], registry)) if cache else None
+        if encoded:
+            result[c] = encoded
+        else:
+            misses.append(c)
+    hits = len(result)
+    if not misses:
+        return result, hits
+
+    tasks = [misses[i:i + batch] for i in range(0, len(misses), batch)]
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    pending, buffers = set(), {}
+    try:
+        limit = 2 * (workers or os.cpu_count() or 1)  # в полете не больше двух пачек на процесс
+        while tasks or pending:
+            while tasks and len(pending) < limit:
+                chunk_coords = tasks.pop()
+                shm = shared_memory.SharedMemory(create=True, size=MAX_PAYLOAD * len(chunk_coords))
+                future = executor.submit(bake_task, shm.name, chunk_coords, ids)
+                buffers[future] = shm
+                pending.add(future)
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                shm = buffers.pop(future)
+                try:
+                    for chunk_x, chunk_z, offset, size, palette_len, bits, encoding in future.result():
+                        encoded = (bytes(shm.buf[offset:offset + size]), palette_len, bits, encoding)
+                        result[(chunk_x, chunk_z)] = encoded
+                        if cache:
+                            cache.put(chunk_key(chunk_x, chunk_z, registry), encoded)
+                finally:
+                    shm.close()
+                    shm.unlink()
+    finally:
+        for shm in buffers.values():
+            shm.close()
+            shm.unlink()
+        if own_executor:
+            executor.shutdown()
+    return result, hits
+
+
+def region_coords(region_x, region_z):
+    x0, z0 = region_x * REGION_SIZE, region_z * REGION_SIZE
+    return [(x0 + lx, z0 + lz) for lz in range(REGION_SIZE) for lx in range(REGION_SIZE)]
+
+
+def bake_regions(regions, out_dir, constants_path=block_data.CONSTANTS_PATH, workers=None, cache_dir=None,
+                 batch=DEFAULT_BATCH):
+    """Запекает регионы [(region_x, region_z), ...]. Возвращает статистику"""
+    ids = terrain.load_block_ids(constants_path)
+    blocks = block_data.load_block_file(constants_path).blocks
+    registry = registry_key(blocks, ids)
+    cache = ChunkCache(cache_dir) if cache_dir else None
+    os.makedirs(out_dir, exist_ok=True)
+
+    stats = {"chunks": 0, "cached": 0, "bytes": 0, "seconds": 0.0}
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for region_x, region_z in regions:
+            coords = region_coords(region_x, region_z)
+            chunks, hits = bake_chunks(coords, ids, registry, workers, cache, batch, executor)
+            local = {(cx - region_x * REGION_SIZE, cz - region_z * REGION_SIZE): enc for (cx, cz), enc in chunks.items()}
+            path = os.path.join(out_dir, region.region_file_name(region_x, region_z))
+            stats["bytes"] += region.write_region(path, region_x, region_z, local, block_data.registry_hash(blocks))
+            stats["chunks"] += len(coords)
+            stats["cached"] += hits
+    stats["seconds"] = time.perf_counter() - t0
+    return stats
+
+
+def _report(stats, workers):
+    generated = stats["chunks"] - stats["cached"]
+    rate = stats["chunks"] / stats["seconds"] if stats["seconds"] else 0.0
+    print(f"{stats['chunks']} chunks ({generated} generated, {stats['cached']} cached) "
+          f"on {workers} processes in {stats['seconds']:.2f} s: {rate:.0f} chunks/s, "
+          f"{stats['bytes'] / 1024:.0f} KB written")
+
+
+def cmd_scaling(args, regions):
+    """Одна и та же работа без кеша на 1, 2, 4... процессах"""
+    counts, n = [], 1
+    while n < args.workers:
+        counts.append(n)
+        n *= 2
+    counts.append(args.workers)
+    print(f"{'procs':>6} {'seconds':>9} {'chunks/s':>9} {'speedup':>8}")
+    base = None
+    for n in counts:
+        stats = bake_regions(regions, args.out_dir, args.constants, n, None, args.batch)
+        rate = stats["chunks"] / stats["seconds"]
+        base = base or rate
+        print(f"{n:>6} {stats['seconds']:>9.2f} {rate:>9.0f} {rate / base:>7.2f}x")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="bake", description="Bake terrain regions on all cores")
+    parser.add_argument("region_x0", type=int)
+    parser.add_argument("region_z0", type=int)
+    parser.add_argument("region_x1", type=int)
+    parser.add_argument("region_z1", type=int)
+    parser.add_argument("--out-dir", default=DEFAULT_OUT_DIR)
+    parser.add_argument("--constants", default=block_data.CONSTANTS_PATH)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH, help="Chunks per worker task")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--scaling", action="store_true", help="Compare chunks/sec across process counts (no cache)")
+    args = parser.parse_args(argv)
+
+    regions = [(rx, rz) for rz in range(min(args.region_z0, args.region_z1), max(args.region_z0, args.region_z1) + 1)
+               for rx in range(min(args.region_x0, args.region_x1), max(args.region_x0, args.region_x1) + 1)]
+    if args.scaling:
+        return cmd_scaling(args, regions)
+    stats = bake_regions(regions, args.out_dir, args.constants, args.workers,
+                         None if args.no_cache else args.cache_dir, args.batch)
+    _report(stats, args.workers)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
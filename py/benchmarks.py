@@ -0,0 +1,339 @@
+"""Замеры скорости для данных редактора на синтетических реестрах и атласах.
+
+    python py/benchmarks.py parse --sizes 100 1000 10000
+    python py/benchmarks.py save
+    python py/benchmarks.py suite [--out result.json] [--compare old.json]
+
+suite прогоняет горячие пути редактора (разбор и сохранение constants.js, декодирование
+атласа, отрисовка AtlasWidget, get_tile_pixmap, вставка тайла и запись atlas.png) без окна,
+на Qt offscreen, и пишет JSON с временем и пиком памяти каждой операции в
+.cache/benchmarks/<время>-<коммит>.json. --compare показывает, что стало медленнее.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import block_data
+from block_data import PROJECT_ROOT
+
+SOUND_NAMES = ("stone", "wood", "grass", "dirt")
+RESULTS_DIR = os.path.join(PROJECT_ROOT, ".cache", "benchmarks")
+SUITE_BLOCKS = (100, 1000, 10000)
+SUITE_ATLASES = (1024, 4096, 8192)
+REGRESSION_RATIO = 1.2
+REGRESSION_MIN_MS = 1.0  # разница меньше - шум таймера, не регрессия
+VIEWPORT = 800  # сторона видимой части атласа при замере отрисовки
+
+
+def make_blocks(count):
+    """Синтетический реестр: count блоков с разными гранями и звуками"""
+    blocks = []
+    for i in range(count):
+        b = block_data.new_block(i, f"Block_{i}")
+        b["atlas"] = [i % 16, (i // 16) % 16]
+        if i % 3 == 0: b["atlasTop"] = [(i + 1) % 16, (i // 16) % 16]
+        if i % 5 == 0: b["atlasBottom"] = [(i + 2) % 16, (i // 16) % 16]
+        b["transparent"] = i % 7 == 0
+        b["solid"] = i % 11 != 0
+        if i % 4:
+            s = SOUND_NAMES[i % len(SOUND_NAMES)]
+            b["sound"] = {"step": f"{s}_step", "break": f"{s}_break", "place": f"{s}_place"}
+        blocks.append(b)
+    return blocks
+
+
+def make_constants(count):
+    """Текст constants.js с count блоками"""
+    return ("export const WORLD_CONFIG = {\n    ATLAS_GRID: 16\n};\n\n"
+            f"export const BLOCK_DATA = [{block_data.format_block_data(make_blocks(count))}];\n\n"
+            "export const BLOCKS = {};\nBLOCK_DATA.forEach(b => BLOCKS[b.id] = b);\n")
+
+
+def timed(func, repeat=3):
+    """Лучшее время из repeat запусков, в секундах"""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench_parse(sizes, repeat=3):
+    print(f"{'blocks':>8} {'size KB':>9} {'parse ms':>10} {'us/block':>9}")
+    for n in sizes:
+        content = make_constants(n)
+        t = timed(lambda: block_data.parse_block_file(content), repeat)
+        print(f"{n:>8} {len(content) / 1024:>9.1f} {t * 1000:>10.2f} {t * 1e6 / n:>9.2f}")
+
+
+def bench_save(sizes, repeat=3):
+    """Сохранение после правки одного блока: сплайс против полной перегенерации"""
+    print(f"{'blocks':>8} {'splice ms':>10} {'full ms':>9}")
+    for n in sizes:
+        bf = block_data.parse_block_file(make_constants(n))
+        bf.blocks[n // 2]["name"] = "Edited"
+        t_splice = timed(lambda: bf.render(bf.blocks), repeat)
+        t_full = timed(lambda: bf._render_full(bf.blocks), repeat)
+        print(f"{n:>8} {t_splice * 1000:>10.2f} {t_full * 1000:>9.2f}")
+
+
+# --- SUITE ---
+
+def _rss_reset():
+    """Сбрасывает пик RSS процесса (VmHWM); False, если ядро этого не умеет"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _proc_status_kb(field):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def measure(op, params, func, repeat=3, setup=None):
+    """Лучшее время из repeat запусков + пик памяти отдельным запуском.
+
+    peak_py - пик выделений Python (tracemalloc), peak_rss - прирост пикового RSS
+    (ловит и память Qt/Pillow/NumPy вне Python), None - если /proc недоступен.
+    """
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t0)
+
+    if setup:
+        setup()
+    rss_before = _proc_status_kb("VmRSS") if _rss_reset() else None
+    tracemalloc.start()
+    try:
+        func()
+        peak_py = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    rss_peak = _proc_status_kb("VmHWM") if rss_before is not None else None
+
+    result = {
+        "op": op, "params": params,
+        "best_ms": min(times) * 1000, "mean_ms": sum(times) / len(times) * 1000,
+        "peak_py_bytes": peak_py,
+        "peak_rss_bytes": max(0, rss_peak - rss_before) * 1024 if rss_peak is not None else None,
+    }
+    label = " ".join(f"{k}={v}" for k, v in params.items())
+    print(f"{op:<34} {label:<16} {result['best_ms']:>10.2f} ms  py {peak_py / 1048576:>8.1f} MB"
+          + (f"  rss {result['peak_rss_bytes'] / 1048576:>8.1f} MB" if rss_peak is not None else ""), flush=True)
+    return result
+
+
+def make_atlas_png(path, size, tile_size):
+    """Синтетический атлас: у каждой клетки свой цвет поверх общего шума"""
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(size)
+    grid = size // tile_size
+    noise = rng.integers(0, 48, size=(tile_size, tile_size, 4), dtype=np.uint8)
+    noise[..., 3] = 0
+    colors = rng.integers(0, 256, size=(grid, grid, 4), dtype=np.uint8)
+    colors[..., 3] = 255
+    colors[grid // 2:, grid // 2:, 3] = 0  # четверть атласа пустая, как у реального
+    pixels = np.repeat(np.repeat(colors, tile_size, axis=0), tile_size, axis=1)
+    pixels ^= np.tile(noise, (grid, grid, 1))
+    pixels[..., 3] = np.repeat(np.repeat(colors[..., 3], tile_size, axis=0), tile_size, axis=1)
+    Image.fromarray(pixels, "RGBA").save(path)
+
+
+def suite_registry(n, tmp, repeat):
+    content = make_constants(n)
+    bf = block_data.parse_block_file(content)
+    raw = content[bf.array_span[0] + 1:bf.array_span[1] - 1]
+    path = os.path.join(tmp, f"constants_{n}.js")
+    block_data.atomic_write(path, content)
+    bf.path = path
+    edited = bf.blocks[n // 2]
+    names = [edited["name"], "Edited"]
+
+    def toggle_name():
+        edited["name"] = names[edited["name"] == names[0]]
+
+    params = {"blocks": n}
+    return [
+        measure("parse_block_file", params, lambda: block_data.parse_block_file(content), repeat),
+        measure("_parse_js_array", params, lambda: block_data.parse_js_array(raw), repeat),
+        measure("save_to_file (one block edited)", params, lambda: bf.save(bf.blocks), repeat, setup=toggle_name),
+    ]
+
+
+def suite_atlas(size, tmp, repeat):
+    from PIL import Image
+    from PySide6.QtCore import QRect
+
+    import block_editor
+    from atlas import Atlas, TILE_SIZE
+
+    path = os.path.join(tmp, f"atlas_{size}.png")
+    make_atlas_png(path, size, TILE_SIZE)
+    params = {"atlas": size}
+    results = [measure("read_atlas_image (QImage decode)", params, lambda: block_editor.read_atlas_image(path), repeat)]
+
+    grid = size // TILE_SIZE
+    results.append(measure("read_atlas_pages (decode + pages)", params,
+                           lambda: block_editor.read_atlas_pages(path, size).close(), repeat))
+
+    widget = block_editor.AtlasWidget(size, grid)
+    widget.set_atlas_image(block_editor.read_atlas_pages(path, size))
+    widget.resize(VIEWPORT, VIEWPORT)
+    viewport = QRect(0, 0, VIEWPORT, VIEWPORT)
+    results.append(measure("AtlasWidget paint (zoom 1, cold)", params, lambda: widget.grab(viewport), repeat,
+                           setup=widget.pyramid.clear))
+    results.append(measure("AtlasWidget paint (zoom 1, warm)", params, lambda: widget.grab(viewport), repeat))
+    widget.set_zoom(widget.min_zoom)
+    results.append(measure("AtlasWidget paint (min zoom, cold)", params, lambda: widget.grab(viewport), repeat,
+                           setup=widget.pyramid.clear))
+    results.append(measure("AtlasWidget paint (min zoom, warm)", params, lambda: widget.grab(viewport), repeat))
+
+    cells = [(col, row) for row in range(min(16, grid)) for col in range(min(16, grid))]
+
+    def tiles():
+        for col, row in cells:
+            widget.get_tile_pixmap(col, row)
+
+    results.append(measure("get_tile_pixmap x256 (cold)", params, tiles, repeat, setup=widget.tile_cache.clear))
+    results.append(measure("get_tile_pixmap x256 (warm)", params, tiles, repeat))
+    widget.set_atlas_image(None)  # закрывает файл страниц
+    widget.deleteLater()
+
+    atlas = Atlas(os.path.join(tmp, f"atlas_{size}_out.png"))
+
+    def decode():
+        with Image.open(path) as img:
+            atlas.image = img.convert("RGBA")
+
+    results.append(measure("PIL decode (Atlas image)", params, decode, repeat))
+    tile = Image.new("RGBA", (TILE_SIZE, TILE_SIZE), (200, 120, 40, 255))
+    results.append(measure("upload: PIL paste", params, lambda: atlas.paste_tile(3, 5, tile), repeat))
+    results.append(measure("upload: atlas.png save", params, atlas.save, repeat))
+    return results
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "diff", "--quiet", "HEAD"], cwd=PROJECT_ROOT).returncode != 0
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return commit + ("-dirty" if dirty else "")
+
+
+def run_suite(blocks=SUITE_BLOCKS, atlases=SUITE_ATLASES, repeat=3):
+    """Все замеры suite; Qt поднимается без окна (offscreen)"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    import PySide6
+    from PySide6.QtWidgets import QApplication
+
+    app = QApplication.instance() or QApplication(["benchmarks"])
+    results = []
+    with tempfile.TemporaryDirectory(prefix="block-bench-") as tmp:
+        for n in blocks:
+            results.extend(suite_registry(n, tmp, repeat))
+        for size in atlases:
+            results.extend(suite_atlas(size, tmp, repeat))
+            app.processEvents()  # deleteLater виджетов
+    return {
+        "commit": git_commit(),
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "qt": PySide6.__version__,
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def _result_key(r):
+    return r["op"], tuple(sorted(r["params"].items()))
+
+
+def compare_results(old, new, threshold=REGRESSION_RATIO):
+    """Печатает отношение времени new/old по каждой операции; возвращает число регрессий"""
+    before = {_result_key(r): r for r in old["results"]}
+    print(f"\nCompared with {old.get('commit', '?')} ({old.get('created', '?')}):")
+    regressions = 0
+    for r in new["results"]:
+        prev = before.get(_result_key(r))
+        if not prev or not prev["best_ms"]:
+            continue
+        ratio = r["best_ms"] / prev["best_ms"]
+        flag = ""
+        if ratio > threshold and r["best_ms"] - prev["best_ms"] > REGRESSION_MIN_MS:
+            flag = "  REGRESSION"
+            regressions += 1
+        label = " ".join(f"{k}={v}" for k, v in r["params"].items())
+        print(f"{r['op']:<34} {label:<16} {prev['best_ms']:>10.2f} -> {r['best_ms']:>10.2f} ms  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def bench_suite(args):
+    report = run_suite(args.blocks, args.atlases, args.repeat)
+    out = args.out or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{report['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {out}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            if compare_results(json.load(f), report, args.threshold):
+                return 1
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("parse", help="BLOCK_DATA parse time on generated registries")
+    p.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    p.add_argument("--repeat", type=int, default=3)
+    p = sub.add_parser("save", help="constants.js save time after a single-block edit")
+    p.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    p.add_argument("--repeat", type=int, default=3)
+    p = sub.add_parser("suite", help="editor hot paths on synthetic registries and atlases (headless Qt), JSON results")
+    p.add_argument("--blocks", type=int, nargs="+", default=list(SUITE_BLOCKS))
+    p.add_argument("--atlases", type=int, nargs="+", default=list(SUITE_ATLASES))
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--out", help=f"JSON file (default: {os.path.relpath(RESULTS_DIR, PROJECT_ROOT)}/<time>-<commit>.json)")
+    p.add_argument("--compare", metavar="OLD_JSON", help="report ops that got slower than in OLD_JSON")
+    p.add_argument("--threshold", type=float, default=REGRESSION_RATIO, help="slowdown ratio counted as a regression")
+    args = parser.parse_args(argv)
+
+    if args.command == "parse":
+        bench_parse(args.sizes, args.repeat)
+    elif args.command == "save":
+        bench_save(args.sizes, args.repeat)
+    elif args.command == "suite":
+        return bench_suite(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
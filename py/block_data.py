@@ -0,0 +1,525 @@
+"""Реестр блоков: чтение и запись BLOCK_DATA из js/constants.js.
+
+Модуль не зависит от Qt, поэтому им пользуются и редактор, и консольные команды.
+"""
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+
+from js_literal import parse_at, JSParseError
+
+# --- КОНФИГУРАЦИЯ ПУТЕЙ ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+CONSTANTS_PATH = os.path.join(PROJECT_ROOT, "js", "constants.js")
+ATLAS_PATH = os.path.join(PROJECT_ROOT, "assets", "atlas.png")
+
+BLOCK_DATA_DECL_RE = re.compile(r"export\s+const\s+BLOCK_DATA\s*=\s*")
+
+# Ключи граней в порядке отображения
+FACE_KEYS = ("atlas", "atlasTop", "atlasBottom")
+FACE_ALIASES = {
+    "side": "atlas", "all": "atlas", "atlas": "atlas",
+    "top": "atlasTop", "atlastop": "atlasTop",
+    "bottom": "atlasBottom", "atlasbottom": "atlasBottom",
+}
+
+
+def new_block(nid, name="NewBlock"):
+    return {"id": nid, "name": name, "atlas": [0, 0], "atlasTop": None, "atlasBottom": None, "solid": True,
+            "transparent": False, "sound": None}
+
+
+def face_key(name):
+    """'top' / 'atlasTop' / 'side' -> ключ блока"""
+    key = FACE_ALIASES.get(str(name).lower())
+    if not key:
+        raise ValueError(f"Unknown face: {name}")
+    return key
+
+
+def _coords(value, key, where):
+    if value is None:
+        return None
+    if (not isinstance(value, list) or len(value) != 2
+            or not all(isinstance(v, int) and not isinstance(v, bool) for v in value)):
+        raise where(f"{key} must be [col, row]")
+    return [value[0], value[1]]
+
+
+def block_from_literal(obj, error=ValueError):
+    """Разобранный объект-литерал -> словарь блока. error(msg) создает исключение"""
+    bid = obj.get("id")
+    if not isinstance(bid, int) or isinstance(bid, bool):
+        raise error("block without integer id")
+    name = obj.get("name")
+    b = {"id": bid, "name": None if name is None else str(name)}
+    b["atlas"] = _coords(obj.get("atlas"), "atlas", error) or [0, 0]
+    b["atlasTop"] = _coords(obj.get("atlasTop"), "atlasTop", error)
+    b["atlasBottom"] = _coords(obj.get("atlasBottom"), "atlasBottom", error)
+    b["transparent"] = obj.get("transparent") is True
+    b["solid"] = obj.get("solid") is True
+    snd = obj.get("sound")
+    if isinstance(snd, dict):
+        b["sound"] = {k: str(snd.get(k) or "") for k in ("step", "break", "place")}
+    elif snd is None:
+        b["sound"] = None
+    else:
+        raise error("sound must be an object or null")
+    return b
+
+
+def snapshot(b):
+    """Неизменяемый слепок полей блока, которые попадают в constants.js"""
+    s = b['sound']
+    return (b['id'], b['name'], tuple(b['atlas']),
+            tuple(b['atlasTop']) if b['atlasTop'] else None,
+            tuple(b['atlasBottom']) if b['atlasBottom'] else None,
+            bool(b['transparent']), bool(b['solid']),
+            (s.get('step', ''), s.get('break', ''), s.get('place', '')) if s else None)
+
+
+def _js_str(value):
+    return "'" + str(value or "").replace("\\", "\\\\").replace("'", "\\'").replace("\n", "\\n") + "'"
+
+
+def format_block(b):
+    """Литерал одного блока, от { до } включительно"""
+    lines = ["{ ", f"        id: {b['id']}, name: {_js_str(b['name'])}, ", f"        atlas: {b['atlas']}, "]
+    if b['atlasTop']: lines.append(f"        atlasTop: {b['atlasTop']}, ")
+    if b['atlasBottom']: lines.append(f"        atlasBottom: {b['atlasBottom']}, ")
+    lines.append(f"        transparent: {str(b['transparent']).lower()}, ")
+    lines.append(f"        solid: {str(b['solid']).lower()}, ")
+    if b['sound']:
+        s = b["sound"]
+        lines.append(f"        sound: {{ step: {_js_str(s.get('step'))}, break: {_js_str(s.get('break'))}, "
+                     f"place: {_js_str(s.get('place'))} }}")
+    else:
+        lines.append("        sound: null")
+    lines.append("    }")
+    return "\n".join(lines)
+
+
+def format_block_data(blocks):
+    return "\n" + "".join(f"    {format_block(b)},\n" for b in blocks)
+
+
+# --- ТАБЛИЦЫ СВОЙСТВ ДЛЯ ДВИЖКА ---
+# Плоские массивы по id блока, которые пишутся в constants.js рядом с BLOCK_DATA:
+# меш и физика читают их вместо BLOCKS[id].transparent и т.п.
+TABLES_BEGIN = "// --- BLOCK TABLES: generated from BLOCK_DATA by py/block_editor.py, do not edit ---"
+TABLES_END = "// --- END BLOCK TABLES ---"
+_TABLES_RE = re.compile(re.escape(TABLES_BEGIN) + r".*?" + re.escape(TABLES_END), re.DOTALL)
+TABLE_SIZE = 256  # чанк хранит id в Uint8Array
+
+FLAG_DEFINED, FLAG_SOLID, FLAG_TRANSPARENT, FLAG_AIR = 1, 2, 4, 8
+
+
+def block_tables(blocks, air_id=0, grid=16):
+    """{имя: список на TABLE_SIZE id}: флаги и номера тайлов (col + row * grid) граней.
+
+    Наследование atlasTop/atlasBottom от atlas уже учтено. При повторе id, как и в
+    BLOCK_DATA.forEach(b => BLOCKS[b.id] = b), побеждает последний блок.
+    """
+    flags = [0] * TABLE_SIZE
+    side, top, bottom = [0] * TABLE_SIZE, [0] * TABLE_SIZE, [0] * TABLE_SIZE
+    for b in blocks:
+        bid = b['id']
+        if not 0 <= bid < TABLE_SIZE:
+            continue
+        flags[bid] = (FLAG_DEFINED | (FLAG_SOLID if b['solid'] else 0)
+                      | (FLAG_TRANSPARENT if b['transparent'] else 0))
+        col, row = b['atlas']
+        side[bid] = col + row * grid
+        col, row = b['atlasTop'] or b['atlas']
+        top[bid] = col + row * grid
+        col, row = b['atlasBottom'] or b['atlas']
+        bottom[bid] = col + row * grid
+    if 0 <= air_id < TABLE_SIZE:
+        flags[air_id] |= FLAG_AIR
+    return {"BLOCK_FLAGS": flags, "BLOCK_TILE_SIDE": side, "BLOCK_TILE_TOP": top, "BLOCK_TILE_BOTTOM": bottom}
+
+
+def _format_table(name, array_type, values, per_line=32):
+    rows = [", ".join(map(str, values[i:i + per_line])) for i in range(0, len(values), per_line)]
+    body = ",\n    ".join(rows)
+    return f"export const {name} = new {array_type}([\n    {body}\n]);"
+
+
+def format_block_tables(blocks, air_id=0, grid=16):
+    tables = block_tables(blocks, air_id, grid)
+    tile_type = "Uint8Array" if grid * grid <= 256 else "Uint16Array"
+    parts = [TABLES_BEGIN,
+             f"export const BLOCK_FLAG = {{ DEFINED: {FLAG_DEFINED}, SOLID: {FLAG_SOLID}, "
+             f"TRANSPARENT: {FLAG_TRANSPARENT}, AIR: {FLAG_AIR} }};",
+             f"export const BLOCK_TILE_GRID = {grid};",
+             _format_table("BLOCK_FLAGS", "Uint8Array", tables["BLOCK_FLAGS"])]
+    parts += [_format_table(name, tile_type, tables[name])
+              for name in ("BLOCK_TILE_SIDE", "BLOCK_TILE_TOP", "BLOCK_TILE_BOTTOM")]
+    parts.append(TABLES_END)
+    return "\n".join(parts)
+
+
+def with_block_tables(content, blocks, after=0):
+    """Текст constants.js с обновленными таблицами (секция ищется после позиции after)"""
+    try:
+        air_id = parse_block_enum(content).get("AIR", 0)
+    except JSParseError:
+        air_id = 0
+    try:
+        grid = parse_export(content, "WORLD_CONFIG").get("ATLAS_GRID", 16)
+    except JSParseError:
+        grid = 16
+    text = format_block_tables(blocks, air_id, grid)
+    if "\r\n" in content:
+        text = text.replace("\n", "\r\n")
+    m = _TABLES_RE.search(content, after)
+    if m:
+        return content[:m.start()] + text + content[m.end():]
+    newline = "\r\n" if "\r\n" in content else "\n"
+    return content.rstrip("\r\n") + newline * 2 + text + newline
+
+
+ITEM_SEP = ",\n    "
+_SEP_RE = re.compile(r"\s*,\s*")
+_TAIL_COMMA_RE = re.compile(r"\s*,")
+
+
+def _current_umask():
+    # os.umask() можно только переставить, и на это время (в других потоках) umask = 0 - сначала /proc
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError):
+        pass
+    mask = os.umask(0o022)
+    os.umask(mask)
+    return mask
+
+
+def atomic_write(path, data):
+    """Запись через временный файл + rename: при сбое старый файл остается целым"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=os.path.basename(path), dir=directory)
+    try:
+        if isinstance(data, str):
+            with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        else:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        else:
+            # mkstemp создает файл 0600 - новый файл получает права как у open(): 0666 с учетом umask
+            os.chmod(tmp_path, 0o666 & ~_current_umask())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class BlockFile:
+    """Текст constants.js вместе с разобранными блоками и их позициями в тексте.
+
+    При сохранении переписываются только блоки, чей слепок изменился; новые блоки
+    дописываются в конец массива, удаленные вырезаются. Остальной текст файла
+    (форматирование, комментарии) не трогается.
+    """
+
+    def __init__(self, content, blocks=None, sources=None, array_span=None, path=None, tables=True):
+        self.content = content
+        self.tables = tables  # дописывать ли таблицы свойств (with_block_tables) при сохранении
+        self.blocks = blocks or []
+        self.sources = sources or {}  # id(block) -> (block, start, end, слепок)
+        self.array_span = array_span  # (start, end) литерала [...] или None
+        self.path = path
+
+    def span_of(self, block):
+        src = self.sources.get(id(block))
+        return (src[1], src[2]) if src else None
+
+    def dirty_blocks(self, blocks):
+        """Новые и измененные блоки"""
+        sources = self.sources
+        return [b for b in blocks if id(b) not in sources or snapshot(b) != sources[id(b)][3]]
+
+    def is_dirty(self, blocks):
+        return len(blocks) != len(self.sources) or bool(self.dirty_blocks(blocks))
+
+    def render(self, blocks):
+        """Возвращает (текст, sources, array_span) для нового состояния блоков"""
+        if self.array_span is None:
+            raise ValueError("BLOCK_DATA not found")
+        c = self.content
+        arr_start, arr_end = self.array_span
+        close = arr_end - 1  # позиция ']'
+
+        current = {id(b) for b in blocks}
+        items = sorted(self.sources.values(), key=lambda src: src[1])
+        survivors = [src for src in items if id(src[0]) in current]
+        added = [b for b in blocks if id(b) not in self.sources]
+        if not survivors:
+            return self._render_full(blocks)
+
+        tail = c[items[-1][2]:close]
+        trailing_comma = _TAIL_COMMA_RE.match(tail)
+        sep = c[items[0][2]:items[1][1]] if len(items) > 1 else ITEM_SEP
+        if not _SEP_RE.fullmatch(sep):
+            sep = ITEM_SEP
+
+        pieces = [c[:items[0][1]]]
+        out_len = len(pieces[0])
+        sources = {}
+
+        def emit(b, text, snap):
+            nonlocal out_len
+            sources[id(b)] = (b, out_len, out_len + len(text), snap)
+            pieces.append(text)
+            out_len += len(text)
+
+        def emit_sep(text):
+            nonlocal out_len
+            pieces.append(text)
+            out_len += len(text)
+
+        next_start = {items[i][1]: items[i + 1][1] for i in range(len(items) - 1)}
+        for i, (b, start, end, snap) in enumerate(survivors):
+            new_snap = snapshot(b)
+            if new_snap == snap:
+                emit(b, c[start:end], snap)
+            else:
+                emit(b, format_block(b), new_snap)
+            if i + 1 < len(survivors):
+                # Исходный разделитель после блока (запятая, отступ, комментарии)
+                emit_sep(c[end:next_start[start]] if start in next_start else sep)
+
+        if added:
+            emit_sep(sep)
+            for i, b in enumerate(added):
+                emit(b, format_block(b), snapshot(b))
+                if i + 1 < len(added):
+                    emit_sep(sep)
+            if not trailing_comma:
+                tail = tail.lstrip(" \t")
+                emit_sep("" if tail.startswith("\n") else "\n")
+            else:
+                tail = tail[trailing_comma.end() - 1:]
+
+        emit_sep(tail)
+        new_close = out_len
+        pieces.append(c[close:])
+        return "".join(pieces), sources, (arr_start, new_close + 1)
+
+    def _render_full(self, blocks):
+        arr_start, arr_end = self.array_span
+        text = f"{self.content[:arr_start]}[{format_block_data(blocks)}]{self.content[arr_end:]}"
+        parsed = parse_block_file(text)
+        # Сопоставляем разобранные блоки с объектами редактора по порядку записи
+        sources = {id(b): (b, src[1], src[2], src[3])
+                   for b, src in zip(blocks, sorted(parsed.sources.values(), key=lambda s: s[1]))}
+        return text, sources, parsed.array_span
+
+    def save(self, blocks, path=None):
+        """Пишет файл, только если что-то изменилось. Возвращает True, если запись была"""
+        path = path or self.path
+        if self.is_dirty(blocks):
+            content, sources, array_span = self.render(blocks)
+        else:
+            content, sources, array_span = self.content, self.sources, self.array_span
+        if self.tables and array_span:
+            # Таблицы стоят после BLOCK_DATA, поэтому позиции блоков в sources не сдвигаются
+            content = with_block_tables(content, blocks, array_span[1])
+        if content == self.content:
+            self.blocks = blocks
+            return False
+        atomic_write(path, content)
+        self.content, self.sources, self.array_span = content, sources, array_span
+        self.blocks = blocks
+        return True
+
+
+def parse_block_file(content, path=None):
+    """Один линейный проход по BLOCK_DATA. Ошибки - JSParseError с номером строки"""
+    decl = BLOCK_DATA_DECL_RE.search(content)
+    if not decl:
+        return BlockFile(content, path=path)
+
+    spans = []
+    items, arr_start, arr_end = parse_at(content, decl.end(), item_spans=spans)
+    if not isinstance(items, list) or len(spans) != len(items):
+        raise JSParseError("BLOCK_DATA must contain only object literals", content, arr_start)
+
+    blocks, sources = [], {}
+    for obj, (start, end) in zip(items, spans):
+        b = block_from_literal(obj, lambda msg, pos=start: JSParseError(msg, content, pos))
+        blocks.append(b)
+        sources[id(b)] = (b, start, end, snapshot(b))
+    blocks.sort(key=lambda x: x['id'])
+    return BlockFile(content, blocks, sources, (arr_start, arr_end), path)
+
+
+def parse_js_array(raw_data):
+    """Содержимое между скобками BLOCK_DATA -> список блоков"""
+    return parse_block_file(f"export const BLOCK_DATA = [{raw_data}];").blocks
+
+
+def parse_block_data(content):
+    """Достает список блоков из текста constants.js"""
+    return parse_block_file(content).blocks
+
+
+def parse_export(content, name):
+    """Объект-литерал export const NAME = {...} из текста constants.js"""
+    decl = re.search(rf"export\s+const\s+{re.escape(name)}\s*=\s*", content)
+    if not decl:
+        raise JSParseError(f"{name} not found", content, 0)
+    value, start, _ = parse_at(content, decl.end())
+    if not isinstance(value, dict):
+        raise JSParseError(f"{name} must be an object literal", content, start)
+    return value
+
+
+def parse_block_enum(content):
+    """Объект BLOCK (AIR, STONE, ...) из текста constants.js"""
+    return parse_export(content, "BLOCK")
+
+
+def load_block_file(path=CONSTANTS_PATH):
+    # newline="" - сохраняем переводы строк файла как есть
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return parse_block_file(f.read(), path)
+
+
+class BlockIndex:
+    """id -> блоки с этим id, обновляется точечно при правках.
+
+    Движок делает BLOCKS[b.id] = b, поэтому блоки с одинаковым id затирают друг друга -
+    такие id собираются в duplicates.
+    """
+
+    def __init__(self, blocks=()):
+        self.by_id = {}
+        self.duplicates = set()
+        self._max_id = -1
+        for b in blocks:
+            self.add(b)
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __contains__(self, bid):
+        return bid in self.by_id
+
+    def add(self, b):
+        same = self.by_id.setdefault(b['id'], [])
+        same.append(b)
+        if len(same) > 1:
+            self.duplicates.add(b['id'])
+        if self._max_id is not None and b['id'] > self._max_id:
+            self._max_id = b['id']
+
+    def remove(self, b, bid=None):
+        """Убирает блок; bid - id, под которым он был записан (если уже поменялся)"""
+        bid = b['id'] if bid is None else bid
+        same = self.by_id.get(bid)
+        if not same:
+            return
+        same[:] = [x for x in same if x is not b]
+        if len(same) < 2:
+            self.duplicates.discard(bid)
+        if not same:
+            del self.by_id[bid]
+            if bid == self._max_id:
+                self._max_id = None  # пересчитаем при следующем next_id()
+
+    def change_id(self, b, old_id):
+        if old_id != b['id']:
+            self.remove(b, old_id)
+            self.add(b)
+
+    def get(self, bid):
+        same = self.by_id.get(bid)
+        return same[0] if same else None
+
+    def next_id(self):
+        if self._max_id is None:
+            self._max_id = max(self.by_id, default=-1)
+        return self._max_id + 1
+
+
+class TileIndex:
+    """(col, row) -> [(блок, грань), ...]: кто ссылается на клетку атласа, обновляется точечно.
+
+    Учитываются только заданные грани (как в atlas.AtlasAllocator): пустой atlasTop/atlasBottom
+    берет тайл боковой грани и отдельной ссылкой не считается.
+    """
+
+    def __init__(self, blocks=()):
+        self.users = {}
+        for b in blocks:
+            self.add(b)
+
+    def __len__(self):
+        return len(self.users)
+
+    def __contains__(self, cell):
+        return tuple(cell) in self.users
+
+    def add(self, b):
+        for key in FACE_KEYS:
+            self.link(b, key, b.get(key))
+
+    def remove(self, b):
+        for key in FACE_KEYS:
+            self.unlink(b, key, b.get(key))
+
+    def link(self, b, key, cell):
+        if cell:
+            self.users.setdefault(tuple(cell), []).append((b, key))
+
+    def unlink(self, b, key, cell):
+        if not cell:
+            return
+        cell = tuple(cell)
+        users = self.users.get(cell)
+        if not users:
+            return
+        users[:] = [u for u in users if u[0] is not b or u[1] != key]
+        if not users:
+            del self.users[cell]
+
+    def move(self, b, key, old, new):
+        """Грань key блока b переехала из клетки old в new (любая может быть None)"""
+        if old != new:
+            self.unlink(b, key, old)
+            self.link(b, key, new)
+
+    def users_of(self, cell):
+        return self.users.get(tuple(cell), ())
+
+
+def registry_hash(blocks):
+    """64-битный хеш набора (id, имя) блоков: по нему видно, к какому реестру относятся id в данных мира"""
+    h = hashlib.blake2b(digest_size=8)
+    for bid, name in sorted((b['id'], b['name'] or '') for b in blocks):
+        h.update(f"{bid}:{name}\n".encode("utf-8"))
+    return int.from_bytes(h.digest(), "little")
+
+
+def find_block(blocks, key):
+    """Ищет блок по id (int) или по имени (без учета регистра)"""
+    if isinstance(key, int) or (isinstance(key, str) and key.isdigit()):
+        key = int(key)
+        return next((b for b in blocks if b['id'] == key), None)
+    name = str(key).lower()
+    return next((b for b in blocks if (b['name'] or '').lower() == name), None)
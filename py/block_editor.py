@@ -1,23 +1,29 @@
+import time
+_T0 = time.perf_counter()  # для --startup-profile: отсчет до импорта Qt
+
+import argparse
+import functools
+import importlib.util
+import io
 import sys
 import os
-import re
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-                               QListWidget, QGroupBox, QFormLayout, QLineEdit, QCheckBox,
+                               QListView, QGroupBox, QFormLayout, QLineEdit, QCheckBox,
                                QPushButton, QLabel, QScrollArea, QFileDialog, QSplitter,
-                               QMessageBox, QGridLayout, QToolButton)
-from PySide6.QtCore import Qt, Signal, QSize
-from PySide6.QtGui import QPixmap, QPainter, QPen, QColor, QIcon
-
-# --- КОНФИГУРАЦИЯ ПУТЕЙ ---
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
-CONSTANTS_PATH = os.path.join(PROJECT_ROOT, "js", "constants.js")
-ATLAS_PATH = os.path.join(PROJECT_ROOT, "assets", "atlas.png")
+                               QMessageBox, QGridLayout, QToolButton, QProgressDialog, QToolTip)
+from PySide6.QtCore import (Qt, Signal, QSize, QRect, QRectF, QPoint, QTimer, QAbstractListModel, QModelIndex,
+                            QSortFilterProxyModel, QObject, QRunnable, QThreadPool, QEvent)
+from PySide6.QtGui import QPixmap, QPainter, QPen, QColor, QIcon, QImage, QAction, QKeySequence
 
-# Настройки атласа
-ATLAS_SIZE = 1024
-GRID_SIZE = 16
-TILE_SIZE = ATLAS_SIZE // GRID_SIZE  # 64px
+import block_data
+from block_data import CONSTANTS_PATH, ATLAS_PATH, FACE_KEYS
+from atlas import (Atlas, AtlasAllocator, ATLAS_SIZE, GRID_SIZE, TILE_SIZE, load_tile_image,
+                   encode_tile_patch, decode_tile_patch)
+from history import History
 
 # Пресеты звуков
 SOUND_PRESETS = {
@@ -29,90 +35,778 @@ SOUND_PRESETS = {
 }
 
 
+FACE_LABELS = {"atlas": "side", "atlasTop": "top", "atlasBottom": "bottom"}
+
+
+# Замеры горячих участков: BLOCK_EDITOR_TIMING=1 python py/block_editor.py
+TIMING_ENV = "BLOCK_EDITOR_TIMING"
+TIMING_ENABLED = os.environ.get(TIMING_ENV, "") not in ("", "0")
+
+
+def log_timing(name, seconds, status=None):
+    message = f"{name}: {seconds * 1000:.2f} ms"
+    print(f"[timing] {message}", file=sys.stderr)
+    if status:
+        status(message)
+
+
+@contextmanager
+def timing(name, status=None):
+    """Время блока with в stderr и (если задан status) в строку состояния; без TIMING_ENV ничего не делает"""
+    if not TIMING_ENABLED:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        log_timing(name, time.perf_counter() - t0, status)
+
+
+class StartupProfile:
+    """Отметки времени запуска (--startup-profile): от старта модуля до первой отрисовки окна"""
+
+    def __init__(self, t0=_T0):
+        self.t0 = t0
+        self.marks = []  # (событие, мс от старта, мс работы или None)
+
+    def mark(self, name, seconds=None):
+        self.marks.append((name, (time.perf_counter() - self.t0) * 1000, None if seconds is None else seconds * 1000))
+
+    def has(self, name):
+        return any(m[0] == name for m in self.marks)
+
+    def report(self):
+        lines = ["Startup profile:"]
+        for name, at, took in self.marks:
+            lines.append(f"  {name:<22} at {at:8.1f} ms" + (f"  (took {took:.1f} ms)" if took is not None else ""))
+        lines.append(f"  PIL imported: {'yes' if 'PIL' in sys.modules else 'no'}")
+        return "\n".join(lines)
+
+
+class LoadSignals(QObject):
+    done = Signal(object, float)  # результат, секунды работы
+    failed = Signal(str)
+    progress = Signal(int, int)  # сделано, всего
+
+
+class LoadTask(QRunnable):
+    """Функция в потоке QThreadPool; результат приходит сигналом в GUI-поток.
+
+    С with_progress=True функция получает progress=callback(done, total), который шлет сигнал progress.
+    """
+
+    def __init__(self, fn, *args, with_progress=False):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.with_progress = with_progress
+        self.signals = LoadSignals()
+
+    def run(self):
+        t0 = time.perf_counter()
+        try:
+            if self.with_progress:
+                result = self.fn(*self.args, progress=self.signals.progress.emit)
+            else:
+                result = self.fn(*self.args)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.done.emit(result, time.perf_counter() - t0)
+
+
+def read_atlas_image(path=ATLAS_PATH):
+    """Декодирует atlas.png в QImage (QImage, в отличие от QPixmap, можно делать не в GUI-потоке)"""
+    if not os.path.exists(path):
+        return None
+    image = QImage(path)
+    if image.isNull():
+        raise ValueError(f"Cannot decode {path}")
+    return image.convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
+
+
+def read_atlas_pages(path=ATLAS_PATH, size=ATLAS_SIZE):
+    """Декодирует atlas.png и раскладывает по страницам (AtlasPageFile); тоже можно не в GUI-потоке.
+
+    Полный декодированный QImage живет только внутри вызова. None, если файла нет.
+    """
+    if not os.path.exists(path):
+        return None
+    image = QImage(path)
+    if image.isNull():
+        raise ValueError(f"Cannot decode {path}")
+    return AtlasPageFile.from_image(image, size, path)
+
+
+class TileCache:
+    """LRU-кеш превью тайлов: ключ (col, row, variant).
+
+    Варианты: "tile" - QPixmap тайла, "icon" - иконка превью,
+    "dimmed" - затемненная иконка (унаследованная грань), "list" - иконка списка блоков.
+    """
+    VARIANTS = ("tile", "icon", "dimmed", "list")
+    LIST_ICON_SIZE = 24
+
+    def __init__(self, source, max_entries=1024):
+        self.source = source  # AtlasWidget
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, col, row, variant="tile"):
+        key = (col, row, variant)
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+            return value
+
+        value = self._build(col, row, variant)
+        self._entries[key] = value
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return value
+
+    def _build(self, col, row, variant):
+        if variant == "tile":
+            return self.source.copy_tile_pixmap(col, row)
+        pix = self.get(col, row, "tile")
+        if variant == "icon":
+            return QIcon(pix)
+        if variant == "dimmed":
+            img = pix.toImage()
+            # Затемняем
+            p = QPainter(img)
+            p.fillRect(img.rect(), QColor(0, 0, 0, 100))
+            p.end()
+            return QIcon(QPixmap.fromImage(img))
+        if variant == "list":
+            return QIcon(pix.scaled(self.LIST_ICON_SIZE, self.LIST_ICON_SIZE))
+        raise KeyError(variant)
+
+    def invalidate(self, col, row):
+        """Сбрасывает все варианты одной клетки"""
+        for variant in self.VARIANTS:
+            self._entries.pop((col, row, variant), None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class AtlasPageFile:
+    """Атлас целиком во временном файле: страницы PAGE_SIZE x PAGE_SIZE, ARGB32 premultiplied.
+
+    Пишется один раз после декодирования atlas.png, дальше страницы читаются и
+    переписываются по одной - полный атлас в памяти не держится.
+    """
+    PAGE_SIZE = 512
+    FORMAT = QImage.Format.Format_ARGB32_Premultiplied
+
+    def __init__(self, size):
+        self.size = size
+        self.pages = -(-size // self.PAGE_SIZE)  # страниц по стороне
+        self.page_bytes = self.PAGE_SIZE * self.PAGE_SIZE * 4
+        self._file = tempfile.TemporaryFile(prefix="atlas-pages-")
+        self._file.truncate(self.pages * self.pages * self.page_bytes)  # нули - прозрачные пиксели
+
+    @classmethod
+    def from_image(cls, image, size=ATLAS_SIZE, name="atlas.png"):
+        """Раскладывает QImage по страницам; меньший атлас дополняется прозрачным, больший - ValueError"""
+        if image.width() > size or image.height() > size:
+            raise ValueError(f"{name} is {image.width()}x{image.height()}, larger than the {size}x{size} "
+                             "atlas set in WORLD_CONFIG.ATLAS_SIZE")
+        pages = cls(size)
+        p = cls.PAGE_SIZE
+        for page_y in range(-(-image.height() // p)):
+            for page_x in range(-(-image.width() // p)):
+                # copy() за краем картинки заполняет нулями; формат меняется постранично, без второй копии атласа
+                page = image.copy(page_x * p, page_y * p, p, p).convertToFormat(cls.FORMAT)
+                pages.write_page(page_x, page_y, page)
+        return pages
+
+    def _offset(self, page_x, page_y):
+        return (page_y * self.pages + page_x) * self.page_bytes
+
+    def read_page(self, page_x, page_y):
+        self._file.seek(self._offset(page_x, page_y))
+        data = self._file.read(self.page_bytes)
+        return QImage(data, self.PAGE_SIZE, self.PAGE_SIZE, self.PAGE_SIZE * 4, self.FORMAT).copy()
+
+    def write_page(self, page_x, page_y, image):
+        self._file.seek(self._offset(page_x, page_y))
+        self._file.write(image.constBits())
+
+    def paste(self, x, y, image):
+        """Пишет image в точку (x, y) атласа с заменой пикселей (и альфы). Возвращает задетый QRect"""
+        rect = QRect(x, y, image.width(), image.height())
+        p = self.PAGE_SIZE
+        for page_y in range(rect.top() // p, min(self.pages, rect.bottom() // p + 1)):
+            for page_x in range(rect.left() // p, min(self.pages, rect.right() // p + 1)):
+                page = self.read_page(page_x, page_y)
+                painter = QPainter(page)
+                painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Source)
+                painter.drawImage(x - page_x * p, y - page_y * p, image)
+                painter.end()
+                self.write_page(page_x, page_y, page)
+        return rect
+
+    def close(self):
+        self._file.close()
+
+
+class AtlasPyramid:
+    """Страницы атласа для отрисовки, все уровни - в одном LRU с лимитом по байтам.
+
+    Уровень 0 - страницы полного размера из AtlasPageFile, уровень n - атлас в 2^n раз меньше:
+    его страница собирается из четырех страниц уровня n-1. Строятся только видимые страницы,
+    поэтому после загрузки виджет держит не больше budget_bytes на любом размере атласа
+    (плюс кеш превью). Пик - при загрузке: PNG декодируется целиком (8192x8192 - 256 МБ на время
+    read_atlas_pages).
+    """
+    PAGE_SIZE = AtlasPageFile.PAGE_SIZE
+
+    def __init__(self, budget_bytes=64 * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self.base = None  # AtlasPageFile
+        self._pages = OrderedDict()  # (level, page_x, page_y) -> QPixmap
+        self._bytes = 0
+
+    def set_base(self, pages):
+        self.base = pages
+        self.clear()
+
+    def clear(self):
+        self._pages.clear()
+        self._bytes = 0
+
+    @staticmethod
+    def level_for(zoom):
+        """Самый мелкий уровень, который еще не меньше нужного масштаба"""
+        level = 0
+        while zoom <= 0.5:
+            zoom *= 2
+            level += 1
+        return level
+
+    def page_count(self, level):
+        """Страниц по стороне на уровне level"""
+        return -(-self.base.size // (self.PAGE_SIZE << level))
+
+    def page(self, level, page_x, page_y):
+        key = (level, page_x, page_y)
+        pix = self._pages.get(key)
+        if pix is not None:
+            self._pages.move_to_end(key)
+            return pix
+
+        if level == 0:
+            pix = QPixmap.fromImage(self.base.read_page(page_x, page_y))
+        else:
+            half = self.PAGE_SIZE // 2
+            count = self.page_count(level - 1)
+            pix = QPixmap(self.PAGE_SIZE, self.PAGE_SIZE)
+            pix.fill(Qt.GlobalColor.transparent)
+            painter = QPainter(pix)
+            for dy in (0, 1):
+                for dx in (0, 1):
+                    x, y = page_x * 2 + dx, page_y * 2 + dy
+                    if x < count and y < count:
+                        child = self.page(level - 1, x, y).scaled(
+                            half, half, Qt.AspectRatioMode.IgnoreAspectRatio, Qt.TransformationMode.SmoothTransformation)
+                        painter.drawPixmap(dx * half, dy * half, child)
+            painter.end()
+        self._pages[key] = pix
+        self._bytes += pix.width() * pix.height() * 4
+        while self._bytes > self.budget_bytes and len(self._pages) > 1:
+            _, old = self._pages.popitem(last=False)
+            self._bytes -= old.width() * old.height() * 4
+        return pix
+
+    def copy(self, rect):
+        """Кусок полного атласа (QPixmap) со страниц уровня 0"""
+        pix = QPixmap(rect.size())
+        pix.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(pix)
+        p = self.PAGE_SIZE
+        count = self.page_count(0)
+        for page_y in range(rect.top() // p, min(count, rect.bottom() // p + 1)):
+            for page_x in range(rect.left() // p, min(count, rect.right() // p + 1)):
+                painter.drawPixmap(page_x * p - rect.x(), page_y * p - rect.y(), self.page(0, page_x, page_y))
+        painter.end()
+        return pix
+
+    def invalidate(self, rect):
+        """Сбрасывает страницы всех уровней, задевающие rect (координаты полного атласа)"""
+        for key in [k for k in self._pages if self._page_rect(k).intersects(rect)]:
+            pix = self._pages.pop(key)
+            self._bytes -= pix.width() * pix.height() * 4
+
+    def _page_rect(self, key):
+        level, page_x, page_y = key
+        span = self.PAGE_SIZE << level
+        return QRect(page_x * span, page_y * span, span, span)
+
+    def __len__(self):
+        return len(self._pages)
+
+
 class AtlasWidget(QLabel):
+    """Атлас рисуется в paintEvent: базовый слой + закешированная сетка + выделение.
+
+    Атлас не перерисовывается при клике - обновляется только область старой и новой
+    выделенной клетки. Рисуется только открытая (видимая) область, со страниц AtlasPyramid.
+    Геометрия (сторона атласа и клеток по стороне) задается при создании, по умолчанию - WORLD_CONFIG.
+    """
     clicked = Signal(int, int)
 
-    def __init__(self):
+    MIN_ZOOM = 0.25
+    MAX_ZOOM = 4.0
+    SELECTION_WIDTH = 3
+    MIN_VIEW_SIZE = 512  # до скольких пикселей можно уменьшить большой атлас
+    MIN_GRID_CELL = 8
+    # Тепловая карта: (минимум ссылок, цвет); 0 - клетка никем не используется
+    USAGE_COLORS = ((0, QColor(0, 0, 0, 160)), (1, QColor(76, 175, 80, 80)), (2, QColor(255, 235, 59, 90)),
+                    (4, QColor(255, 152, 0, 110)), (8, QColor(244, 67, 54, 130)))
+    USAGE_LABEL_CELL = 24  # с какого размера клетки писать число ссылок
+    TOOLTIP_USERS = 15
+
+    def __init__(self, atlas_size=ATLAS_SIZE, grid_size=GRID_SIZE):
         super().__init__()
+        self.atlas_size = atlas_size
+        self.grid_size = grid_size
+        self.tile_size = atlas_size // grid_size
         self.setMouseTracking(True)
         self.selected_cell = (0, 0)
-        self.atlas_pixmap = None
+        self.hover_cell = None
+        self.atlas_pages = None  # AtlasPageFile
+        self.zoom = 1.0
+        self.min_zoom = min(self.MIN_ZOOM, self.MIN_VIEW_SIZE / atlas_size)
+        self._grid_tiles = {}  # zoom -> пиксмап одной клетки с линиями сетки
+        self.tile_cache = TileCache(self)
+        self.pyramid = AtlasPyramid()
+        self.usage_source = None  # (col, row) -> [(блок, грань), ...]; задает окно (BlockListModel.tile_index)
+        self.show_usage = False
         self.setAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignLeft)
         self.setStyleSheet("background-color: #222;")  # Темный фон
 
     def load_atlas(self):
-        if os.path.exists(ATLAS_PATH):
-            self.atlas_pixmap = QPixmap(ATLAS_PATH)
+        self.set_atlas_image(read_atlas_pages(ATLAS_PATH, self.atlas_size))
+
+    def set_atlas_image(self, image):
+        """Ставит атлас: AtlasPageFile (read_atlas_pages), декодированный QImage или None, если файла нет.
+
+        QImage сразу раскладывается по страницам, держать его после вызова не нужно;
+        атлас больше atlas_size не показывается (ValueError), а не обрезается.
+        """
+        if image is not None and not isinstance(image, AtlasPageFile):
+            image = AtlasPageFile.from_image(image, self.atlas_size)
+        if self.atlas_pages is not None:
+            self.atlas_pages.close()
+        self.atlas_pages = image
+        self.tile_cache.clear()
+        self.pyramid.set_base(image)
+        if image is not None:
+            self.setText("")
+            self._update_size()
             self.draw_grid()
         else:
             self.setText("Atlas not found!")
 
+    # --- ГЕОМЕТРИЯ ---
+
+    def cell_px(self):
+        return self.tile_size * self.zoom
+
+    def cell_rect(self, col, row, margin=0):
+        """Прямоугольник клетки в координатах виджета (с запасом под рамку)"""
+        size = self.cell_px()
+        return QRect(int(col * size) - margin, int(row * size) - margin,
+                     int(size) + 1 + 2 * margin, int(size) + 1 + 2 * margin)
+
+    def cell_at(self, pos):
+        size = self.cell_px()
+        col, row = int(pos.x() // size), int(pos.y() // size)
+        if 0 <= col < self.grid_size and 0 <= row < self.grid_size:
+            return col, row
+        return None
+
+    def _update_size(self):
+        side = int(self.atlas_size * self.zoom)
+        self.setMinimumSize(side, side)
+
+    def set_zoom(self, zoom):
+        zoom = max(self.min_zoom, min(self.MAX_ZOOM, zoom))
+        if zoom == self.zoom: return
+        self.zoom = zoom
+        self._update_size()
+        self.update()
+
+    def _grid_tile(self):
+        """Одна клетка сетки (линии сверху и слева), кешируется на каждый zoom"""
+        tile = self._grid_tiles.get(self.zoom)
+        if tile is None:
+            size = max(1, round(self.cell_px()))
+            tile = QPixmap(size, size)
+            tile.fill(Qt.GlobalColor.transparent)
+            p = QPainter(tile)
+            p.setPen(QPen(QColor(0, 255, 255, 50), 1))
+            p.drawLine(0, 0, size - 1, 0)
+            p.drawLine(0, 1, 0, size - 1)
+            p.end()
+            self._grid_tiles[self.zoom] = tile
+        return tile
+
+    # --- ОТРИСОВКА ---
+
     def draw_grid(self):
-        if not self.atlas_pixmap: return
+        """Полная перерисовка (после загрузки/смены атласа)"""
+        self.update()
 
-        displayed = self.atlas_pixmap.copy()
-        painter = QPainter(displayed)
+    def paintEvent(self, event):
+        with timing("AtlasWidget.draw_grid (paint)"):
+            self._paint(event)
 
-        # Сетка (полупрозрачная)
-        pen = QPen(QColor(0, 255, 255, 50))
-        pen.setWidth(1)
-        painter.setPen(pen)
+    def _paint(self, event):
+        if self.atlas_pages is None:
+            super().paintEvent(event)
+            return
 
-        for i in range(GRID_SIZE + 1):
-            pos = i * TILE_SIZE
-            painter.drawLine(pos, 0, pos, ATLAS_SIZE)
-            painter.drawLine(0, pos, ATLAS_SIZE, pos)
+        side = self.atlas_size * self.zoom
+        exposed = event.rect().intersected(QRect(0, 0, int(side), int(side)))
+        painter = QPainter(self)
+        painter.fillRect(event.rect(), QColor(0x22, 0x22, 0x22))
+
+        if not exposed.isEmpty():
+            # Базовый слой: только открытая область
+            self._paint_pages(painter, exposed, self.pyramid.level_for(self.zoom))
+
+            if self.show_usage and self.usage_source:
+                self._paint_usage(painter, exposed)
+
+            # Сетка (полупрозрачная) - тайлингом закешированной клетки; на мелких клетках не видна
+            if self.cell_px() >= self.MIN_GRID_CELL:
+                grid = self._grid_tile()
+                painter.drawTiledPixmap(exposed, grid, QPoint(exposed.x() % grid.width(), exposed.y() % grid.height()))
+
+        # Наведение
+        if self.hover_cell and self.hover_cell != self.selected_cell:
+            painter.setPen(QPen(QColor(255, 255, 255, 160), 1))
+            painter.drawRect(self.cell_rect(*self.hover_cell).adjusted(0, 0, -1, -1))
 
         # Выделение (Красный квадрат)
         sel_pen = QPen(QColor(255, 50, 50, 255))
-        sel_pen.setWidth(3)
+        sel_pen.setWidth(self.SELECTION_WIDTH)
         painter.setPen(sel_pen)
-        cx, cy = self.selected_cell
-        painter.drawRect(cx * TILE_SIZE, cy * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+        painter.drawRect(self.cell_rect(*self.selected_cell).adjusted(0, 0, -1, -1))
 
         painter.end()
-        self.setPixmap(displayed)
+
+    def _paint_pages(self, painter, exposed, level):
+        """Открытая область со страниц уровня level: с каждой страницы - только ее видимый кусок"""
+        scale = self.zoom * (1 << level)  # пиксель уровня -> пиксель виджета
+        page = AtlasPyramid.PAGE_SIZE * scale
+        pages = self.pyramid.page_count(level)
+        area = QRectF(exposed)
+        for page_y in range(int(exposed.top() // page), min(pages, int(exposed.bottom() // page) + 1)):
+            for page_x in range(int(exposed.left() // page), min(pages, int(exposed.right() // page) + 1)):
+                target = QRectF(page_x * page, page_y * page, page, page).intersected(area)
+                src = QRectF(target.x() / scale - page_x * AtlasPyramid.PAGE_SIZE,
+                             target.y() / scale - page_y * AtlasPyramid.PAGE_SIZE,
+                             target.width() / scale, target.height() / scale)
+                painter.drawPixmap(target, self.pyramid.page(level, page_x, page_y), src)
+
+    def _paint_usage(self, painter, exposed):
+        """Тепловая карта по обратному индексу: только видимые клетки, блоки не перебираются"""
+        size = self.cell_px()
+        col0, row0 = int(exposed.left() // size), int(exposed.top() // size)
+        col1 = min(self.grid_size - 1, int(exposed.right() // size))
+        row1 = min(self.grid_size - 1, int(exposed.bottom() // size))
+        labels = size >= self.USAGE_LABEL_CELL
+        if labels:
+            font = painter.font()
+            font.setPixelSize(max(9, int(size / 5)))
+            font.setBold(True)
+            painter.setFont(font)
+        badge = size / 3
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                count = len(self.usage_source((col, row)))
+                color = next(c for n, c in reversed(self.USAGE_COLORS) if count >= n)
+                rect = QRectF(col * size, row * size, size, size)
+                painter.fillRect(rect, color)
+                if count and labels:
+                    # Число ссылок - в плашке в углу, чтобы читалось поверх текстуры
+                    solid = QColor(color)
+                    solid.setAlpha(255)
+                    painter.setPen(QPen(solid, 2))
+                    painter.drawRect(rect.adjusted(1, 1, -1, -1))
+                    corner = QRectF(rect.x() + 2, rect.y() + 2, badge, badge * 0.75)
+                    painter.fillRect(corner, QColor(0, 0, 0, 190))
+                    painter.setPen(solid)
+                    painter.drawText(corner, Qt.AlignmentFlag.AlignCenter, str(count))
+
+    def set_usage_overlay(self, enabled):
+        self.show_usage = enabled
+        self.update()
+
+    def usage_changed(self, *cells):
+        """У клеток поменялись пользователи (None пропускаются); без аргументов - весь атлас"""
+        if not self.show_usage:
+            return
+        if not cells:
+            self.update()
+        for cell in cells:
+            if cell:
+                self._update_cell(tuple(cell))
+
+    def usage_tooltip(self, cell):
+        users = self.usage_source(cell)
+        head = f"Cell [{cell[0]}, {cell[1]}]"
+        if not users:
+            return f"{head}: unused"
+        lines = [f"{head}: {len(users)} face(s)"]
+        lines += [f"[{b['id']}] {b['name']} - {FACE_LABELS[key]}" for b, key in users[:self.TOOLTIP_USERS]]
+        if len(users) > self.TOOLTIP_USERS:
+            lines.append(f"... and {len(users) - self.TOOLTIP_USERS} more")
+        return "\n".join(lines)
+
+    def _update_cell(self, cell):
+        if cell:
+            self.update(self.cell_rect(*cell, margin=self.SELECTION_WIDTH))
+
+    # --- СОБЫТИЯ ---
 
     def mousePressEvent(self, event):
-        if not self.atlas_pixmap: return
-        x = event.position().x()
-        y = event.position().y()
-        col = int(x // TILE_SIZE)
-        row = int(y // TILE_SIZE)
-
-        if 0 <= col < GRID_SIZE and 0 <= row < GRID_SIZE:
-            self.selected_cell = (col, row)
-            self.draw_grid()
-            self.clicked.emit(col, row)
+        if self.atlas_pages is None: return
+        cell = self.cell_at(event.position())
+        if cell:
+            self.set_selection(*cell)
+            self.clicked.emit(*cell)
+
+    def mouseMoveEvent(self, event):
+        if self.atlas_pages is None: return
+        cell = self.cell_at(event.position())
+        if cell != self.hover_cell:
+            self._update_cell(self.hover_cell)
+            self.hover_cell = cell
+            self._update_cell(cell)
+            if QToolTip.isVisible():
+                # Подсказка уже открыта - сразу показываем пользователей новой клетки
+                self._show_tooltip(cell, event.globalPosition().toPoint())
+
+    def event(self, e):
+        if e.type() == QEvent.Type.ToolTip:
+            self._show_tooltip(self.cell_at(e.pos()) if self.atlas_pages is not None else None, e.globalPos())
+            return True
+        return super().event(e)
+
+    def _show_tooltip(self, cell, global_pos):
+        if cell and self.usage_source:
+            QToolTip.showText(global_pos, self.usage_tooltip(cell), self)
+        else:
+            QToolTip.hideText()
+
+    def leaveEvent(self, event):
+        self._update_cell(self.hover_cell)
+        self.hover_cell = None
+        super().leaveEvent(event)
+
+    def wheelEvent(self, event):
+        if event.modifiers() & Qt.KeyboardModifier.ControlModifier:
+            self.set_zoom(self.zoom * (2 if event.angleDelta().y() > 0 else 0.5))
+            event.accept()
+        else:
+            super().wheelEvent(event)
 
     def set_selection(self, col, row):
+        if (col, row) == self.selected_cell: return
+        self._update_cell(self.selected_cell)
         self.selected_cell = (col, row)
-        self.draw_grid()
+        self._update_cell(self.selected_cell)
 
-    def get_tile_pixmap(self, col, row):
+    def copy_tile_pixmap(self, col, row):
         """Вырезает кусочек текстуры"""
-        if not self.atlas_pixmap: return QPixmap(64, 64)
-        return self.atlas_pixmap.copy(col * TILE_SIZE, row * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+        size = self.tile_size
+        if self.atlas_pages is None: return QPixmap(size, size)
+        return self.pyramid.copy(QRect(col * size, row * size, size, size))
+
+    def get_tile_pixmap(self, col, row):
+        with timing("get_tile_pixmap"):
+            return self.tile_cache.get(col, row, "tile")
+
+    def get_tile_icon(self, col, row, variant="icon"):
+        return self.tile_cache.get(col, row, variant)
+
+    def replace_tile(self, col, row, img):
+        """Подменяет одну клетку (PIL RGBA) в страницах атласа без перезагрузки"""
+        if self.atlas_pages is None:
+            self.load_atlas()
+            return
+        data = img.tobytes("raw", "RGBA")
+        qimg = QImage(data, img.width, img.height, img.width * 4, QImage.Format.Format_RGBA8888)
+        rect = self.atlas_pages.paste(col * self.tile_size, row * self.tile_size, qimg)
+        self.tile_cache.invalidate(col, row)
+        self.pyramid.invalidate(rect)
+        self._update_cell((col, row))
+
+
+class BlockListModel(QAbstractListModel):
+    """Список блоков для QListView: строки рисуются лениво, только видимые.
+
+    Держит индекс id -> блоки (block_data.BlockIndex); строки с повторяющимся id подсвечиваются.
+    Обратный индекс клеток атласа (block_data.TileIndex) обновляется при вставке и удалении строк,
+    смену граней передает окно (MainWindow.move_face).
+    """
+    BlockRole = Qt.ItemDataRole.UserRole
+    DUPLICATE_COLOR = QColor(211, 47, 47)
+
+    def __init__(self, icon_source, parent=None):
+        super().__init__(parent)
+        self.icon_source = icon_source  # (col, row) -> QIcon для списка
+        self.blocks = []
+        self.id_index = block_data.BlockIndex()
+        self.tile_index = block_data.TileIndex()
+        self._rows = {}  # id(block) -> строка
+
+    def set_blocks(self, blocks):
+        self.beginResetModel()
+        self.blocks = blocks
+        self.id_index = block_data.BlockIndex(blocks)
+        self.tile_index = block_data.TileIndex(blocks)
+        self._rows = {id(b): i for i, b in enumerate(blocks)}
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.blocks)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        b = self.blocks[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return f"[{b['id']}] {b['name']}"
+        if role == Qt.ItemDataRole.DecorationRole:
+            col, row = b['atlas']
+            return self.icon_source(col, row)
+        if role == self.BlockRole:
+            return b
+        if b['id'] in self.id_index.duplicates:
+            if role == Qt.ItemDataRole.ForegroundRole:
+                return self.DUPLICATE_COLOR
+            if role == Qt.ItemDataRole.ToolTipRole:
+                return f"Duplicate id {b['id']}: the engine keeps only one block per id"
+        return None
+
+    def row_of(self, block):
+        if self._rows is None:
+            self._rows = {id(b): i for i, b in enumerate(self.blocks)}
+        return self._rows.get(id(block), -1)
+
+    def _emit_rows(self, blocks, roles=()):
+        for b in blocks:
+            row = self.row_of(b)
+            if row >= 0:
+                idx = self.index_at(row)
+                self.dataChanged.emit(idx, idx, list(roles))
+
+    def index_at(self, row):
+        return self.createIndex(row, 0)
+
+    def append_block(self, block):
+        return self.insert_block(len(self.blocks), block)
+
+    def insert_block(self, row, block):
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.blocks.insert(row, block)
+        self.id_index.add(block)
+        self.tile_index.add(block)
+        if self._rows is not None and row == len(self.blocks) - 1:
+            self._rows[id(block)] = row
+        else:
+            self._rows = None  # строки после вставленной сдвинулись
+        self.endInsertRows()
+        # Соседи с тем же id теперь тоже дубликаты
+        self._emit_rows(self.id_index.by_id.get(block['id'], ())[:-1])
+        return row
+
+    def remove_row(self, row):
+        block = self.blocks[row]
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.blocks[row]
+        self.id_index.remove(block)
+        self.tile_index.remove(block)
+        self._rows = None  # строки после удаленной сдвинулись
+        self.endRemoveRows()
+        self._emit_rows(self.id_index.by_id.get(block['id'], ()))
+        return block
+
+    def block_changed(self, block, old_id=None):
+        """Перерисовать строку блока; если id поменялся - обновить индекс и строки с old/new id"""
+        changed = [block]
+        if old_id is not None and old_id != block['id']:
+            changed += self.id_index.by_id.get(old_id, [])
+            self.id_index.change_id(block, old_id)
+            changed += [b for b in self.id_index.by_id.get(block['id'], ()) if b is not block]
+        self._emit_rows(changed)
+
+    def refresh_icons(self):
+        """Иконки берутся из кеша тайлов; вид перезапросит только видимые строки"""
+        if self.blocks:
+            self.dataChanged.emit(self.index_at(0), self.index_at(len(self.blocks) - 1),
+                                  [Qt.ItemDataRole.DecorationRole])
+
+
+class BlockFilterModel(QSortFilterProxyModel):
+    """Фильтр списка блоков по подстроке в id или имени"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.text = ""
+
+    def set_text(self, text):
+        text = text.strip().lower()
+        if text != self.text:
+            self.text = text
+            self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if not self.text:
+            return True
+        b = self.sourceModel().blocks[source_row]
+        return self.text in f"[{b['id']}] {b['name'] or ''}".lower()
 
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, profile=None):
         super().__init__()
+        self.profile = profile  # StartupProfile или None
         self.setWindowTitle("Minecraft AI - Pro Block Editor")
         self.resize(1400, 850)
 
         self.blocks = []
+        self.block_file = None  # BlockFile: текст constants.js + позиции блоков в нем
+        self.atlas = Atlas(ATLAS_PATH)  # PIL-копия атласа, грузится при первой загрузке текстуры
         self.current_block = None
         self.is_loading = False
         self.active_texture_target = 'atlas'
         self.tex_widgets = {}  # Словарь виджетов текстур
-
-        try:
-            from PIL import Image
-            self.has_pil = True
-        except ImportError:
-            self.has_pil = False
+        self.history = History(self.apply_history_op)
+        self._pending_ui = {}  # id(block) -> [block, old_id]: перерисовка раз за проход цикла событий
+        self._replay_block = None  # последний блок и клетки, затронутые undo/redo
+        self._replay_tiles = []
+        self._ui_flush_scheduled = False
+
+        # Сам Pillow импортируется при первой загрузке текстуры
+        self.has_pil = importlib.util.find_spec("PIL") is not None
+        if not self.has_pil:
             print("Pillow not installed.")
+        self.thread_pool = QThreadPool.globalInstance()
+        self._loading = set()  # что еще грузится в фоне: "constants", "atlas"
+        self._tasks = set()
+        self.dev_server = None
+        self.dev_server_port = 8000
 
         self.init_ui()
         self.load_data()
@@ -127,9 +821,25 @@ class MainWindow(QMainWindow):
         left_layout = QVBoxLayout()
         left_layout.addWidget(QLabel("<b>BLOCKS</b>"))
 
-        self.list_widget = QListWidget()
-        self.list_widget.currentRowChanged.connect(self.on_block_selected)
-        left_layout.addWidget(self.list_widget)
+        self.inp_filter = QLineEdit()
+        self.inp_filter.setPlaceholderText("Filter by id or name...")
+        self.inp_filter.setClearButtonEnabled(True)
+        # Фильтруем не на каждую букву, а после короткой паузы в наборе
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(150)
+        self.filter_timer.timeout.connect(lambda: self.block_filter.set_text(self.inp_filter.text()))
+        self.inp_filter.textChanged.connect(self.filter_timer.start)
+        left_layout.addWidget(self.inp_filter)
+
+        self.block_model = BlockListModel(lambda col, row: self.atlas_widget.get_tile_icon(col, row, "list"), self)
+        self.block_filter = BlockFilterModel(self)
+        self.block_filter.setSourceModel(self.block_model)
+        self.list_view = QListView()
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setModel(self.block_filter)
+        self.list_view.selectionModel().currentChanged.connect(self.on_current_changed)
+        left_layout.addWidget(self.list_view)
 
         btn_add = QPushButton("+ Add")
         btn_add.clicked.connect(self.add_block)
@@ -141,6 +851,11 @@ class MainWindow(QMainWindow):
         h_btns.addWidget(btn_del)
         left_layout.addLayout(h_btns)
 
+        btn_import = QPushButton("Import Folder...")
+        btn_import.setToolTip("Import textures named like grass_top.png, grass_side.png, stone.png")
+        btn_import.clicked.connect(self.import_texture_folder)
+        left_layout.addWidget(btn_import)
+
         left_container = QWidget()
         left_container.setLayout(left_layout)
         left_container.setMaximumWidth(220)
@@ -156,9 +871,9 @@ class MainWindow(QMainWindow):
         gb_basic = QGroupBox("Basic Information")
         form_basic = QFormLayout()
         self.inp_id = QLineEdit()
-        self.inp_id.textChanged.connect(self.update_current_block)
+        self.inp_id.textChanged.connect(self.on_id_edited)
         self.inp_name = QLineEdit()
-        self.inp_name.textChanged.connect(self.update_current_block)
+        self.inp_name.textChanged.connect(lambda text: self.set_block_field('name', text))
         form_basic.addRow("ID:", self.inp_id)
         form_basic.addRow("Name:", self.inp_name)
         gb_basic.setLayout(form_basic)
@@ -202,7 +917,7 @@ class MainWindow(QMainWindow):
         self.inp_snd_place = QLineEdit()
 
         for inp in [self.inp_snd_step, self.inp_snd_break, self.inp_snd_place]:
-            inp.textChanged.connect(self.update_current_block)
+            inp.textChanged.connect(self.on_sound_edited)
 
         form_sound.addRow("Step:", self.inp_snd_step)
         form_sound.addRow("Break:", self.inp_snd_break)
@@ -216,10 +931,14 @@ class MainWindow(QMainWindow):
         v_props = QVBoxLayout()
         self.chk_solid = QCheckBox("Solid (Collidable)")
         self.chk_trans = QCheckBox("Transparent (Glass/Leaves)")
-        self.chk_solid.clicked.connect(self.update_current_block)
-        self.chk_trans.clicked.connect(self.update_current_block)
+        self.chk_solid.clicked.connect(lambda checked: self.set_block_field('solid', checked))
+        self.chk_trans.clicked.connect(lambda checked: self.set_block_field('transparent', checked))
         v_props.addWidget(self.chk_solid)
         v_props.addWidget(self.chk_trans)
+        btn_mesh = QPushButton("Estimate mesh cost of Transparent")
+        btn_mesh.setToolTip("Compare mesh size of baked regions (or generated terrain) with this flag flipped")
+        btn_mesh.clicked.connect(self.estimate_mesh_cost)
+        v_props.addWidget(btn_mesh)
         gb_props.setLayout(v_props)
         self.center_layout.addWidget(gb_props)
 
@@ -236,6 +955,7 @@ class MainWindow(QMainWindow):
         self.atlas_scroll = QScrollArea()
         self.atlas_widget = AtlasWidget()
         self.atlas_widget.clicked.connect(self.on_atlas_clicked)
+        self.atlas_widget.usage_source = lambda cell: self.block_model.tile_index.users_of(cell)
         self.atlas_scroll.setWidget(self.atlas_widget)
         self.atlas_scroll.setWidgetResizable(True)
         right_layout.addWidget(self.atlas_scroll)
@@ -268,8 +988,36 @@ class MainWindow(QMainWindow):
 
         main_widget.setLayout(layout_wrapper)
 
-        # Загрузка
-        self.atlas_widget.load_atlas()
+        # --- MENU: EDIT ---
+        edit_menu = self.menuBar().addMenu("Edit")
+        self.act_undo = QAction("Undo", self)
+        self.act_undo.setShortcut(QKeySequence.StandardKey.Undo)
+        self.act_undo.triggered.connect(self.undo)
+        self.act_redo = QAction("Redo", self)
+        self.act_redo.setShortcut(QKeySequence.StandardKey.Redo)
+        self.act_redo.triggered.connect(self.redo)
+        edit_menu.addAction(self.act_undo)
+        edit_menu.addAction(self.act_redo)
+        self.update_undo_actions()
+
+        # --- MENU: TOOLS ---
+        tools_menu = self.menuBar().addMenu("Tools")
+        self.act_serve = QAction("Dev Server", self)
+        self.act_serve.setCheckable(True)
+        self.act_serve.setToolTip("Serve the project with ETags, gzip and live change events")
+        self.act_serve.toggled.connect(lambda on: self.start_dev_server() if on else self.stop_dev_server())
+        tools_menu.addAction(self.act_serve)
+        tools_menu.addSeparator()
+        self.act_usage = QAction("Tile Usage Heatmap", self)
+        self.act_usage.setCheckable(True)
+        self.act_usage.setToolTip("Color atlas cells by how many block faces use them")
+        self.act_usage.toggled.connect(self.atlas_widget.set_usage_overlay)
+        tools_menu.addAction(self.act_usage)
+        act_prune = QAction("Prune Unused Tiles...", self)
+        act_prune.setToolTip("Clear atlas cells that no block references")
+        act_prune.triggered.connect(self.prune_unused_tiles)
+        tools_menu.addAction(act_prune)
+
         self.right_container.setVisible(False)
 
     def create_texture_row(self, label_text, key_prefix, row_idx):
@@ -327,6 +1075,7 @@ class MainWindow(QMainWindow):
         self.right_container.setVisible(True)
 
     def upload_texture_for_face(self, key_prefix):
+        if not self.current_block: return
         if not self.has_pil:
             QMessageBox.critical(self, "Error", "Pillow not installed")
             return
@@ -334,49 +1083,62 @@ class MainWindow(QMainWindow):
         file_path, _ = QFileDialog.getOpenFileName(self, "Select Texture", "", "Images (*.png *.jpg *.jpeg)")
         if not file_path: return
 
-        from PIL import Image
-
+        self.history.begin()  # тайл и ссылка на него отменяются одной записью
         try:
-            img = Image.open(file_path)
-            img = img.resize((TILE_SIZE, TILE_SIZE), Image.Resampling.NEAREST)
+            tile = load_tile_image(file_path)
+            self.atlas.ensure_loaded()
+            allocator = AtlasAllocator(self.atlas, self.blocks)
 
             # Берем координаты из выделения на атласе (или [0,0] если ничего не выбрано)
             col, row = self.atlas_widget.selected_cell
+            others = [u for u in allocator.refs.get((col, row), []) if u != (self.current_block['id'], key_prefix)]
 
-            if os.path.exists(ATLAS_PATH):
-                atlas = Image.open(ATLAS_PATH)
+            reused = self.atlas.find_tile(tile)
+            if reused:
+                # Такой тайл уже есть - просто ссылаемся на него, атлас не пишем
+                col, row = reused
             else:
-                atlas = Image.new("RGBA", (ATLAS_SIZE, ATLAS_SIZE), (0, 0, 0, 0))
-
-            atlas.paste(img, (col * TILE_SIZE, row * TILE_SIZE))
-            atlas.save(ATLAS_PATH)
-
-            self.atlas_widget.load_atlas()
+                if others:
+                    # Клетку используют другие блоки - не затираем, берем свободную
+                    free = allocator.first_free()
+                    if free is None:
+                        raise ValueError(f"No free cells left in the {GRID_SIZE}x{GRID_SIZE} atlas")
+                    col, row = free
+                old_patch = encode_tile_patch(self.atlas.get_tile(col, row))
+                with self.timing("upload: PIL paste"):
+                    self.atlas.paste_tile(col, row, tile)
+                self.history.record(("tile", col, row, old_patch, encode_tile_patch(tile)))
+                with self.timing("upload: atlas.png save"):
+                    self.atlas.save()
+                # Подменяем только эту клетку: кеш превью сбрасывается точечно
+                self.atlas_widget.replace_tile(col, row, tile)
+                self.refresh_list_icons()
 
             # Назначаем координаты блоку
-            self.current_block[key_prefix] = [col, row]
+            self.set_block_field(key_prefix, [col, row])
+            self.atlas_widget.set_selection(col, row)
 
             self.update_texture_ui_row(key_prefix)
-            self.statusBar().showMessage(f"Uploaded texture to [{col},{row}]", 3000)
+            verb = "Reused identical tile" if reused else "Uploaded texture to"
+            self.statusBar().showMessage(f"{verb} [{col},{row}]", 3000)
 
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))
+        finally:
+            self.history.end()
+            self.update_undo_actions()
 
     def reset_texture_face(self, key_prefix):
         if not self.current_block: return
 
-        if key_prefix == 'atlas':
-            self.current_block['atlas'] = [0, 0]
-        else:
-            self.current_block[key_prefix] = None
-
+        self.set_block_field(key_prefix, [0, 0] if key_prefix == 'atlas' else None)
         self.update_texture_ui_row(key_prefix)
 
     def on_atlas_clicked(self, col, row):
         if not self.current_block: return
 
         target = self.active_texture_target
-        self.current_block[target] = [col, row]
+        self.set_block_field(target, [col, row])
         self.update_texture_ui_row(target)
 
     def update_texture_ui_row(self, key_prefix):
@@ -399,25 +1161,40 @@ class MainWindow(QMainWindow):
 
         # Preview Icon
         if val:
-            pix = self.atlas_widget.get_tile_pixmap(val[0], val[1])
-            widgets["preview"].setIcon(QIcon(pix))
+            widgets["preview"].setIcon(self.atlas_widget.get_tile_icon(val[0], val[1]))
         else:
             # Show side texture but dimmed
             base_val = self.current_block.get('atlas', [0, 0])
-            pix = self.atlas_widget.get_tile_pixmap(base_val[0], base_val[1])
-            img = pix.toImage()
-            # Затемняем
-            p = QPainter(img)
-            p.fillRect(img.rect(), QColor(0, 0, 0, 100))
-            p.end()
-            widgets["preview"].setIcon(QIcon(QPixmap.fromImage(img)))
+            widgets["preview"].setIcon(self.atlas_widget.get_tile_icon(base_val[0], base_val[1], "dimmed"))
+
+        if key_prefix == 'atlas':
+            self.schedule_block_ui(self.current_block)
+
+    def current_source_row(self):
+        return self.block_filter.mapToSource(self.list_view.currentIndex()).row()
+
+    def select_source_row(self, row):
+        index = self.block_filter.mapFromSource(self.block_model.index_at(row))
+        if not index.isValid():
+            # Блок скрыт фильтром - сбрасываем фильтр
+            self.inp_filter.clear()
+            self.block_filter.set_text("")
+            index = self.block_filter.mapFromSource(self.block_model.index_at(row))
+        self.list_view.setCurrentIndex(index)
+        self.list_view.scrollTo(index)
+
+    def on_current_changed(self, current, previous):
+        self.on_block_selected(self.block_filter.mapToSource(current).row())
 
     def on_block_selected(self, row):
         if row < 0:
+            self.current_block = None
             self.right_container.setVisible(False)
             return
 
         self.is_loading = True
+        if self.current_block is not self.blocks[row]:
+            self.history.seal()
         self.current_block = self.blocks[row]
         b = self.current_block
 
@@ -436,7 +1213,7 @@ class MainWindow(QMainWindow):
 
         # Reset selection mode to Side
         self.active_texture_target = 'atlas'
-        for k in ['atlas', 'atlasTop', 'atlasBottom']:
+        for k in FACE_KEYS:
             self.update_texture_ui_row(k)
             # Сброс подсветки
             self.tex_widgets[k]["preview"].setStyleSheet("")
@@ -449,26 +1226,169 @@ class MainWindow(QMainWindow):
 
         self.is_loading = False
 
-    def update_current_block(self):
+    # --- ПРАВКИ БЛОКА ---
+
+    def set_block_field(self, key, value):
+        """Меняет одно поле текущего блока и пишет разницу в журнал.
+
+        Набор текста в одном поле сливается в одну запись журнала,
+        список и заголовок обновляются один раз за проход цикла событий.
+        """
         if self.is_loading or not self.current_block: return
         b = self.current_block
+        old = b.get(key)
+        if old == value: return
+        b[key] = value
+        if key in FACE_KEYS:
+            self.move_face(b, key, old, value)
+        self.history.record(("field", b, key, old, value), coalesce_key=(id(b), key))
+        self.schedule_block_ui(b, old if key == 'id' else None)
+
+    def move_face(self, b, key, old, new):
+        """Грань блока сменила клетку: обратный индекс и тепловая карта"""
+        self.block_model.tile_index.move(b, key, old, new)
+        self.atlas_widget.usage_changed(old, new)
+
+    def block_cells_changed(self, b):
+        """Блок добавлен или удален: перерисовать его клетки на тепловой карте"""
+        self.atlas_widget.usage_changed(*(b.get(k) for k in FACE_KEYS))
+
+    def on_id_edited(self, text):
         try:
-            b['id'] = int(self.inp_id.text())
-        except:
-            pass
-        b['name'] = self.inp_name.text()
-        b['solid'] = self.chk_solid.isChecked()
-        b['transparent'] = self.chk_trans.isChecked()
+            value = int(text)
+        except ValueError:
+            return
+        self.set_block_field('id', value)
 
+    def on_sound_edited(self):
         step, brk, place = self.inp_snd_step.text(), self.inp_snd_break.text(), self.inp_snd_place.text()
-        if step or brk or place:
-            b['sound'] = {"step": step, "break": brk, "place": place}
+        self.set_block_field('sound', {"step": step, "break": brk, "place": place} if step or brk or place else None)
+
+    def schedule_block_ui(self, block=None, old_id=None):
+        if block is not None:
+            pending = self._pending_ui.get(id(block))
+            if pending is None:
+                self._pending_ui[id(block)] = [block, old_id]
+            elif pending[1] is None:
+                pending[1] = old_id  # для индекса важен id до первой правки
+        if not self._ui_flush_scheduled:
+            self._ui_flush_scheduled = True
+            QTimer.singleShot(0, self.flush_block_ui)
+
+    def flush_block_ui(self):
+        self._ui_flush_scheduled = False
+        pending, self._pending_ui = self._pending_ui, {}
+        for b, old_id in pending.values():
+            self.block_model.block_changed(b, old_id)
+            if old_id is not None and b['id'] != old_id and b['id'] in self.block_model.id_index.duplicates:
+                self.statusBar().showMessage(f"Id {b['id']} is already used by another block", 3000)
+            if b is self.current_block:
+                self.lbl_atlas_title.setText(f"Texture Atlas - Editing: {b['name']}")
+        self.update_undo_actions()
+
+    # --- UNDO / REDO ---
+
+    def update_undo_actions(self):
+        self.act_undo.setEnabled(self.history.can_undo())
+        self.act_redo.setEnabled(self.history.can_redo())
+
+    def undo(self):
+        self.flush_block_ui()
+        self._replay(self.history.undo, "Nothing to undo")
+
+    def redo(self):
+        self.flush_block_ui()
+        self._replay(self.history.redo, "Nothing to redo")
+
+    def _replay(self, step, empty_message):
+        """Запись журнала целиком, затем одна запись атласа и один выбор блока"""
+        self._replay_block = None
+        self._replay_tiles = []
+        if step() is None:
+            self.statusBar().showMessage(empty_message, 2000)
+        if self._replay_tiles:
+            self.atlas.save()
+            self.refresh_list_icons()
+            self.atlas_widget.set_selection(*self._replay_tiles[-1])
+        if self._replay_block is not None:
+            self.show_block(self._replay_block)
+        self.update_undo_actions()
+
+    def apply_history_op(self, op, undo):
+        """Применяет операцию журнала (см. history.py) в одну или другую сторону"""
+        kind = op[0]
+        if kind == "field":
+            _, b, key, old, new = op
+            prev = b.get(key)
+            b[key] = old if undo else new
+            if key in FACE_KEYS:
+                self.move_face(b, key, prev, b[key])
+            self.schedule_block_ui(b, prev if key == 'id' else None)
+            self._replay_block = b
+        elif kind in ("insert", "remove"):
+            _, row, b = op
+            if (kind == "insert") != undo:
+                self.block_model.insert_block(row, b)
+                self.select_source_row(row)
+            else:
+                if b is self.current_block:
+                    self.current_block = None
+                self.block_model.remove_row(row)
+                if self.current_block is None:
+                    self.right_container.setVisible(False)
+            self.block_cells_changed(b)
+        elif kind == "tile":
+            _, col, row, old, new = op
+            img = decode_tile_patch(old if undo else new)
+            self.atlas.ensure_loaded()
+            self.atlas.paste_tile(col, row, img)
+            self.atlas_widget.replace_tile(col, row, img)
+            self._replay_tiles.append((col, row))
+
+    def show_block(self, block):
+        """Выбирает блок в списке (или перечитывает поля, если он уже выбран)"""
+        row = self.block_model.row_of(block)
+        if row < 0: return
+        if block is self.current_block:
+            self.on_block_selected(row)
         else:
-            b['sound'] = None
+            self.select_source_row(row)
 
-        cur_item = self.list_widget.currentItem()
-        if cur_item: cur_item.setText(f"[{b['id']}] {b['name']}")
-        self.lbl_atlas_title.setText(f"Texture Atlas - Editing: {b['name']}")
+    def estimate_mesh_cost(self):
+        """Размер мешей мира с переключенным transparent у текущего блока"""
+        if not self.current_block: return
+        try:
+            import mesher
+        except ImportError as e:
+            QMessageBox.critical(self, "Error", f"NumPy is required: {e}")
+            return
+
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            region_dir = os.path.join(block_data.PROJECT_ROOT, "assets", "regions")
+            regions = sorted(f for f in os.listdir(region_dir) if f.endswith(".vxr")) if os.path.isdir(region_dir) else []
+            if regions:
+                source = f"baked region {regions[0]}"
+                chunks = mesher.load_region_chunks(os.path.join(region_dir, regions[0]))
+            else:
+                source = "8x8 generated terrain chunks"
+                chunks = mesher.generated_chunks(-4, -4, 8, 8)
+            b = self.current_block
+            before, after = mesher.transparent_delta(chunks, self.blocks, b['id'])
+        except Exception as e:
+            QMessageBox.critical(self, "Error", str(e))
+            return
+        finally:
+            QApplication.restoreOverrideCursor()
+
+        state = "off" if b['transparent'] else "on"
+        ratio = after['bytes'] / before['bytes'] if before.get('bytes') else 0
+        QMessageBox.information(
+            self, "Mesh cost",
+            f"{source}, {before.get('chunks', 0)} chunks\n\n"
+            f"As is: {before.get('vertices', 0)} vertices, {before.get('bytes', 0) / 1024:.0f} KB\n"
+            f"Transparent {state} for [{b['id']}] {b['name']}: {after.get('vertices', 0)} vertices, "
+            f"{after.get('bytes', 0) / 1024:.0f} KB (x{ratio:.2f})")
 
     def apply_sound_preset(self, name):
         if not self.current_block: return
@@ -478,99 +1398,350 @@ class MainWindow(QMainWindow):
         self.inp_snd_place.setText(p['place'])
 
     def add_block(self):
-        nid = max((b['id'] for b in self.blocks), default=-1) + 1
-        new_b = {"id": nid, "name": "NewBlock", "atlas": [0, 0], "atlasTop": None, "atlasBottom": None, "solid": True,
-                 "transparent": False, "sound": None}
-        self.blocks.append(new_b)
-        self.list_widget.addItem(f"[{nid}] NewBlock")
-        self.list_widget.setCurrentRow(len(self.blocks) - 1)
+        self.flush_block_ui()  # индекс id должен учесть последние правки
+        new_b = block_data.new_block(self.block_model.id_index.next_id())
+        row = self.block_model.append_block(new_b)
+        self.block_cells_changed(new_b)
+        self.history.record(("insert", row, new_b))
+        self.select_source_row(row)
+        self.update_undo_actions()
 
     def delete_block(self):
-        row = self.list_widget.currentRow()
+        row = self.current_source_row()
         if row >= 0:
-            del self.blocks[row]
-            self.list_widget.takeItem(row)
             self.current_block = None
-            self.right_container.setVisible(False)
+            removed = self.block_model.remove_row(row)
+            self.block_cells_changed(removed)
+            self.history.record(("remove", row, removed))
+            if self.current_block is None:
+                self.right_container.setVisible(False)
+            self.update_undo_actions()
+
+    # --- ИМПОРТ ПАПКИ ТЕКСТУР ---
+
+    def import_texture_folder(self):
+        """Папка name_side/top/bottom.png -> атлас: декодирование в потоках, одна запись atlas.png"""
+        if not self.has_pil:
+            QMessageBox.critical(self, "Error", "Pillow not installed")
+            return
+        if not self.block_file: return
+        folder = QFileDialog.getExistingDirectory(self, "Select Texture Folder")
+        if not folder: return
+
+        import texture_import
+
+        manifest, unmatched = texture_import.folder_manifest(folder, self.blocks)
+        if not manifest["textures"]:
+            QMessageBox.information(self, "Import", "No textures in this folder match a block name.")
+            return
+
+        paths = [os.path.join(folder, e["file"]) for e in manifest["textures"]]
+        dialog = QProgressDialog("Decoding textures...", "Cancel", 0, len(paths), self)
+        dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        dialog.setMinimumDuration(0)
+        dialog.setValue(0)
+        cancel = threading.Event()
+        dialog.canceled.connect(cancel.set)
+
+        def done(decoded, seconds):
+            dialog.reset()
+            dialog.deleteLater()
+            if decoded is None or cancel.is_set():
+                self.statusBar().showMessage("Import cancelled, nothing written", 3000)
+                return
+            self.apply_texture_import(folder, manifest, decoded, unmatched)
+
+        def failed(message):
+            dialog.reset()
+            dialog.deleteLater()
+            QMessageBox.critical(self, "Import Error", message)
+
+        self.start_task(texture_import.decode_files, (paths, None), done, failed,
+                        on_progress=lambda n, total: dialog.setValue(n), cancelled=cancel.is_set)
+
+    def apply_texture_import(self, folder, manifest, decoded, unmatched):
+        """Раскладывает декодированные тайлы в атлас и блоки; отменяется одной записью журнала"""
+        import editor_cli
+        from PIL import Image
+
+        self.flush_block_ui()
+        self.atlas.ensure_loaded()
+        dirty_before = set(self.atlas.dirty_cells)
+        faces_before = [(b, [b.get(k) for k in FACE_KEYS]) for b in self.blocks]
+        try:
+            count, changed = editor_cli.apply_manifest(manifest, self.blocks, self.atlas, folder, decoded)
+            error = None
+        except (editor_cli.ManifestError, ValueError) as e:
+            count, changed, error = 0, set(), e
+
+        # Новые тайлы ложатся только в свободные (полностью прозрачные) клетки - старое содержимое пустое
+        empty = Image.new("RGBA", (TILE_SIZE, TILE_SIZE), (0, 0, 0, 0))
+        new_cells = sorted(self.atlas.dirty_cells - dirty_before, key=lambda c: (c[1], c[0]))
+        if error is not None:
+            # Откатываем то, что успело примениться
+            for col, row in new_cells:
+                self.atlas.paste_tile(col, row, empty)
+            self.atlas.dirty_cells -= set(new_cells)
+            for b, faces in faces_before:
+                for k, v in zip(FACE_KEYS, faces):
+                    b[k] = v
+            QMessageBox.critical(self, "Import Error", str(error))
+            return
+
+        empty_patch = encode_tile_patch(empty)
+        self.history.begin()
+        try:
+            for col, row in new_cells:
+                tile = self.atlas.get_tile(col, row)
+                self.history.record(("tile", col, row, empty_patch, encode_tile_patch(tile)))
+                self.atlas_widget.replace_tile(col, row, tile)
+            for b, faces in faces_before:
+                for k, old in zip(FACE_KEYS, faces):
+                    if b.get(k) != old:
+                        self.move_face(b, k, old, b[k])
+                        self.history.record(("field", b, k, old, b[k]))
+                if any(b.get(k) != old for k, old in zip(FACE_KEYS, faces)):
+                    self.schedule_block_ui(b)
+        finally:
+            self.history.end()
+        if new_cells:
+            self.atlas.save()  # одна запись на весь импорт
+        self.refresh_list_icons()
+        if self.current_block:
+            for k in FACE_KEYS:
+                self.update_texture_ui_row(k)
+        self.update_undo_actions()
+
+        msg = f"Imported {count} textures: {len(new_cells)} new cells, {len(changed)} blocks updated"
+        if unmatched:
+            msg += f"; skipped {len(unmatched)} files with no matching block"
+        self.statusBar().showMessage(msg, 8000)
+
+    # --- НЕИСПОЛЬЗУЕМЫЕ ТАЙЛЫ ---
+
+    def prune_unused_tiles(self):
+        """Стирает непустые клетки, на которые не ссылается ни один блок (по обратному индексу).
+
+        Координаты блоков не меняются, atlas.png пишется один раз; отменяется одной записью журнала.
+        Переупаковка с переписыванием координат - editor_cli.py compact.
+        """
+        if not self.has_pil:
+            QMessageBox.critical(self, "Error", "Pillow not installed")
+            return
+        if not self.block_file: return
+        from PIL import Image
+
+        self.flush_block_ui()
+        self.atlas.ensure_loaded()
+        index = self.block_model.tile_index
+        cells = [(i % GRID_SIZE, i // GRID_SIZE) for i in (~self.atlas.empty_mask()).nonzero()[0].tolist()]
+        unused = [c for c in cells if c not in index]
+        if not unused:
+            self.statusBar().showMessage("No unused tiles: every non-empty cell is referenced by a block", 5000)
+            return
+        answer = QMessageBox.question(
+            self, "Prune unused tiles",
+            f"Clear {len(unused)} of {len(cells)} non-empty atlas cells that no block uses?\n"
+            "Block coordinates stay the same; Undo restores the tiles.")
+        if answer != QMessageBox.StandardButton.Yes:
+            return
+
+        # "До" - тем же кодировщиком, что и "после", иначе разница в настройках PNG съест выигрыш
+        buf = io.BytesIO()
+        self.atlas.image.save(buf, "PNG", optimize=True)
+        size_before = buf.tell()
+        empty = Image.new("RGBA", (TILE_SIZE, TILE_SIZE), (0, 0, 0, 0))
+        empty_patch = encode_tile_patch(empty)
+        self.history.begin()
+        try:
+            for col, row in unused:
+                self.history.record(("tile", col, row, encode_tile_patch(self.atlas.get_tile(col, row)), empty_patch))
+                self.atlas.paste_tile(col, row, empty)
+                self.atlas_widget.replace_tile(col, row, empty)
+        finally:
+            self.history.end()
+        self.atlas.save(optimize=True)
+        self.update_undo_actions()
+        size_after = os.path.getsize(self.atlas.path)
+        self.statusBar().showMessage(
+            f"Pruned {len(unused)} unused tiles: atlas.png {size_before / 1024:.1f} KB -> {size_after / 1024:.1f} KB", 8000)
+
+    # --- DEV-СЕРВЕР ---
+
+    def start_dev_server(self, port=None):
+        import dev_server
+
+        if self.dev_server: return
+        port = port or self.dev_server_port
+        try:
+            self.dev_server = dev_server.DevServer(block_data.PROJECT_ROOT, port=port).start()
+        except OSError as e:
+            QMessageBox.critical(self, "Dev Server", f"Cannot listen on port {port}: {e}")
+            self.act_serve.setChecked(False)
+            return
+        self.dev_server_port = port
+        self.act_serve.setChecked(True)
+        self.statusBar().showMessage(f"Dev server at {self.dev_server.url}", 5000)
+
+    def stop_dev_server(self):
+        if not self.dev_server: return
+        self.dev_server.stop()
+        self.dev_server = None
+        self.statusBar().showMessage("Dev server stopped", 3000)
+
+    def closeEvent(self, event):
+        self.stop_dev_server()
+        super().closeEvent(event)
+
+    # --- ЗАГРУЗКА (в фоне) ---
+
+    def start_task(self, fn, args, on_done, on_failed, on_progress=None, **kwargs):
+        """kwargs уходят в fn как есть (например cancelled=...)"""
+        task = LoadTask(functools.partial(fn, **kwargs) if kwargs else fn, *args, with_progress=on_progress is not None)
+        task.signals.done.connect(on_done)
+        task.signals.failed.connect(on_failed)
+        if on_progress:
+            task.signals.progress.connect(on_progress)
+        # Держим объект сигналов, пока не придет результат (саму задачу удаляет пул)
+        signals = task.signals
+        self._tasks.add(signals)
+        signals.done.connect(lambda *_: self._tasks.discard(signals))
+        signals.failed.connect(lambda *_: self._tasks.discard(signals))
+        self.thread_pool.start(task)
 
     def load_data(self):
+        """Разбор constants.js и декодирование атласа идут в QThreadPool, окно показывается сразу"""
         if not os.path.exists(CONSTANTS_PATH):
             QMessageBox.critical(self, "Error", f"File not found:\n{CONSTANTS_PATH}")
             return
-        with open(CONSTANTS_PATH, "r", encoding="utf-8") as f:
-            self.file_content = f.read()
-        match = re.search(r"export const BLOCK_DATA = \[(.*?)\];", self.file_content, re.DOTALL)
-        if match:
-            self.blocks = self._parse_js_array(match.group(1))
-            self.refresh_list()
+        self.set_loading("constants", True)
+        self.set_loading("atlas", True)
+        self.atlas_widget.setText("Loading atlas...")
+        self.start_task(block_data.load_block_file, (CONSTANTS_PATH,), self.on_blocks_loaded,
+                        lambda message: self.on_load_failed("constants", message))
+        self.start_task(read_atlas_pages, (ATLAS_PATH,), self.on_atlas_loaded,
+                        lambda message: self.on_load_failed("atlas", message))
+
+    def set_loading(self, part, loading):
+        if loading:
+            self._loading.add(part)
+        else:
+            self._loading.discard(part)
+        blocks_ready = "constants" not in self._loading
+        self.list_view.setEnabled(blocks_ready)
+        self.inp_filter.setEnabled(blocks_ready)
+        self.btn_save_file.setEnabled(blocks_ready)
+        if self._loading:
+            files = {"constants": "constants.js", "atlas": "atlas.png"}
+            self.statusBar().showMessage(f"Loading {', '.join(files[p] for p in sorted(self._loading))}...")
+        elif not loading:
+            self.statusBar().clearMessage()
+            self.report_startup()
+
+    def is_loaded(self):
+        return not self._loading
+
+    def on_blocks_loaded(self, block_file, seconds):
+        if self.profile:
+            self.profile.mark("constants.js parsed", seconds)
+        if TIMING_ENABLED:
+            log_timing("parse constants.js (background)", seconds)
+        self.block_file = block_file
+        self.blocks = self.block_file.blocks
+        self.history.clear()
+        self.refresh_list()
+        self.atlas_widget.usage_changed()
+        self.set_loading("constants", False)
+        dups = sorted(self.block_model.id_index.duplicates)
+        if dups:
+            self.statusBar().showMessage(f"Duplicate block ids: {', '.join(map(str, dups))}", 10000)
+
+    def on_atlas_loaded(self, pages, seconds):
+        if self.profile:
+            self.profile.mark("atlas.png decoded", seconds)
+        if TIMING_ENABLED:
+            log_timing("decode atlas.png (background)", seconds)
+        self.atlas_widget.set_atlas_image(pages)
+        self.refresh_list_icons()
+        if self.current_block:
+            for k in FACE_KEYS:
+                self.update_texture_ui_row(k)
+        self.set_loading("atlas", False)
+
+    def on_load_failed(self, part, message):
+        if part == "constants":
+            QMessageBox.critical(self, "Parse Error", f"{CONSTANTS_PATH}\n{message}")
+        else:
+            self.atlas_widget.setText("Atlas failed to load")
+            QMessageBox.critical(self, "Error", f"{ATLAS_PATH}\n{message}")
+        self.set_loading(part, False)
+
+    def event(self, e):
+        if e.type() == QEvent.Type.Paint and self.profile and not self.profile.has("first paint"):
+            self.profile.mark("first paint")
+            QTimer.singleShot(0, self.report_startup)
+        return super().event(e)
+
+    def report_startup(self):
+        """Печатает профиль запуска, когда окно отрисовано и все загружено"""
+        if not self.profile or self.profile.has("ready") or self._loading or not self.profile.has("first paint"):
+            return
+        self.profile.mark("ready")
+        print(self.profile.report(), flush=True)
 
     def _parse_js_array(self, raw_data):
-        blocks = []
-        items = re.findall(r"\{\s*id:.*?\}(?:,|\s*$)", raw_data, re.DOTALL)
-        if not items: items = raw_data.split("},")
-        for item in items:
-            if "id:" not in item: continue
-            b = {}
-
-            def get_val(pattern, text, type_func=str):
-                m = re.search(pattern, text)
-                return type_func(m.group(1)) if m else None
-
-            b["id"] = get_val(r"id:\s*(\d+)", item, int)
-            b["name"] = get_val(r"name:\s*['\"](.*?)['\"]", item)
-            m_atlas = re.search(r"atlas:\s*\[(\d+),\s*(\d+)\]", item)
-            b["atlas"] = [int(m_atlas.group(1)), int(m_atlas.group(2))] if m_atlas else [0, 0]
-            m_top = re.search(r"atlasTop:\s*\[(\d+),\s*(\d+)\]", item)
-            b["atlasTop"] = [int(m_top.group(1)), int(m_top.group(2))] if m_top else None
-            m_bot = re.search(r"atlasBottom:\s*\[(\d+),\s*(\d+)\]", item)
-            b["atlasBottom"] = [int(m_bot.group(1)), int(m_bot.group(2))] if m_bot else None
-            b["transparent"] = (get_val(r"transparent:\s*(true|false)", item) == "true")
-            b["solid"] = (get_val(r"solid:\s*(true|false)", item) == "true")
-            snd_match = re.search(r"sound:\s*\{(.*?)\}", item, re.DOTALL)
-            if snd_match:
-                raw_s = snd_match.group(1)
-                b["sound"] = {"step": get_val(r"step:\s*['\"](.*?)['\"]", raw_s) or "",
-                              "break": get_val(r"break:\s*['\"](.*?)['\"]", raw_s) or "",
-                              "place": get_val(r"place:\s*['\"](.*?)['\"]", raw_s) or ""}
-            else:
-                b["sound"] = None
-            blocks.append(b)
-        blocks.sort(key=lambda x: x['id'])
-        return blocks
+        with self.timing("_parse_js_array"):
+            return block_data.parse_js_array(raw_data)
+
+    def timing(self, name):
+        """timing() с выводом в строку состояния окна"""
+        return timing(name, lambda message: self.statusBar().showMessage(message, 5000))
 
     def save_to_file(self):
-        js_str = "\n"
-        for b in self.blocks:
-            js_str += "    { \n"
-            js_str += f"        id: {b['id']}, name: '{b['name']}', \n"
-            js_str += f"        atlas: {b['atlas']}, \n"
-            if b['atlasTop']: js_str += f"        atlasTop: {b['atlasTop']}, \n"
-            if b['atlasBottom']: js_str += f"        atlasBottom: {b['atlasBottom']}, \n"
-            js_str += f"        transparent: {str(b['transparent']).lower()}, \n"
-            js_str += f"        solid: {str(b['solid']).lower()}, \n"
-            if b['sound']:
-                s = b["sound"]
-                js_str += f"        sound: {{ step: '{s.get('step', '')}', break: '{s.get('break', '')}', place: '{s.get('place', '')}' }}\n"
-            else:
-                js_str += "        sound: null\n"
-            js_str += "    },\n"
-        new_content = re.sub(r"export const BLOCK_DATA = \[(.*?)\];", f"export const BLOCK_DATA = [{js_str}];",
-                             self.file_content, flags=re.DOTALL)
+        if not self.block_file: return
+        self.flush_block_ui()
+        dups = sorted(self.block_model.id_index.duplicates)
+        if dups:
+            answer = QMessageBox.question(
+                self, "Duplicate ids",
+                f"Blocks share ids {', '.join(map(str, dups))}; the engine will keep only one block per id.\n"
+                "Save anyway?")
+            if answer != QMessageBox.StandardButton.Yes:
+                return
         try:
-            with open(CONSTANTS_PATH, "w", encoding="utf-8") as f:
-                f.write(new_content)
-            self.statusBar().showMessage("Saved successfully to constants.js", 3000)
+            with self.timing("save_to_file"):
+                saved = self.block_file.save(self.blocks)
+            if saved:
+                self.statusBar().showMessage("Saved successfully to constants.js", 3000)
+            else:
+                self.statusBar().showMessage("No changes to save", 3000)
         except Exception as e:
             QMessageBox.critical(self, "Save Error", str(e))
 
     def refresh_list(self):
-        self.list_widget.clear()
-        for b in self.blocks: self.list_widget.addItem(f"[{b['id']}] {b['name']}")
+        self.block_model.set_blocks(self.blocks)
+
+    def refresh_list_icons(self):
+        self.block_model.refresh_icons()
 
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(prog="block_editor", description="Block & atlas editor")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="Print import, parse, decode and first-paint times once the editor is up")
+    parser.add_argument("--serve", type=int, nargs="?", const=8000, default=None, metavar="PORT",
+                        help="Also run the dev asset server (default port 8000)")
+    args, qt_args = parser.parse_known_args()
+    profile = StartupProfile() if args.startup_profile else None
+    if profile:
+        profile.mark("imports")
+
+    app = QApplication(sys.argv[:1] + qt_args)
     app.setStyle("Fusion")
-    window = MainWindow()
+    window = MainWindow(profile)
+    if args.serve:
+        window.start_dev_server(args.serve)
     window.show()
+    if profile:
+        profile.mark("window shown")
     sys.exit(app.exec())
\ No newline at end of file
@@ -0,0 +1,380 @@
+"""Dev-сервер проекта вместо python -m http.server.
+
+- ETag на каждый файл (хеш содержимого) и ответ 304 на If-None-Match:
+  браузер не скачивает atlas.png и модули заново, пока они не изменились;
+- сжатые версии текстовых файлов (gzip, brotli - если установлен модуль brotli)
+  готовятся один раз на версию файла, а не на каждый запрос;
+- /__events - поток Server-Sent Events: сервер следит за constants.js и atlas.png
+  и присылает, какие id блоков и какие клетки атласа изменились:
+
+    event: change
+    data: {"file": "js/constants.js", "blocks": [3, 12]}
+
+    event: change
+    data: {"file": "assets/atlas.png", "cells": [[2, 0], [5, 1]]}
+
+  Если клетки посчитать нечем (нет Pillow/NumPy) или поменялся размер атласа, "cells": null.
+
+    python py/dev_server.py [--port 8000]
+    python py/block_editor.py --serve 8000
+"""
+import argparse
+import functools
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import queue
+import sys
+import threading
+import time
+import urllib.parse
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import block_data
+from block_data import ATLAS_PATH, CONSTANTS_PATH, PROJECT_ROOT
+
+DEFAULT_PORT = 8000
+EVENTS_PATH = "/__events"
+COMPRESSIBLE = (".html", ".js", ".mjs", ".css", ".json", ".svg", ".txt", ".md", ".bin")
+MAX_CACHED_FILE = 16 * 1024 * 1024  # файлы больше не держим в памяти, ETag по mtime/размеру
+POLL_SECONDS = 0.5
+HEARTBEAT_SECONDS = 15
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+class AssetCache:
+    """ETag и сжатые тела файлов; пересчитываются только при смене mtime/размера"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._brotli = _brotli()
+
+    def get(self, path):
+        st = os.stat(path)
+        key = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry and entry["key"] == key:
+            return entry
+
+        if st.st_size > MAX_CACHED_FILE:
+            tag = hashlib.blake2b(f"{path}|{key}".encode("utf-8"), digest_size=12).hexdigest()
+            entry = {"key": key, "etag": tag, "body": None, "gzip": None, "br": None}
+        else:
+            with open(path, "rb") as f:
+                body = f.read()
+            entry = {"key": key, "etag": hashlib.blake2b(body, digest_size=12).hexdigest(), "body": body,
+                     "gzip": None, "br": None}
+            if path.endswith(COMPRESSIBLE) and body:
+                entry["gzip"] = gzip.compress(body, 9, mtime=0)
+                if self._brotli:
+                    entry["br"] = self._brotli.compress(body)
+        with self._lock:
+            self._entries[path] = entry
+        return entry
+
+
+class EventHub:
+    """Очереди подписчиков /__events"""
+
+    def __init__(self):
+        self._clients = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        q = queue.Queue()
+        with self._lock:
+            self._clients.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._clients.discard(q)
+
+    def publish(self, event):
+        """event - словарь или None (сервер останавливается)"""
+        with self._lock:
+            clients = list(self._clients)
+        for q in clients:
+            q.put(event)
+
+    def __len__(self):
+        return len(self._clients)
+
+
+# --- ОТСЛЕЖИВАНИЕ ИЗМЕНЕНИЙ ---
+
+def block_snapshots(path=CONSTANTS_PATH):
+    """{id: слепок блока} из constants.js"""
+    return {b['id']: block_data.snapshot(b) for b in block_data.load_block_file(path).blocks}
+
+
+def changed_block_ids(old, new):
+    return sorted(i for i in old.keys() | new.keys() if old.get(i) != new.get(i))
+
+
+def atlas_cell_hashes(path=ATLAS_PATH):
+    """(размер, хеши клеток) атласа или None, если нет Pillow/NumPy"""
+    try:
+        from PIL import Image
+        from atlas import GRID_SIZE, hash_tiles, tiles_array
+    except ImportError:
+        return None
+    with Image.open(path) as img:
+        image = img.convert("RGBA")
+    return image.size, hash_tiles(tiles_array(image, image.width // GRID_SIZE)), GRID_SIZE
+
+
+def changed_cells(old, new):
+    """Клетки [[col, row], ...] с другим хешем; None - считать изменившимся весь атлас"""
+    if old is None or new is None or old[0] != new[0]:
+        return None
+    grid = new[2]
+    return [[int(i % grid), int(i // grid)] for i in (old[1] != new[1]).nonzero()[0]]
+
+
+class AssetWatcher(threading.Thread):
+    """Опрашивает mtime constants.js и atlas.png и публикует разницу в EventHub"""
+
+    def __init__(self, hub, constants_path=CONSTANTS_PATH, atlas_path=ATLAS_PATH, root=PROJECT_ROOT,
+                 interval=POLL_SECONDS):
+        super().__init__(name="asset-watcher", daemon=True)
+        self.hub = hub
+        self.root = root
+        self.interval = interval
+        self.stopping = threading.Event()
+        self._watched = {
+            constants_path: (block_snapshots, self._blocks_event),
+            atlas_path: (atlas_cell_hashes, self._atlas_event),
+        }
+        self._stamps = {}
+        self._states = {}
+        for path, (load, _) in self._watched.items():
+            self._stamps[path] = self._stamp(path)
+            self._states[path] = self._load(path, load)
+
+    @staticmethod
+    def _stamp(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    @staticmethod
+    def _load(path, load):
+        try:
+            return load(path)
+        except Exception as e:
+            # Файл могут сохранять прямо сейчас или он с ошибкой - ждем следующей версии
+            print(f"dev_server: cannot read {path}: {e}", file=sys.stderr)
+            return None
+
+    def _blocks_event(self, path, old, new):
+        if new is None:
+            return None
+        blocks = changed_block_ids(old, new) if old is not None else sorted(new)
+        return {"file": self._rel(path), "blocks": blocks}
+
+    def _atlas_event(self, path, old, new):
+        return {"file": self._rel(path), "cells": changed_cells(old, new)}
+
+    def _rel(self, path):
+        return os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def check(self):
+        """Один проход: публикует события по изменившимся файлам, возвращает их"""
+        events = []
+        for path, (load, make_event) in self._watched.items():
+            stamp = self._stamp(path)
+            if stamp == self._stamps[path]:
+                continue
+            self._stamps[path] = stamp
+            state = self._load(path, load) if stamp else None
+            event = make_event(path, self._states[path], state)
+            if state is not None:
+                self._states[path] = state
+            if event is not None:
+                events.append(event)
+                self.hub.publish(event)
+        return events
+
+    def run(self):
+        while not self.stopping.wait(self.interval):
+            self.check()
+
+    def stop(self):
+        self.stopping.set()
+
+
+# --- HTTP ---
+
+class AssetRequestHandler(SimpleHTTPRequestHandler):
+    cache = None  # AssetCache, задается сервером
+    hub = None
+
+    def end_headers(self):
+        self.send_header("Cache-Control", "no-cache")  # кешировать можно, но с проверкой ETag
+        super().end_headers()
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] == EVENTS_PATH:
+            self.serve_events()
+        else:
+            self.serve_file(send_body=True)
+
+    def do_HEAD(self):
+        self.serve_file(send_body=False)
+
+    def serve_file(self, send_body):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            parts = urllib.parse.urlsplit(self.path)
+            if not parts.path.endswith("/"):
+                # Как у http.server: иначе относительные ссылки index.html считались бы от родителя
+                self.send_response(HTTPStatus.MOVED_PERMANENTLY)
+                self.send_header("Location", urllib.parse.urlunsplit(parts._replace(path=parts.path + "/")))
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            index = os.path.join(path, "index.html")
+            if not os.path.isfile(index):
+                # Листинг каталога - как у http.server
+                f = self.send_head()
+                if f:
+                    try:
+                        if send_body:
+                            self.copyfile(f, self.wfile)
+                    finally:
+                        f.close()
+                return
+            path = index
+        if not os.path.isfile(path):
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return
+
+        entry = self.cache.get(path)
+        accept = self.headers.get("Accept-Encoding", "")
+        encoding = next((e for e in ("br", "gzip") if entry[e] is not None and e in accept), None)
+        etag = f'"{entry["etag"]}-{encoding}"' if encoding else f'"{entry["etag"]}"'
+
+        if etag in [t.strip() for t in self.headers.get("If-None-Match", "").split(",")]:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            return
+
+        body = entry[encoding] if encoding else entry["body"]
+        size = len(body) if body is not None else entry["key"][1]
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", mimetypes.guess_type(path)[0] or "application/octet-stream")
+        self.send_header("Content-Length", str(size))
+        self.send_header("ETag", etag)
+        self.send_header("Vary", "Accept-Encoding")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.end_headers()
+        if not send_body:
+            return
+        if body is not None:
+            self.wfile.write(body)
+        else:
+            with open(path, "rb") as f:
+                self.copyfile(f, self.wfile)
+
+    def serve_events(self):
+        q = self.hub.subscribe()
+        try:
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "keep-alive")
+            self.end_headers()
+            self.wfile.write(b"retry: 1000\n\n")
+            self.wfile.flush()
+            while True:
+                try:
+                    event = q.get(timeout=HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    self.wfile.write(b": ping\n\n")
+                else:
+                    if event is None:
+                        break
+                    self.wfile.write(f"event: change\ndata: {json.dumps(event)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.hub.unsubscribe(q)
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        # Поток событий и 304 не засоряют консоль. path нет, если строка запроса битая (ответ 400)
+        path = getattr(self, "path", "").split("?", 1)[0]
+        if path != EVENTS_PATH and not (len(args) > 1 and str(args[1]) == "304"):
+            super().log_message(format, *args)
+
+
+class DevServer:
+    """HTTP-сервер + наблюдатель за файлами в фоновых потоках"""
+
+    def __init__(self, root=PROJECT_ROOT, host="127.0.0.1", port=DEFAULT_PORT):
+        self.root = root
+        constants_path = os.path.join(root, os.path.relpath(CONSTANTS_PATH, PROJECT_ROOT))
+        atlas_path = os.path.join(root, os.path.relpath(ATLAS_PATH, PROJECT_ROOT))
+        self.hub = EventHub()
+        handler = type("Handler", (AssetRequestHandler,), {"cache": AssetCache(), "hub": self.hub})
+        self.httpd = ThreadingHTTPServer((host, port), functools.partial(handler, directory=root))
+        self.httpd.daemon_threads = True
+        self.watcher = AssetWatcher(self.hub, constants_path, atlas_path, root)
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="dev-server", daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self.watcher.start()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.watcher.stop()
+        self.hub.publish(None)  # закрыть открытые потоки событий
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="dev_server", description="Serve the project with ETags, gzip and change events")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--root", default=PROJECT_ROOT)
+    args = parser.parse_args(argv)
+
+    server = DevServer(os.path.abspath(args.root), args.host, args.port).start()
+    print(f"Serving {server.root} at {server.url} (change events: {server.url.rstrip('/')}{EVENTS_PATH})")
+    try:
+        while True:
+            time.sleep(1)  # сервер в своем потоке; главный ждет Ctrl+C
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()  # в том числе закрывает потоки /__events
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,367 @@
+"""Консольные команды редактора блоков (работают без дисплея и без Qt).
+
+    python py/editor_cli.py batch manifest.json
+
+Манифест (JSON):
+
+    {
+        "textures": [
+            {"file": "tex/grass_side.png", "cell": [2, 1], "block": "Grass", "face": "side"},
+            {"file": "tex/grass_top.png", "cell": [3, 1], "block": 3, "faces": ["top"]},
+            {"file": "tex/glass.png", "cell": [9, 4]},
+            {"file": "tex/planks.png", "block": "Planks"}
+        ]
+    }
+
+Пути к файлам считаются относительно манифеста. Все тайлы вставляются в один
+атлас в памяти, atlas.png и constants.js записываются по одному разу.
+Записи без "cell" размещаются автоматически: одинаковый тайл переиспользуется,
+иначе берется свободная клетка.
+
+    python py/editor_cli.py compact [--dry-run]
+
+Переупаковывает атлас: убирает неиспользуемые и повторяющиеся тайлы и
+переписывает координаты блоков.
+
+    python py/editor_cli.py export-mips [--padding 8] [--out-dir assets]
+
+Атлас с полями вокруг тайлов и готовые мип-уровни (atlas_padded*.png + .json).
+
+    python py/editor_cli.py export-array [--out assets/atlas_layers.bin]
+
+Массив текстур: по слою на каждый используемый блоками тайл (см. atlas_export).
+
+    python py/editor_cli.py import-dir textures/ [--workers 8] [--dry-run]
+
+Папка текстур с именами вида grass_top.png, grass_side.png, stone.png
+(см. texture_import): файлы декодируются параллельно, дальше - как batch.
+
+    python py/editor_cli.py encode-atlas [--out-dir build/] [--in-place]
+
+Кодирует atlas.png без потерь во все форматы сразу (палитровый и оптимизированный
+PNG, lossless WebP), сверяет каждый попиксельно и печатает размер и время декодирования.
+--in-place переписывает atlas.png самым маленьким точным PNG.
+
+    python py/editor_cli.py sound-sprite [--check] [--sounds-dir assets/sounds]
+
+Проверяет, что для всех звуков блоков есть файлы, и склеивает WAV в один
+assets/sounds/sprite.wav с манифестом sprite.json (см. sound_sprite). mp3 / ogg
+пропускаются с сообщением: движок грузит их отдельными файлами.
+"""
+import argparse
+import json
+import os
+import sys
+
+import block_data
+from atlas import Atlas, AtlasAllocator, load_tile_image
+
+
+class ManifestError(Exception):
+    pass
+
+
+def _entry_faces(entry):
+    faces = entry.get("faces")
+    if faces is None:
+        faces = [entry["face"]] if "face" in entry else ["atlas"]
+    return [block_data.face_key(f) for f in faces]
+
+
+def apply_manifest(manifest, blocks, atlas, base_dir=".", decoded=None):
+    """Применяет все назначения из манифеста. Возвращает (кол-во тайлов, измененные блоки).
+
+    decoded - уже декодированные тайлы {путь: PIL RGBA} (texture_import.decode_files).
+    """
+    entries = manifest.get("textures", [])
+    decoded = dict(decoded or {})  # один и тот же файл декодируем один раз
+    changed_blocks = set()
+    allocator = None
+
+    for i, entry in enumerate(entries):
+        try:
+            file_path = os.path.join(base_dir, entry["file"])
+            cell = [int(v) for v in entry["cell"]] if "cell" in entry else None
+            if cell is not None and len(cell) != 2:
+                raise ValueError(f"bad cell {entry['cell']}")
+        except (KeyError, TypeError, ValueError) as e:
+            raise ManifestError(f"textures[{i}]: expected 'file' and optional 'cell' [col, row] ({e})")
+
+        b = None
+        if "block" in entry:
+            b = block_data.find_block(blocks, entry["block"])
+            if b is None:
+                raise ManifestError(f"textures[{i}]: unknown block {entry['block']!r}")
+        faces = _entry_faces(entry) if b is not None else []
+
+        if file_path not in decoded:
+            if not os.path.exists(file_path):
+                raise ManifestError(f"textures[{i}]: file not found: {file_path}")
+            decoded[file_path] = load_tile_image(file_path)
+
+        if cell is None:
+            if allocator is None:
+                allocator = AtlasAllocator(atlas, blocks)
+            (col, row), _ = allocator.place(decoded[file_path])
+        else:
+            col, row = cell
+            atlas.paste_tile(col, row, decoded[file_path])
+        if allocator is not None:
+            # Ссылки как в AtlasAllocator: (id блока, ключ грани) - клетка больше не свободна
+            for key in faces:
+                allocator.reference((col, row), b['id'], key)
+
+        for key in faces:
+            if b[key] != [col, row]:
+                b[key] = [col, row]
+                changed_blocks.add(b['id'])
+
+    return len(entries), changed_blocks
+
+
+def _apply_and_save(args, manifest, block_file, atlas, base_dir, decoded=None):
+    """Общая часть batch и import-dir: манифест в атлас и блоки, затем atlas.png и constants.js по разу"""
+    try:
+        count, changed = apply_manifest(manifest, block_file.blocks, atlas, base_dir, decoded)
+    except (ManifestError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    cells = len(atlas.dirty_cells)
+    if args.dry_run:
+        print(f"{count} textures, {cells} cells, {len(changed)} blocks (dry run, nothing written)")
+        return 0
+
+    if atlas.dirty:
+        atlas.save(args.out_atlas or args.atlas)
+    if changed:
+        block_file.save(block_file.blocks)
+    print(f"{count} textures -> {cells} cells written, {len(changed)} blocks updated")
+    return 0
+
+
+def cmd_batch(args):
+    manifest_path = os.path.abspath(args.manifest)
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    block_file = block_data.load_block_file(args.constants)
+    atlas = Atlas(args.atlas).load()
+    return _apply_and_save(args, manifest, block_file, atlas, os.path.dirname(manifest_path))
+
+
+def cmd_import_dir(args):
+    import texture_import
+
+    folder = os.path.abspath(args.folder)
+    block_file = block_data.load_block_file(args.constants)
+    manifest, unmatched = texture_import.folder_manifest(folder, block_file.blocks)
+    for name in unmatched:
+        print(f"Skipped {name}: no block with that name", file=sys.stderr)
+    if not manifest["textures"]:
+        print("No textures matched any block")
+        return 1
+
+    atlas = Atlas(args.atlas).load()
+    paths = [os.path.join(folder, e["file"]) for e in manifest["textures"]]
+    decoded = texture_import.decode_files(paths, args.workers)
+    return _apply_and_save(args, manifest, block_file, atlas, folder, decoded)
+
+
+def cmd_compact(args):
+    block_file = block_data.load_block_file(args.constants)
+    blocks = block_file.blocks
+    atlas = Atlas(args.atlas).load()
+    allocator = AtlasAllocator(atlas, blocks)
+
+    dups = allocator.duplicates()
+    used = len(allocator.refs)
+    mapping = allocator.compact(blocks)
+    moved = sum(1 for old, new in mapping.items() if old != new)
+    print(f"{used} referenced cells, {len(dups)} duplicate groups -> {len(set(mapping.values()))} tiles, "
+          f"{moved} cells moved")
+
+    if args.dry_run:
+        return 0
+    atlas.save(args.out_atlas or args.atlas)
+    block_file.save(blocks)
+    return 0
+
+
+def cmd_export_mips(args):
+    import atlas_export
+
+    blocks = block_data.load_block_file(args.constants).blocks
+    atlas = Atlas(args.atlas).load()
+    os.makedirs(args.out_dir, exist_ok=True)
+    meta = atlas_export.export_padded_atlas(atlas.image, blocks, args.out_dir, args.name, args.padding, args.levels)
+    sizes = ", ".join(f"{lv['width']}px" for lv in meta["levels"])
+    print(f"{args.name}: cell {meta['cellSize']}px (tile {meta['tileSize']} + 2x{meta['padding']}), "
+          f"{len(meta['levels'])} levels: {sizes}")
+    return 0
+
+
+def cmd_export_array(args):
+    import atlas_export
+
+    blocks = block_data.load_block_file(args.constants).blocks
+    atlas = Atlas(args.atlas).load()
+    count = atlas_export.export_texture_array(atlas.image, blocks, args.out)
+    print(f"{args.out}: {count} layers, {os.path.getsize(args.out) / 1024:.1f} KB")
+    return 0
+
+
+def cmd_encode_atlas(args):
+    import atlas_export
+
+    unknown = sorted(set(args.formats or ()) - set(atlas_export.ATLAS_ENCODINGS))
+    if unknown:
+        print(f"Unknown formats: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    image = Atlas(args.atlas).load().image
+    stats = atlas_export.color_stats(image)
+    print(f"{os.path.basename(args.atlas)}: {image.width}x{image.height}, {stats['colors']} colors "
+          f"(max {stats['max_tile_colors']} per tile), {stats['empty_tiles']} empty / "
+          f"{stats['opaque_tiles']} opaque of {len(stats['tile_colors'])} tiles")
+
+    results = atlas_export.encode_atlas(image, args.formats, args.workers, args.decode_repeat)
+    current = os.path.getsize(args.atlas) if os.path.exists(args.atlas) else None
+    print(f"{'format':<15} {'size KB':>9} {'vs file':>8} {'encode ms':>10} {'decode ms':>10}  exact")
+    for r in results:
+        if r["data"] is None:
+            print(f"{r['format']:<15} {'-':>9} {'-':>8} {r['encode_ms']:>10.1f} {'-':>10}  "
+                  f"n/a ({stats['colors']} colors > 256)")
+            continue
+        ratio = f"{r['bytes'] / current:>7.0%}" if current else "-"
+        print(f"{r['format']:<15} {r['bytes'] / 1024:>9.1f} {ratio:>8} {r['encode_ms']:>10.1f} "
+              f"{r['decode_ms']:>10.1f}  {'yes' if r['exact'] else 'NO'}")
+
+    exact = [r for r in results if r["exact"]]
+    if not exact:
+        print("No encoding round-tripped exactly", file=sys.stderr)
+        return 1
+    fastest = min(exact, key=lambda r: r["decode_ms"])
+    print(f"Smallest: {exact[0]['format']}; fastest to decode: {fastest['format']}")
+
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+        stem = os.path.splitext(os.path.basename(args.atlas))[0]
+        for r in exact:
+            path = os.path.join(args.out_dir, f"{stem}-{r['format']}{r['ext']}")
+            block_data.atomic_write(path, r["data"])
+            print(f"Wrote {path}")
+    if args.in_place:
+        best = atlas_export.smallest_exact(results, exts=(".png",))
+        if best is None:
+            print("No PNG encoding round-tripped exactly; atlas left as is", file=sys.stderr)
+            return 1
+        if current is not None and best["bytes"] >= current:
+            print(f"{args.atlas} is already as small as {best['format']}")
+        else:
+            block_data.atomic_write(args.atlas, best["data"])
+            print(f"Rewrote {args.atlas} as {best['format']} ({best['bytes'] / 1024:.1f} KB)")
+    return 0
+
+
+def cmd_sound_sprite(args):
+    import sound_sprite
+
+    blocks = block_data.load_block_file(args.constants).blocks
+    found, missing, unused = sound_sprite.check_sounds(blocks, args.sounds_dir)
+    print(f"{len(found) + len(missing)} sounds referenced by blocks, {len(found)} found in {args.sounds_dir}")
+    for name, ids in missing.items():
+        print(f"Missing: {name} (blocks {', '.join(map(str, ids))})", file=sys.stderr)
+    for file_name in unused:
+        print(f"Unused: {file_name}")
+    if args.check:
+        return 1 if missing else 0
+
+    _, skipped = sound_sprite.split_packable(found)
+    for name in skipped:
+        print(f"Skipped {os.path.basename(found[name])}: not WAV, the game loads it as a separate file")
+
+    out = args.out or os.path.join(args.sounds_dir, sound_sprite.SPRITE_NAME + ".wav")
+    try:
+        manifest = sound_sprite.build_sprite(found, out, args.gap)
+    except sound_sprite.SoundSpriteError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    manifest_path = os.path.splitext(out)[0] + ".json"
+    sound_sprite.write_manifest(manifest, manifest_path)
+    total = max((s["offset"] + s["duration"] for s in manifest["sounds"].values()), default=0)
+    print(f"{out}: {len(manifest['sounds'])} sounds, {total:.2f} s, {os.path.getsize(out) / 1024:.1f} KB; "
+          f"manifest {manifest_path}")
+    return 1 if missing else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="editor_cli", description="Block editor command line tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("batch", help="Apply a texture manifest to atlas.png and constants.js in one pass")
+    p.add_argument("manifest", help="JSON manifest with texture -> cell -> block face assignments")
+    p.add_argument("--atlas", default=block_data.ATLAS_PATH)
+    p.add_argument("--out-atlas", default=None, help="Write the atlas here instead of overwriting --atlas")
+    p.add_argument("--constants", default=block_data.CONSTANTS_PATH)
+    p.add_argument("--dry-run", action="store_true")
+    p.set_defaults(func=cmd_batch)
+
+    p = sub.add_parser("import-dir", help="Import a folder of name_face.png textures (decoded in parallel)")
+    p.add_argument("folder", help="Folder with textures named like grass_top.png, grass_side.png, stone.png")
+    p.add_argument("--workers", type=int, default=None, help="Decoder threads (default: Python's choice)")
+    p.add_argument("--atlas", default=block_data.ATLAS_PATH)
+    p.add_argument("--out-atlas", default=None, help="Write the atlas here instead of overwriting --atlas")
+    p.add_argument("--constants", default=block_data.CONSTANTS_PATH)
+    p.add_argument("--dry-run", action="store_true")
+    p.set_defaults(func=cmd_import_dir)
+
+    p = sub.add_parser("compact", help="Repack the atlas: drop unused and duplicate tiles, rewrite block coordinates")
+    p.add_argument("--atlas", default=block_data.ATLAS_PATH)
+    p.add_argument("--out-atlas", default=None, help="Write the atlas here instead of overwriting --atlas")
+    p.add_argument("--constants", default=block_data.CONSTANTS_PATH)
+    p.add_argument("--dry-run", action="store_true")
+    p.set_defaults(func=cmd_compact)
+
+    p = sub.add_parser("export-mips", help="Export a gutter-padded atlas with a per-tile mip chain")
+    p.add_argument("--atlas", default=block_data.ATLAS_PATH)
+    p.add_argument("--constants", default=block_data.CONSTANTS_PATH)
+    p.add_argument("--out-dir", default=os.path.dirname(block_data.ATLAS_PATH))
+    p.add_argument("--name", default="atlas_padded")
+    p.add_argument("--padding", type=int, default=8, help="Gutter in pixels on each side of a tile")
+    p.add_argument("--levels", type=int, default=None, help="Limit the number of mip levels")
+    p.set_defaults(func=cmd_export_mips)
+
+    p = sub.add_parser("export-array", help="Export referenced tiles as a layered texture array file")
+    p.add_argument("--atlas", default=block_data.ATLAS_PATH)
+    p.add_argument("--constants", default=block_data.CONSTANTS_PATH)
+    p.add_argument("--out", default=os.path.join(os.path.dirname(block_data.ATLAS_PATH), "atlas_layers.bin"))
+    p.set_defaults(func=cmd_export_array)
+
+    p = sub.add_parser("encode-atlas", help="Compare lossless atlas encodings (indexed/optimized PNG, WebP)")
+    p.add_argument("--atlas", default=block_data.ATLAS_PATH)
+    p.add_argument("--formats", nargs="+", default=None,
+                   help="Subset of: png png-optimized png-indexed webp-lossless (default: all)")
+    p.add_argument("--workers", type=int, default=None, help="Encoder threads (default: Python's choice)")
+    p.add_argument("--decode-repeat", type=int, default=3, help="Decode each result this many times, keep the best")
+    p.add_argument("--out-dir", default=None, help="Write every exact encoding here as atlas-<format>.<ext>")
+    p.add_argument("--in-place", action="store_true", help="Rewrite --atlas with the smallest exact PNG")
+    p.set_defaults(func=cmd_encode_atlas)
+
+    p = sub.add_parser("sound-sprite", help="Check block sounds and pack the referenced WAVs into one sprite + manifest")
+    p.add_argument("--constants", default=block_data.CONSTANTS_PATH)
+    p.add_argument("--sounds-dir", default=os.path.join(block_data.PROJECT_ROOT, "assets", "sounds"))
+    p.add_argument("--out", default=None, help="Sprite WAV path (default: SOUNDS_DIR/sprite.wav, manifest next to it)")
+    p.add_argument("--gap", type=float, default=0.05, help="Seconds of silence between sounds")
+    p.add_argument("--check", action="store_true", help="Only report missing and unused sound files")
+    p.set_defaults(func=cmd_sound_sprite)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""Журнал правок редактора (undo/redo).
+
+Хранятся не снимки блоков, а мелкие операции:
+    ("field", block, key, old, new)     - одно поле одного блока
+    ("insert", row, block)              - блок добавлен в строку row
+    ("remove", row, block)              - блок удален из строки row
+    ("tile", col, row, old, new)        - тайл атласа, old/new - сжатые патчи (atlas.encode_tile_patch)
+
+Запись журнала - список операций, которые отменяются вместе. Подряд идущие правки
+одного поля (набор текста) в пределах coalesce_seconds сливаются в одну запись.
+Как применять операцию, решает владелец: функция apply(op, undo).
+"""
+import time
+
+DEFAULT_COALESCE_SECONDS = 1.0
+DEFAULT_MAX_ENTRIES = 1000
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+def op_size(op):
+    """Примерный вес операции в байтах (для лимита журнала)"""
+    if op[0] == "tile":
+        return 64 + len(op[3]) + len(op[4])
+    return 64
+
+
+class History:
+    def __init__(self, apply, coalesce_seconds=DEFAULT_COALESCE_SECONDS, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_bytes=DEFAULT_MAX_BYTES, clock=time.monotonic):
+        self.apply = apply
+        self.coalesce_seconds = coalesce_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.undo_stack = []  # [{"ops": [...], "key": ..., "time": ..., "bytes": ...}, ...]
+        self.redo_stack = []
+        self.bytes = 0
+        self._group = None
+        self._sealed = True
+
+    # --- ЗАПИСЬ ---
+
+    def record(self, op, coalesce_key=None):
+        """Добавляет уже выполненную операцию.
+
+        coalesce_key - например (id(block), key): правки с тем же ключом сразу после
+        предыдущей дописываются в ее запись, а не создают новую.
+        """
+        self._drop_redo()
+        if self._group is not None:
+            self._group.append(op)
+            return
+
+        now = self.clock()
+        top = self.undo_stack[-1] if self.undo_stack else None
+        if (coalesce_key is not None and top and not self._sealed and top["key"] == coalesce_key
+                and now - top["time"] <= self.coalesce_seconds and self._merge(top, op)):
+            top["time"] = now
+            return
+        self._push({"ops": [op], "key": coalesce_key, "time": now}, self.undo_stack)
+        self._sealed = coalesce_key is None
+        self._trim()
+
+    def _merge(self, entry, op):
+        """Сливает правку поля с последней операцией записи (old остается от первой)"""
+        last = entry["ops"][-1]
+        if op[0] != "field" or last[0] != "field" or last[1] is not op[1] or last[2] != op[2]:
+            return False
+        entry["ops"][-1] = ("field", op[1], op[2], last[3], op[4])
+        if last[3] == op[4]:
+            # Вернулись к исходному значению - запись больше ничего не меняет
+            self._pop(self.undo_stack)
+            self._sealed = True
+        return True
+
+    def begin(self):
+        """Начало группы: все record() до end() станут одной записью"""
+        self._group = []
+
+    def end(self):
+        ops, self._group = self._group, None
+        if ops:
+            self._push({"ops": ops, "key": None, "time": self.clock()}, self.undo_stack)
+            self._sealed = True
+            self._trim()
+
+    def seal(self):
+        """Следующая правка начнет новую запись (смена блока, потеря фокуса)"""
+        self._sealed = True
+
+    # --- ОТМЕНА / ПОВТОР ---
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def undo(self):
+        if not self.undo_stack:
+            return None
+        entry = self._pop(self.undo_stack)
+        for op in reversed(entry["ops"]):
+            self.apply(op, True)
+        self._push(entry, self.redo_stack)
+        self._sealed = True
+        return entry["ops"]
+
+    def redo(self):
+        if not self.redo_stack:
+            return None
+        entry = self._pop(self.redo_stack)
+        for op in entry["ops"]:
+            self.apply(op, False)
+        self._push(entry, self.undo_stack)
+        self._sealed = True
+        return entry["ops"]
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.bytes = 0
+        self._sealed = True
+
+    # --- ПАМЯТЬ ---
+
+    def _push(self, entry, stack):
+        entry["bytes"] = sum(op_size(op) for op in entry["ops"])
+        self.bytes += entry["bytes"]
+        stack.append(entry)
+
+    def _pop(self, stack, index=-1):
+        entry = stack.pop(index)
+        self.bytes -= entry["bytes"]
+        return entry
+
+    def _drop_redo(self):
+        while self.redo_stack:
+            self._pop(self.redo_stack)
+
+    def _trim(self):
+        """Старые записи выбрасываются, когда журнал длиннее max_entries или тяжелее max_bytes"""
+        while len(self.undo_stack) > 1 and (len(self.undo_stack) > self.max_entries or self.bytes > self.max_bytes):
+            self._pop(self.undo_stack, 0)
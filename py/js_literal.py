@@ -0,0 +1,177 @@
+"""Токенизатор и парсер подмножества JS-литералов, которое используется в js/constants.js.
+
+Поддерживается: объекты (ключи - идентификаторы или строки), массивы, строки '...' и "...",
+числа, true/false/null, комментарии // и /* */, висячие запятые.
+Разбор идет за один линейный проход по токенам (без рекурсии), ошибки содержат
+номер строки и колонки.
+"""
+import re
+
+# Каждый токен забирает вместе с собой предшествующие пробелы и комментарии.
+# Частый случай "ключ: скаляр" и "ключ: [int, int]" - один токен, так проход
+# по типичному блоку занимает в разы меньше итераций.
+_TOKEN_RE = re.compile(r"""
+    (?:\s|//[^\n]*|/\*.*?\*/)*
+    (?:
+        (?P<key>[A-Za-z_$][\w$]*)\s*:\s*(?:
+            (?P<p_num>-?\d+(?:\.\d*)?(?:[eE][+-]?\d+)?)(?![\w.])
+          | '(?P<p_str>[^'\\\n]*)'
+          | (?P<p_kw>true|false|null)(?![\w$])
+          | \[\s*(?P<p_a>-?\d+)\s*,\s*(?P<p_pair>-?\d+)\s*\]
+        )
+      | (?P<num>-?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+      | '(?P<sq>(?:[^'\\\n]|\\.)*)'
+      | "(?P<dq>(?:[^"\\\n]|\\.)*)"
+      | (?P<ident>[A-Za-z_$][\w$]*)
+      | (?P<punct>[{}\[\],:])
+      | (?P<bad>.)
+      | (?P<end>\Z)
+    )
+""", re.VERBOSE | re.DOTALL)
+
+_ESCAPE_RE = re.compile(r"\\(u[0-9a-fA-F]{4}|x[0-9a-fA-F]{2}|.)", re.DOTALL)
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f", "v": "\v", "0": "\0"}
+
+_KEYWORDS = {"true": True, "false": False, "null": None}
+
+# Состояния разбора
+_VALUE, _KEY, _COLON, _SEP = range(4)
+
+
+class JSParseError(ValueError):
+    def __init__(self, message, text, pos):
+        self.pos = pos
+        self.line = text.count("\n", 0, pos) + 1
+        self.col = pos - (text.rfind("\n", 0, pos) + 1) + 1
+        self.message = message
+        super().__init__(f"line {self.line}, col {self.col}: {message}")
+
+
+def _unescape(body):
+    if "\\" not in body:
+        return body
+
+    def repl(m):
+        esc = m.group(1)
+        if esc[0] in "ux" and len(esc) > 1:
+            return chr(int(esc[1:], 16))
+        return _ESCAPES.get(esc, esc)
+
+    return _ESCAPE_RE.sub(repl, body)
+
+
+def parse_at(text, pos=0, end=None, item_spans=None):
+    """Разбирает одно значение, начиная с pos. Возвращает (value, start, end).
+
+    Если значение - массив, а item_spans передан, в него добавляются (start, end)
+    каждого объекта-элемента верхнего уровня этого массива.
+    """
+    end = len(text) if end is None else end
+    stack = []  # (контейнер, это объект?, позиция начала, ключ в родителе, позиция ключа)
+    state = _VALUE
+    key = key_pos = None
+    start = None
+
+    for m in _TOKEN_RE.finditer(text, pos, end):
+        kind = m.lastgroup
+        if kind == "end":
+            break
+        tok_pos = m.start(kind)
+        if start is None:
+            start = tok_pos
+        tok = m.group(kind)
+
+        if kind[0] == "p":
+            if kind == "punct":
+                if state == _SEP:
+                    container, is_obj, c_start, key, key_pos = stack[-1]
+                    if tok == ",":
+                        state = _KEY if is_obj else _VALUE
+                        continue
+                    if tok != ("}" if is_obj else "]"):
+                        raise JSParseError(f"expected ',' or {'}' if is_obj else ']'!r}, found {tok!r}", text, tok_pos)
+                elif state == _VALUE:
+                    if tok == "{" or tok == "[":
+                        stack.append(({} if tok == "{" else [], tok == "{", tok_pos, key, key_pos))
+                        state = _KEY if tok == "{" else _VALUE
+                        continue
+                    if tok != "]" or not stack or stack[-1][1]:
+                        raise JSParseError(f"unexpected {tok!r}", text, tok_pos)
+                    container, is_obj, c_start, key, key_pos = stack[-1]
+                elif state == _KEY:
+                    if tok != "}":
+                        raise JSParseError(f"expected property name, found {tok!r}", text, tok_pos)
+                    container, is_obj, c_start, key, key_pos = stack[-1]
+                else:  # _COLON
+                    if tok != ":":
+                        raise JSParseError(f"expected ':', found {tok!r}", text, tok_pos)
+                    state = _VALUE
+                    continue
+
+                # Закрываем контейнер - он становится значением
+                stack.pop()
+                value = container
+                if item_spans is not None and is_obj and len(stack) == 1 and not stack[0][1]:
+                    item_spans.append((c_start, m.end()))
+            else:
+                # Пара "ключ: значение" одним токеном
+                key_pos = m.start("key")
+                if state != _KEY:
+                    expected = "',' before " if state == _SEP else "value, found "
+                    raise JSParseError(f"expected {expected}{m.group('key')!r}", text, key_pos)
+                key = m.group("key")
+                if kind == "p_num":
+                    value = float(tok) if ("." in tok or "e" in tok or "E" in tok) else int(tok)
+                elif kind == "p_str":
+                    value = tok
+                elif kind == "p_kw":
+                    value = _KEYWORDS[tok]
+                else:
+                    value = [int(m.group("p_a")), int(tok)]
+                tok_pos = key_pos
+
+        elif kind == "bad":
+            raise JSParseError(f"unexpected character {tok!r}", text, tok_pos)
+
+        elif state == _KEY:
+            if kind == "num":
+                raise JSParseError(f"expected property name, found {tok!r}", text, tok_pos)
+            key, key_pos = (tok if kind == "ident" else _unescape(tok)), tok_pos
+            state = _COLON
+            continue
+
+        elif state != _VALUE:
+            expected = "':'" if state == _COLON else "','"
+            raise JSParseError(f"expected {expected}, found {tok!r}", text, tok_pos)
+
+        elif kind == "num":
+            value = float(tok) if ("." in tok or "e" in tok or "E" in tok) else int(tok)
+        elif kind == "ident":
+            if tok not in _KEYWORDS:
+                raise JSParseError(f"unexpected identifier {tok!r}", text, tok_pos)
+            value = _KEYWORDS[tok]
+        else:
+            value = _unescape(tok)
+
+        # Готовое значение кладем в родителя
+        if not stack:
+            return value, start, m.end()
+        container, is_obj = stack[-1][:2]
+        if is_obj:
+            if key in container:
+                raise JSParseError(f"duplicate key {key!r}", text, key_pos)
+            container[key] = value
+        else:
+            container.append(value)
+        state = _SEP
+
+    raise JSParseError("unexpected end of input", text, end)
+
+
+def parse(text):
+    """Разбирает строку, содержащую ровно один литерал"""
+    value, _, stop = parse_at(text)
+    m = _TOKEN_RE.match(text, stop)
+    if m.lastgroup != "end":
+        raise JSParseError(f"unexpected trailing input {m.group(m.lastgroup)!r}", text, m.start(m.lastgroup))
+    return value
@@ -0,0 +1,271 @@
+"""Оценка размера мешей чанков - повтор Chunk.generateMesh на NumPy.
+
+Отсечение граней (_shouldRenderFace) считается сразу для всего чанка, жадное
+слияние (greedyMerge) идет по сериям одинаковых клеток, а не по каждой клетке.
+Число квадов, вершин и индексов совпадает с тем, что строит движок, поэтому по
+отчету видно, во что обойдется, например, флаг transparent у блока.
+
+    python py/mesher.py chunk 0 0
+    python py/mesher.py region assets/regions/r.0.0.vxr --toggle-transparent 1
+"""
+import argparse
+import sys
+
+import numpy as np
+
+import block_data
+from terrain import CHUNK_SIZE, CHUNK_HEIGHT
+
+# Атрибуты BufferGeometry: position 3, normal 3, uv 2, tileIndex 2, color 3 (float32)
+VERTEX_BYTES = 4 * (3 + 3 + 2 + 2 + 3)
+
+# Грани в порядке generateMesh: (имя, ключ текстуры)
+FACES = (("top", "top"), ("bottom", "bottom"), ("+x", "side"), ("-x", "side"), ("+z", "side"), ("-z", "side"))
+FACE_TILE = {"side": 0, "top": 1, "bottom": 2}
+
+NEIGHBOR_OFFSETS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+
+class BlockTables:
+    """BLOCKS из BLOCK_DATA в виде таблиц по id: есть ли блок, прозрачен ли, ключ клетки маски для граней"""
+
+    def __init__(self, blocks, air_id=0):
+        self.air_id = air_id
+        self.exists = np.zeros(256, dtype=bool)
+        self.transparent = np.zeros(256, dtype=bool)
+        # Ключ клетки маски: id, col, row в одном int32 ({id, col, row} в JS); -1 - нет грани
+        self.keys = np.full((3, 256), -1, dtype=np.int32)
+        # Как BLOCK_DATA.forEach(b => BLOCKS[b.id] = b): при повторе id побеждает последний
+        for b in blocks:
+            bid = b['id']
+            if not 0 <= bid < 256:
+                continue
+            self.exists[bid] = True
+            self.transparent[bid] = bool(b['transparent'])
+            side = b['atlas']
+            for face, tile in ((0, side), (1, b['atlasTop'] or side), (2, b['atlasBottom'] or side)):
+                self.keys[face, bid] = (bid << 20) | ((tile[0] & 0x3FF) << 10) | (tile[1] & 0x3FF) if tile else -1
+
+    def with_transparent(self, bid, value):
+        """Копия таблиц с другим флагом transparent у блока bid"""
+        other = BlockTables.__new__(BlockTables)
+        other.air_id, other.exists, other.keys = self.air_id, self.exists, self.keys
+        other.transparent = self.transparent.copy()
+        other.transparent[bid] = value
+        return other
+
+
+def padded_volume(data, neighbors=None, air_id=0):
+    """Чанк с рамкой в один воксель: (y, z, x) = (H + 2, 18, 18).
+
+    neighbors: {(dx, dz): данные соседнего чанка}; нет соседа - воздух, как у world.getBlock.
+    """
+    S, H = CHUNK_SIZE, CHUNK_HEIGHT
+    vol = np.full((H + 2, S + 2, S + 2), air_id, dtype=np.uint8)
+    vol[1:-1, 1:-1, 1:-1] = np.asarray(data, dtype=np.uint8).reshape(H, S, S)
+    for (dx, dz), other in (neighbors or {}).items():
+        if other is None:
+            continue
+        other = np.asarray(other, dtype=np.uint8).reshape(H, S, S)
+        if (dx, dz) == (-1, 0):
+            vol[1:-1, 1:-1, 0] = other[:, :, -1]
+        elif (dx, dz) == (1, 0):
+            vol[1:-1, 1:-1, -1] = other[:, :, 0]
+        elif (dx, dz) == (0, -1):
+            vol[1:-1, 0, 1:-1] = other[:, -1, :]
+        elif (dx, dz) == (0, 1):
+            vol[1:-1, -1, 1:-1] = other[:, 0, :]
+    return vol
+
+
+def face_masks(vol, tables):
+    """Маски граней в раскладке generateMesh: {имя: (срезы, строки, столбцы)} int32, -1 - грани нет.
+
+    top/bottom: срез y, строки z, столбцы x; ±x: срез x, строки y, столбцы z; ±z: срез z, строки y, столбцы x.
+    """
+    # Выше самого высокого непустого вокселя граней нет - срезаем эти слои
+    filled = np.flatnonzero((vol[1:-1, 1:-1, 1:-1] != tables.air_id).any(axis=(1, 2)))
+    vol = vol[:filled[-1] + 3] if len(filled) else vol[:2]
+    cur = vol[1:-1, 1:-1, 1:-1]
+    neighbors = {
+        "top": vol[2:, 1:-1, 1:-1], "bottom": vol[:-2, 1:-1, 1:-1],
+        "+x": vol[1:-1, 1:-1, 2:], "-x": vol[1:-1, 1:-1, :-2],
+        "+z": vol[1:-1, 2:, 1:-1], "-z": vol[1:-1, :-2, 1:-1],
+    }
+    solid_cur = (cur != tables.air_id) & tables.exists[cur]
+    masks = {}
+    for name, tile in FACES:
+        nb = neighbors[name]
+        render = solid_cur & (~tables.exists[nb] | tables.transparent[nb])
+        key = np.where(render, tables.keys[FACE_TILE[tile]][cur], -1)
+        if name in ("+x", "-x"):
+            key = key.transpose(2, 0, 1)
+        elif name in ("+z", "-z"):
+            key = key.transpose(1, 0, 2)
+        masks[name] = key
+    return masks
+
+
+def greedy_merge(mask):
+    """greedyMerge из chunk.js для одной маски (строки, столбцы): -> [(i, j, w, h, ключ)]
+
+    Квад всегда начинается с максимальной серии одинаковых клеток строки, поэтому
+    строку можно разбить на серии сразу, а высоту квада найти сравнением блока строк ниже.
+    """
+    m = mask.copy()
+    height, width = m.shape
+    quads = []
+    for j in np.flatnonzero((m >= 0).any(axis=1)):
+        row = m[j]
+        if row.max() < 0:
+            continue  # строку целиком съели квады из строк выше
+        starts = np.concatenate(([0], np.flatnonzero(row[1:] != row[:-1]) + 1))
+        ends = np.append(starts[1:], width)
+        for s, e in zip(starts.tolist(), ends.tolist()):
+            v = int(row[s])
+            if v < 0:
+                continue
+            below = (m[j + 1:, s:e] == v).all(axis=1)
+            h = 1 + (len(below) if below.all() else int(below.argmin()))
+            m[j:j + h, s:e] = -1
+            quads.append((s, int(j), e - s, h, v))
+    return quads
+
+
+def count_quads(masks):
+    """{грань: (граней до слияния, квадов)}"""
+    out = {}
+    for name, key in masks.items():
+        present = key >= 0
+        faces = int(present.sum())
+        quads = 0
+        if faces:
+            for s in np.flatnonzero(present.any(axis=(1, 2))):
+                quads += len(greedy_merge(key[s]))
+        out[name] = (faces, quads)
+    return out
+
+
+def mesh_stats(data, tables, neighbors=None):
+    """Размер меша одного чанка: грани, квады, вершины, индексы, байты буферов"""
+    counts = count_quads(face_masks(padded_volume(data, neighbors, tables.air_id), tables))
+    faces = sum(f for f, _ in counts.values())
+    quads = sum(q for _, q in counts.values())
+    vertices = quads * 4
+    # three.js берет Uint32 для индексов, если номер вершины не влезает в Uint16
+    index_bytes = 4 if vertices > 65535 else 2
+    return {
+        "faces": faces,
+        "quads": quads,
+        "vertices": vertices,
+        "indices": quads * 6,
+        "bytes": vertices * VERTEX_BYTES + quads * 6 * index_bytes,
+        "per_face": {name: q for name, (_, q) in counts.items()},
+    }
+
+
+def add_stats(total, stats):
+    for key in ("faces", "quads", "vertices", "indices", "bytes"):
+        total[key] = total.get(key, 0) + stats[key]
+    total["chunks"] = total.get("chunks", 0) + 1
+    return total
+
+
+def grid_stats(chunks, tables):
+    """Суммарный размер мешей для {(cx, cz): данные}; соседи берутся из того же набора"""
+    total = {}
+    for (cx, cz), data in chunks.items():
+        neighbors = {(dx, dz): chunks.get((cx + dx, cz + dz)) for dx, dz in NEIGHBOR_OFFSETS}
+        add_stats(total, mesh_stats(data, tables, neighbors))
+    return total
+
+
+def load_region_chunks(path):
+    import region
+
+    with region.RegionFile(path) as r:
+        x0, z0 = r.region_x * region.REGION_SIZE, r.region_z * region.REGION_SIZE
+        return {(x0 + lx, z0 + lz): r.read_chunk(lx, lz) for lx, lz in r.chunk_coords()}
+
+
+def generated_chunks(chunk_x, chunk_z, count_x, count_z, constants_path=block_data.CONSTANTS_PATH):
+    import terrain
+
+    grid = terrain.generate_chunks(chunk_x, chunk_z, count_x, count_z, terrain.load_block_ids(constants_path))
+    return {(chunk_x + i, chunk_z + k): grid[k, i] for k in range(count_z) for i in range(count_x)}
+
+
+def transparent_delta(chunks, blocks, bid, value=None):
+    """(до, после) для флага transparent блока bid (по умолчанию - переключить)"""
+    tables = BlockTables(blocks)
+    value = (not tables.transparent[bid]) if value is None else value
+    return grid_stats(chunks, tables), grid_stats(chunks, tables.with_transparent(bid, value))
+
+
+# --- КОМАНДЫ ---
+
+def _format(total):
+    chunks = total.get("chunks", 0) or 1
+    return (f"{total.get('chunks', 0)} chunks: {total.get('quads', 0)} quads "
+            f"(from {total.get('faces', 0)} faces), {total.get('vertices', 0)} vertices, "
+            f"{total.get('indices', 0)} indices, {total.get('bytes', 0) / 1024:.0f} KB "
+            f"({total.get('bytes', 0) / chunks / 1024:.1f} KB/chunk)")
+
+
+def _report(chunks, blocks, toggle):
+    if toggle is None:
+        print(_format(grid_stats(chunks, BlockTables(blocks))))
+        return 0
+    before, after = transparent_delta(chunks, blocks, toggle)
+    print(f"as is:        {_format(before)}")
+    print(f"toggled {toggle:>4}: {_format(after)}")
+    if before.get("bytes"):
+        print(f"mesh size x{after['bytes'] / before['bytes']:.2f}")
+    return 0
+
+
+def cmd_chunk(args):
+    blocks = block_data.load_block_file(args.constants).blocks
+    # Соседи тоже генерируются - как будто чанк в середине загруженного мира
+    chunks = generated_chunks(args.chunk_x - 1, args.chunk_z - 1, 3, 3, args.constants)
+    tables = BlockTables(blocks)
+    neighbors = {(dx, dz): chunks[(args.chunk_x + dx, args.chunk_z + dz)] for dx, dz in NEIGHBOR_OFFSETS}
+    stats = mesh_stats(chunks[(args.chunk_x, args.chunk_z)], tables, neighbors)
+    print(_format(add_stats({}, stats)))
+    print("quads per face: " + ", ".join(f"{k} {v}" for k, v in stats["per_face"].items()))
+    if args.toggle_transparent is not None:
+        # Те же соседи, что и выше: "было" - уже посчитанные stats
+        bid = args.toggle_transparent
+        toggled = tables.with_transparent(bid, not tables.transparent[bid])
+        after = mesh_stats(chunks[(args.chunk_x, args.chunk_z)], toggled, neighbors)
+        print(f"toggled {bid}: {_format(add_stats({}, after))} (was {stats['bytes'] / 1024:.0f} KB)")
+    return 0
+
+
+def cmd_region(args):
+    blocks = block_data.load_block_file(args.constants).blocks
+    chunks = {}
+    for path in args.paths:
+        chunks.update(load_region_chunks(path))
+    return _report(chunks, blocks, args.toggle_transparent)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="mesher")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("chunk", help="Mesh size of one generated chunk")
+    p.add_argument("chunk_x", type=int)
+    p.add_argument("chunk_z", type=int)
+    p.set_defaults(func=cmd_chunk)
+    p = sub.add_parser("region", help="Mesh size of baked region files")
+    p.add_argument("paths", nargs="+")
+    p.set_defaults(func=cmd_region)
+    for p in sub.choices.values():
+        p.add_argument("--constants", default=block_data.CONSTANTS_PATH)
+        p.add_argument("--toggle-transparent", type=int, metavar="ID", help="Also report with this block's flag flipped")
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
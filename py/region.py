@@ -0,0 +1,278 @@
+"""Регион-файлы с готовыми чанками: 32x32 чанка в одном файле.
+
+Раскладка (little-endian):
+
+    0       заголовок REGION_HEADER (64 байта): magic VXRG, версия, координаты региона,
+            размеры чанка, хеш реестра блоков, смещения таблицы и данных
+    64      таблица 1024 x REGION_ENTRY (16 байт), индекс = lz * 32 + lx:
+            смещение и размер данных чанка (0 - чанка нет), длина палитры,
+            бит на воксель, кодирование, crc32 данных
+    16448   данные чанков, каждый выровнен по 4 байта:
+            палитра (id блоков, uint8) + выравнивание + воксели
+
+Кодирования вокселей:
+    UNIFORM - весь чанк из одного блока, данных нет;
+    PACKED  - индексы палитры по 1/2/4/8 бит в порядке индекса чанка (x + z*16 + y*256);
+    RLE     - колонки (z, x) снизу вверх, пары (индекс палитры, длина - 1) по байту,
+              серия не выходит за колонку.
+Для чанка берется самое короткое.
+
+Браузеру хватает одного range-запроса на заголовок с таблицей и одного на каждый
+нужный чанк. Python открывает файл через mmap и декодирует только запрошенный чанк.
+
+    python py/region.py build 0 0 assets/regions   # сгенерировать регион r.0.0
+    python py/region.py info assets/regions/r.0.0.vxr
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+
+import numpy as np
+
+import block_data
+from block_data import atomic_write
+from terrain import CHUNK_SIZE, CHUNK_HEIGHT, CHUNK_VOLUME
+
+REGION_SIZE = 32
+REGION_CHUNKS = REGION_SIZE * REGION_SIZE
+REGION_MAGIC = b"VXRG"
+REGION_VERSION = 1
+REGION_HEADER = struct.Struct("<4sHHiiHHHHQII")
+REGION_HEADER_SIZE = 64
+REGION_ENTRY = np.dtype([("offset", "<u4"), ("size", "<u4"), ("palette", "<u2"),
+                         ("bits", "u1"), ("encoding", "u1"), ("crc", "<u4")])
+TABLE_OFFSET = REGION_HEADER_SIZE
+DATA_OFFSET = TABLE_OFFSET + REGION_ENTRY.itemsize * REGION_CHUNKS
+
+UNIFORM, PACKED, RLE = range(3)
+ENCODING_NAMES = {UNIFORM: "uniform", PACKED: "packed", RLE: "rle"}
+
+
+def region_of(chunk_x, chunk_z):
+    """Координаты чанка -> (region_x, region_z, lx, lz)"""
+    return chunk_x // REGION_SIZE, chunk_z // REGION_SIZE, chunk_x % REGION_SIZE, chunk_z % REGION_SIZE
+
+
+def region_file_name(region_x, region_z):
+    return f"r.{region_x}.{region_z}.vxr"
+
+
+# --- КОДИРОВАНИЕ ЧАНКА ---
+
+def _columns(data):
+    """Массив чанка (индекс x + z*16 + y*256) -> поток колонок (z, x, y)"""
+    return data.reshape(CHUNK_HEIGHT, CHUNK_SIZE, CHUNK_SIZE).transpose(1, 2, 0).reshape(-1)
+
+
+def _pack_bits(indices, bits):
+    per_byte = 8 // bits
+    shifts = np.arange(per_byte, dtype=np.uint8) * bits
+    return (indices.reshape(-1, per_byte) << shifts).sum(axis=1, dtype=np.uint8)
+
+
+def _unpack_bits(packed, bits):
+    per_byte = 8 // bits
+    shifts = np.arange(per_byte, dtype=np.uint8) * bits
+    return ((packed[:, None] >> shifts) & ((1 << bits) - 1)).reshape(-1).astype(np.uint8)
+
+
+def _rle(indices):
+    stream = _columns(indices)
+    change = np.empty(stream.size, dtype=bool)
+    change[0] = True
+    np.not_equal(stream[1:], stream[:-1], out=change[1:])
+    change[::CHUNK_HEIGHT] = True  # серия не переходит в следующую колонку
+    starts = np.flatnonzero(change)
+    lengths = np.diff(np.append(starts, stream.size))
+    pairs = np.empty((starts.size, 2), dtype=np.uint8)
+    pairs[:, 0] = stream[starts]
+    pairs[:, 1] = lengths - 1
+    return pairs.reshape(-1)
+
+
+def _unrle(pairs):
+    pairs = pairs.reshape(-1, 2)
+    stream = np.repeat(pairs[:, 0], pairs[:, 1].astype(np.int32) + 1)
+    if stream.size != CHUNK_VOLUME:
+        raise ValueError(f"RLE data decodes to {stream.size} voxels, expected {CHUNK_VOLUME}")
+    return stream.reshape(CHUNK_SIZE, CHUNK_SIZE, CHUNK_HEIGHT).transpose(2, 0, 1).reshape(-1)
+
+
+def _pad4(n):
+    return -n % 4
+
+
+def encode_chunk(data):
+    """Uint8 массив чанка -> (payload, длина палитры, бит на воксель, кодирование)"""
+    data = np.asarray(data, dtype=np.uint8).reshape(-1)
+    if data.size != CHUNK_VOLUME:
+        raise ValueError(f"Chunk must have {CHUNK_VOLUME} voxels, got {data.size}")
+    # Палитра через bincount + таблицу перекодировки: быстрее np.unique с сортировкой
+    palette = np.flatnonzero(np.bincount(data, minlength=256)).astype(np.uint8)
+    lut = np.zeros(256, dtype=np.uint8)
+    lut[palette] = np.arange(len(palette), dtype=np.uint8)
+    indices = lut[data]
+    head = palette.tobytes()
+    head += bytes(_pad4(len(head)))
+    if len(palette) == 1:
+        return head, 1, 0, UNIFORM
+
+    bits = next(b for b in (1, 2, 4, 8) if len(palette) <= 1 << b)
+    packed = _pack_bits(indices, bits).tobytes()
+    rle = _rle(indices).tobytes()
+    if len(rle) < len(packed):
+        return head + rle, len(palette), bits, RLE
+    return head + packed, len(palette), bits, PACKED
+
+
+def decode_chunk(payload, palette_len, bits, encoding):
+    """Обратное к encode_chunk: -> Uint8 массив чанка (x + z*16 + y*256)"""
+    buf = np.frombuffer(payload, dtype=np.uint8)
+    palette = buf[:palette_len]
+    body = buf[palette_len + _pad4(palette_len):]
+    if encoding == UNIFORM:
+        return np.full(CHUNK_VOLUME, palette[0], dtype=np.uint8)
+    if encoding == PACKED:
+        indices = _unpack_bits(body, bits)[:CHUNK_VOLUME]
+    elif encoding == RLE:
+        indices = _unrle(body)
+    else:
+        raise ValueError(f"Unknown chunk encoding {encoding}")
+    return palette[indices]
+
+
+# --- ЗАПИСЬ И ЧТЕНИЕ ---
+
+def pack_region(region_x, region_z, chunks, registry_hash=0):
+    """chunks: {(lx, lz): массив чанка или готовый encode_chunk(...)} -> bytes файла региона"""
+    table = np.zeros(REGION_CHUNKS, dtype=REGION_ENTRY)
+    pieces, offset = [], DATA_OFFSET
+    for (lx, lz) in sorted(chunks, key=lambda c: (c[1], c[0])):
+        if not (0 <= lx < REGION_SIZE and 0 <= lz < REGION_SIZE):
+            raise ValueError(f"Chunk [{lx}, {lz}] is outside the region")
+        encoded = chunks[(lx, lz)]
+        payload, palette_len, bits, encoding = encoded if isinstance(encoded, tuple) else encode_chunk(encoded)
+        table[lz * REGION_SIZE + lx] = (offset, len(payload), palette_len, bits, encoding, zlib.crc32(payload))
+        pieces.append(payload)
+        pieces.append(bytes(_pad4(len(payload))))
+        offset += len(payload) + _pad4(len(payload))
+
+    header = REGION_HEADER.pack(REGION_MAGIC, REGION_VERSION, 0, region_x, region_z, REGION_SIZE,
+                                CHUNK_SIZE, CHUNK_HEIGHT, 0, registry_hash, TABLE_OFFSET, DATA_OFFSET)
+    return b"".join([header.ljust(REGION_HEADER_SIZE, b"\0"), table.tobytes()] + pieces)
+
+
+def write_region(path, region_x, region_z, chunks, registry_hash=0):
+    data = pack_region(region_x, region_z, chunks, registry_hash)
+    atomic_write(path, data)
+    return len(data)
+
+
+class RegionFile:
+    """Регион через mmap: таблица читается сразу, чанки - по запросу"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, _, self.region_x, self.region_z, size, chunk_size, chunk_height, _,
+         self.registry_hash, table_offset, _) = REGION_HEADER.unpack_from(self._mm, 0)
+        if magic != REGION_MAGIC:
+            self.close()
+            raise ValueError(f"{path}: not a region file")
+        if version != REGION_VERSION or (size, chunk_size, chunk_height) != (REGION_SIZE, CHUNK_SIZE, CHUNK_HEIGHT):
+            self.close()
+            raise ValueError(f"{path}: unsupported region version {version} or chunk size")
+        self.table = np.frombuffer(self._mm, dtype=REGION_ENTRY, count=REGION_CHUNKS, offset=table_offset)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._mm is not None:
+            self.table = None
+            self._mm.close()
+            self._file.close()
+            self._mm = None
+
+    def entry(self, lx, lz):
+        return self.table[lz * REGION_SIZE + lx]
+
+    def has_chunk(self, lx, lz):
+        return bool(self.entry(lx, lz)["size"])
+
+    def chunk_coords(self):
+        """Локальные координаты всех записанных чанков"""
+        return [(int(i % REGION_SIZE), int(i // REGION_SIZE)) for i in np.flatnonzero(self.table["size"])]
+
+    def read_chunk(self, lx, lz, verify=True):
+        """Uint8 массив чанка или None, если чанка нет"""
+        e = self.entry(lx, lz)
+        if not e["size"]:
+            return None
+        offset, size = int(e["offset"]), int(e["size"])
+        payload = self._mm[offset:offset + size]
+        if verify and zlib.crc32(payload) != int(e["crc"]):
+            raise ValueError(f"{self.path}: chunk [{lx}, {lz}] is corrupted")
+        return decode_chunk(payload, int(e["palette"]), int(e["bits"]), int(e["encoding"]))
+
+
+# --- КОМАНДЫ ---
+
+def cmd_build(args):
+    import terrain
+
+    ids = terrain.load_block_ids(args.constants)
+    registry = block_data.registry_hash(block_data.load_block_file(args.constants).blocks)
+    t0 = time.perf_counter()
+    grid = terrain.generate_chunks(args.region_x * REGION_SIZE, args.region_z * REGION_SIZE,
+                                   REGION_SIZE, REGION_SIZE, ids)
+    chunks = {(lx, lz): grid[lz, lx] for lz in range(REGION_SIZE) for lx in range(REGION_SIZE)}
+    os.makedirs(args.out_dir, exist_ok=True)
+    path = os.path.join(args.out_dir, region_file_name(args.region_x, args.region_z))
+    size = write_region(path, args.region_x, args.region_z, chunks, registry)
+    print(f"{path}: {len(chunks)} chunks, {size / 1024:.1f} KB, {time.perf_counter() - t0:.2f} s")
+    return 0
+
+
+def cmd_info(args):
+    with RegionFile(args.path) as region:
+        present = region.table[region.table["size"] > 0]
+        print(f"region [{region.region_x}, {region.region_z}], registry {region.registry_hash:016x}, "
+              f"{len(present)} chunks")
+        for code, name in ENCODING_NAMES.items():
+            sel = present[present["encoding"] == code]
+            if len(sel):
+                print(f"  {name:8} {len(sel):5} chunks, avg {sel['size'].mean():8.0f} B")
+        raw = len(present) * CHUNK_VOLUME
+        total = int(present["size"].sum())
+        if total:
+            print(f"  {total / 1024:.1f} KB of chunk data for {raw / 1024:.0f} KB raw ({raw / total:.0f}x)")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="region")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("build", help="Generate one region with the terrain generator")
+    p.add_argument("region_x", type=int)
+    p.add_argument("region_z", type=int)
+    p.add_argument("out_dir", nargs="?", default=os.path.join(block_data.PROJECT_ROOT, "assets", "regions"))
+    p.add_argument("--constants", default=block_data.CONSTANTS_PATH)
+    p.set_defaults(func=cmd_build)
+    p = sub.add_parser("info", help="Print region header and encoding statistics")
+    p.add_argument("path")
+    p.set_defaults(func=cmd_info)
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
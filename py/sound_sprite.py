@@ -0,0 +1,140 @@
+"""Звуковой спрайт из звуков, на которые ссылаются блоки.
+
+Имена звуков (sound.step / break / place) собираются из BLOCK_DATA и ищутся в
+assets/sounds как <имя>.wav, .mp3 или .ogg. WAV-файлы склеиваются стандартным
+модулем wave в один sprite.wav с паузой между звуками; mp3 / ogg декодировать нечем,
+они в спрайт не попадают и перечисляются в "skipped". Рядом пишется манифест:
+
+    {
+        "file": "sprite.wav",
+        "sampleRate": 44100, "channels": 1,
+        "sounds": {"stone_step": {"offset": 0.0, "duration": 0.21}, ...},
+        "skipped": ["grass_step", ...]
+    }
+
+Движок (js/sound.js) загружает и декодирует один файл и играет звук куском
+[offset, offset + duration]; звуки, которых нет в "sounds", грузит отдельными файлами.
+"""
+import json
+import os
+import wave
+
+from block_data import PROJECT_ROOT, atomic_write
+
+SOUNDS_DIR = os.path.join(PROJECT_ROOT, "assets", "sounds")
+SPRITE_NAME = "sprite"
+SOUND_EVENTS = ("step", "break", "place")
+SOUND_EXTENSIONS = (".wav", ".mp3", ".ogg")
+DEFAULT_GAP = 0.05  # секунды тишины между звуками: detune в движке не задевает соседа
+
+
+class SoundSpriteError(Exception):
+    pass
+
+
+def referenced_sounds(blocks):
+    """{имя звука: [id блоков]} в порядке первого упоминания"""
+    names = {}
+    for b in blocks:
+        sound = b.get('sound') or {}
+        for event in SOUND_EVENTS:
+            name = sound.get(event)
+            if name:
+                names.setdefault(name, []).append(b['id'])
+    return names
+
+
+def find_sound(name, sounds_dir=SOUNDS_DIR):
+    """Путь к файлу звука (первое найденное расширение из SOUND_EXTENSIONS) или None"""
+    for ext in SOUND_EXTENSIONS:
+        path = os.path.join(sounds_dir, name + ext)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def check_sounds(blocks, sounds_dir=SOUNDS_DIR):
+    """Сверяет звуки блоков с папкой.
+
+    Возвращает (найденные {имя: путь}, отсутствующие {имя: [id блоков]},
+    лишние файлы папки, на которые никто не ссылается).
+    """
+    refs = referenced_sounds(blocks)
+    found, missing = {}, {}
+    for name, ids in refs.items():
+        path = find_sound(name, sounds_dir)
+        if path:
+            found[name] = path
+        else:
+            missing[name] = ids
+    unused = []
+    if os.path.isdir(sounds_dir):
+        for file_name in sorted(os.listdir(sounds_dir)):
+            stem, ext = os.path.splitext(file_name)
+            if ext.lower() in SOUND_EXTENSIONS and stem not in refs and stem != SPRITE_NAME:
+                unused.append(file_name)
+    return found, missing, unused
+
+
+def read_wav(path):
+    """(nchannels, sampwidth, framerate), PCM-кадры"""
+    try:
+        with wave.open(path, "rb") as w:
+            return (w.getnchannels(), w.getsampwidth(), w.getframerate()), w.readframes(w.getnframes())
+    except (wave.Error, EOFError) as e:
+        raise SoundSpriteError(f"{path}: {e}") from e
+
+
+def split_packable(paths):
+    """{имя: путь} -> (WAV {имя: путь}, имена остальных - их движок грузит отдельно)"""
+    wav = {name: path for name, path in paths.items() if path.lower().endswith(".wav")}
+    return wav, sorted(name for name in paths if name not in wav)
+
+
+def build_sprite(paths, out_path, gap=DEFAULT_GAP):
+    """Склеивает WAV-файлы из {имя: путь} в out_path, остальные пропускает. Возвращает манифест.
+
+    Все WAV должны иметь одинаковые каналы, разрядность и частоту
+    (ресемплинга в стандартной библиотеке нет).
+    """
+    paths, skipped = split_packable(paths)
+    if not paths:
+        raise SoundSpriteError("No WAV sounds to pack" + (f" (not WAV: {', '.join(skipped)})" if skipped else ""))
+
+    decoded = {name: read_wav(path) for name, path in paths.items()}
+    formats = {}
+    for name, (params, _) in decoded.items():
+        formats.setdefault(params, []).append(name)
+    if len(formats) > 1:
+        details = "; ".join(f"{c}ch/{w * 8}bit/{r}Hz: {', '.join(names)}" for (c, w, r), names in formats.items())
+        raise SoundSpriteError(f"Sounds have different WAV formats ({details})")
+    (channels, width, rate), = formats
+    frame_size = channels * width
+    # 8-битный PCM беззнаковый: тишина - 128
+    silence = (b"\x80" if width == 1 else b"\x00") * (frame_size * round(gap * rate))
+
+    sounds, chunks, frames = {}, [], 0
+    for name, (_, data) in decoded.items():
+        count = len(data) // frame_size
+        sounds[name] = {"offset": round(frames / rate, 6), "duration": round(count / rate, 6)}
+        chunks.append(data[:count * frame_size])
+        chunks.append(silence)
+        frames += count + len(silence) // frame_size
+
+    tmp_path = out_path + ".tmp"
+    try:
+        with wave.open(tmp_path, "wb") as w:
+            w.setnchannels(channels)
+            w.setsampwidth(width)
+            w.setframerate(rate)
+            w.writeframes(b"".join(chunks))
+        os.replace(tmp_path, out_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    return {"file": os.path.basename(out_path), "sampleRate": rate, "channels": channels, "sounds": sounds,
+            "skipped": skipped}
+
+
+def write_manifest(manifest, path):
+    atomic_write(path, json.dumps(manifest, indent=2) + "\n")
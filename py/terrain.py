@@ -0,0 +1,170 @@
+"""Генерация рельефа на NumPy - порт js/noise.js и Chunk.generateData.
+
+Формулы и порядок операций над float64 те же, что в JS, поэтому высоты совпадают
+с браузерными бит в бит (проверка: python py/terrain.py check). Считается сразу
+вся сетка колонок, без циклов по вокселям.
+
+    python py/terrain.py height 0 0     # карта высот чанка
+    python py/terrain.py check          # сравнить с js/noise.js через node
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import numpy as np
+
+import block_data
+from block_data import CONSTANTS_PATH, PROJECT_ROOT
+
+# Настройки мира (WORLD_CONFIG)
+CHUNK_SIZE = 16
+CHUNK_HEIGHT = 256
+CHUNK_VOLUME = CHUNK_SIZE * CHUNK_SIZE * CHUNK_HEIGHT
+
+# Меняется при любой правке генератора: по нему сбрасывается кеш запеченных чанков.
+# Сида у генератора нет - рельеф зависит только от координат.
+GENERATOR_VERSION = "noise-v1"
+
+NOISE_JS_PATH = os.path.join(PROJECT_ROOT, "js", "noise.js")
+
+# Блоки, которыми заполняется рельеф (значения из BLOCK в constants.js)
+TERRAIN_BLOCKS = ("AIR", "BEDROCK", "STONE", "DIRT", "GRASS")
+DEFAULT_BLOCK_IDS = {"AIR": 0, "BEDROCK": 1, "STONE": 1, "DIRT": 2, "GRASS": 3}
+
+
+def load_block_ids(path=CONSTANTS_PATH):
+    """id блоков рельефа из объекта BLOCK в constants.js"""
+    with open(path, "r", encoding="utf-8") as f:
+        enum = block_data.parse_block_enum(f.read())
+    missing = [name for name in TERRAIN_BLOCKS if name not in enum]
+    if missing:
+        raise ValueError(f"BLOCK has no {', '.join(missing)}")
+    return {name: enum[name] for name in TERRAIN_BLOCKS}
+
+
+# --- ШУМ (как в noise.js) ---
+
+def hash2d(x, z):
+    n = np.sin(x * 12.9898 + z * 78.233) * 43758.5453
+    return n - np.floor(n)
+
+
+def noise(x, z):
+    floor_x = np.floor(x)
+    floor_z = np.floor(z)
+
+    s = hash2d(floor_x, floor_z)
+    t = hash2d(floor_x + 1, floor_z)
+    u = hash2d(floor_x, floor_z + 1)
+    v = hash2d(floor_x + 1, floor_z + 1)
+
+    fract_x = x - floor_x
+    fract_z = z - floor_z
+
+    i1 = s + (t - s) * fract_x
+    i2 = u + (v - u) * fract_x
+    return i1 + (i2 - i1) * fract_z
+
+
+def terrain_height(gx, gz):
+    """getTerrainHeight для массивов глобальных координат -> int32"""
+    gx = np.asarray(gx, dtype=np.float64)
+    gz = np.asarray(gz, dtype=np.float64)
+    y = noise(gx * 0.03, gz * 0.03) * 20
+    y = y + noise(gx * 0.1, gz * 0.1) * 5
+    return np.floor(np.maximum(5, y + 30)).astype(np.int32)
+
+
+def height_map(x0, z0, width=CHUNK_SIZE, depth=CHUNK_SIZE):
+    """Высоты прямоугольника колонок, форма (depth, width): [z, x]"""
+    gz, gx = np.mgrid[z0:z0 + depth, x0:x0 + width]
+    return terrain_height(gx, gz)
+
+
+# --- ЗАПОЛНЕНИЕ ЧАНКА (как Chunk.generateData) ---
+
+def fill_chunk(heights, ids=None):
+    """Карта высот (16, 16) [z, x] -> Uint8 массив чанка с индексом x + z*16 + y*256"""
+    ids = ids or DEFAULT_BLOCK_IDS
+    y = np.arange(CHUNK_HEIGHT, dtype=np.int32)[:, None, None]
+    h = heights[None, :, :]
+    # Порядок проверок тот же, что в generateData: bedrock, stone, dirt, grass
+    data = np.select([y > h, y == 0, y < h - 2, y < h],
+                     [ids["AIR"], ids["BEDROCK"], ids["STONE"], ids["DIRT"]], ids["GRASS"]).astype(np.uint8)
+    # Форма (y, z, x): ravel дает ровно раскладку x + z*CHUNK_SIZE + y*CHUNK_SIZE^2
+    return data.reshape(-1)
+
+
+def generate_chunk(chunk_x, chunk_z, ids=None):
+    return fill_chunk(height_map(chunk_x * CHUNK_SIZE, chunk_z * CHUNK_SIZE), ids)
+
+
+def generate_chunks(chunk_x0, chunk_z0, count_x, count_z, ids=None):
+    """Прямоугольник чанков: шум считается одним вызовом на всю область.
+
+    Возвращает массив (count_z, count_x, CHUNK_VOLUME) uint8.
+    """
+    heights = height_map(chunk_x0 * CHUNK_SIZE, chunk_z0 * CHUNK_SIZE,
+                         count_x * CHUNK_SIZE, count_z * CHUNK_SIZE)
+    out = np.empty((count_z, count_x, CHUNK_VOLUME), dtype=np.uint8)
+    for cz in range(count_z):
+        for cx in range(count_x):
+            out[cz, cx] = fill_chunk(heights[cz * CHUNK_SIZE:(cz + 1) * CHUNK_SIZE,
+                                             cx * CHUNK_SIZE:(cx + 1) * CHUNK_SIZE], ids)
+    return out
+
+
+# --- СВЕРКА С JS ---
+
+def js_height_map(x0, z0, width, depth, noise_path=NOISE_JS_PATH):
+    """Те же высоты, посчитанные оригинальным noise.js в node"""
+    node = shutil.which("node")
+    if not node:
+        raise RuntimeError("node is not installed")
+    script = (f"import {{ getTerrainHeight }} from {json.dumps(os.path.abspath(noise_path))};\n"
+              f"const out = [];\n"
+              f"for (let z = {z0}; z < {z0 + depth}; z++)\n"
+              f"    for (let x = {x0}; x < {x0 + width}; x++) out.push(getTerrainHeight(x, z));\n"
+              f"process.stdout.write(JSON.stringify(out));\n")
+    result = subprocess.run([node, "--input-type=module", "-e", script], capture_output=True, text=True, check=True)
+    return np.array(json.loads(result.stdout), dtype=np.int32).reshape(depth, width)
+
+
+def cmd_height(args):
+    heights = height_map(args.chunk_x * CHUNK_SIZE, args.chunk_z * CHUNK_SIZE)
+    for row in heights:
+        print(" ".join(f"{h:3d}" for h in row))
+    return 0
+
+
+def cmd_check(args):
+    x0, z0 = args.origin if args.origin else (-args.size // 2, -args.size // 2)
+    ours = height_map(x0, z0, args.size, args.size)
+    theirs = js_height_map(x0, z0, args.size, args.size)
+    diff = np.argwhere(ours != theirs)
+    print(f"{args.size}x{args.size} columns from [{x0}, {z0}]: {len(diff)} mismatches")
+    for z, x in diff[:10]:
+        print(f"  ({x0 + x}, {z0 + z}): numpy {ours[z, x]}, js {theirs[z, x]}")
+    return 1 if len(diff) else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="terrain")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("height", help="Print the height map of one chunk")
+    p.add_argument("chunk_x", type=int)
+    p.add_argument("chunk_z", type=int)
+    p.set_defaults(func=cmd_height)
+    p = sub.add_parser("check", help="Compare heights with js/noise.js (needs node)")
+    p.add_argument("--size", type=int, default=512, help="Side of the checked square, in columns")
+    p.add_argument("--origin", type=int, nargs=2, metavar=("X", "Z"), help="Corner column (default: centered on 0, 0)")
+    p.set_defaults(func=cmd_check)
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""Импорт папки текстур (ресурс-пака) в атлас.
+
+Файл сопоставляется блоку и грани по имени:
+    grass_top.png     -> блок Grass, верх
+    grass_side.png    -> блок Grass, бок
+    grass_bottom.png  -> блок Grass, низ
+    stone.png         -> блок Stone, бок (все грани, если верх/низ не заданы)
+    oak_log_top.png   -> блок "Oak Log" (пробелы и дефисы в имени блока = "_")
+    12_top.png        -> блок с id 12
+Из папки собирается обычный манифест editor_cli (apply_manifest), поэтому тайлы
+кладутся в атлас так же, как в batch: одинаковые переиспользуются, новые - в свободные клетки.
+Декодирование и NEAREST-масштабирование идут параллельно в потоках.
+"""
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from atlas import load_tile_image
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+FACE_SUFFIXES = {"side": "side", "all": "side", "top": "top", "bottom": "bottom", "bot": "bottom"}
+
+
+def block_slug(name):
+    """'Oak Log' -> 'oak_log'"""
+    return re.sub(r"[\s\-]+", "_", str(name or "").strip().lower())
+
+
+def parse_texture_name(file_name):
+    """'grass_top.png' -> ('grass', 'top'); без суффикса грани - ('stone', 'side')"""
+    stem = os.path.splitext(os.path.basename(file_name))[0].lower()
+    base, _, suffix = stem.rpartition("_")
+    if base and suffix in FACE_SUFFIXES:
+        return base, FACE_SUFFIXES[suffix]
+    return stem, "side"
+
+
+def folder_manifest(folder, blocks):
+    """Манифест {"textures": [...]} для всех картинок папки.
+
+    Возвращает (манифест, имена файлов, для которых не нашлось блока).
+    """
+    by_slug = {}
+    for b in blocks:
+        by_slug.setdefault(block_slug(b['name']), b)
+    by_id = {}
+    for b in blocks:
+        by_id.setdefault(str(b['id']), b)
+
+    entries, unmatched = [], []
+    for file_name in sorted(os.listdir(folder)):
+        if not file_name.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        slug, face = parse_texture_name(file_name)
+        b = by_slug.get(slug) or by_id.get(slug)
+        if b is None:
+            unmatched.append(file_name)
+            continue
+        entries.append({"file": file_name, "block": b['id'], "face": face})
+    return {"textures": entries}, unmatched
+
+
+def decode_files(paths, workers=None, progress=None, cancelled=None):
+    """Декодирует и приводит к размеру тайла файлы paths в пуле потоков.
+
+    progress(done, total) вызывается из вызывающего потока после каждого файла;
+    если cancelled() вернет True, оставшиеся файлы не декодируются и возвращается None.
+    Возвращает {путь: PIL RGBA}.
+    """
+    paths = list(dict.fromkeys(paths))
+    decoded = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(load_tile_image, p): p for p in paths}
+        try:
+            for future in as_completed(futures):
+                if cancelled and cancelled():
+                    return None
+                decoded[futures[future]] = future.result()
+                if progress:
+                    progress(len(decoded), len(paths))
+        finally:
+            for future in futures:
+                future.cancel()
+    return decoded